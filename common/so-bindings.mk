@@ -33,9 +33,22 @@ SUPPORT := $($(LANG-NAME))
 endif
 
 
+# Benchmark results; calls=N size=K warmup=W override the workload
+BENCH-RESULTS ?= $(SO-BINDINGS-DIR)/bench-results
+BENCH-RUN = \
+  GLOAT_VERSION=$(GLOAT-VERSION) GLOJURE_VERSION=$(GLOJURE-VERSION) \
+  python3 $(SO-BINDINGS-DIR)/bench.py run \
+    $(if $(calls),--calls=$(calls)) \
+    $(if $(size),--size=$(size)) \
+    $(if $(warmup),--warmup=$(warmup)) \
+    -o $(BENCH-RESULTS)/$(notdir $(CURDIR)).json --
+
+
 #-------------------------------------------------------------------------------
 test: init run
 
+bench: init
+
 init: $(LIBRARY) $(HEADER) | $(SUPPORT)
 
 $(LIBRARY) $(HEADER): $(SOURCE)
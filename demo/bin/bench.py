@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""Compile and run benchmarks for the gloat pipeline.
+
+Compiles each example program to every gloat target, first with an
+empty build cache (cold) and then again with the cache that build left
+behind (warm). Records wall time, CPU time, peak RSS and output size
+for each compile, the per-stage times of a '-t all' build, and the run
+time of the native and wasm (wasmtime) binaries for every argument set
+in config.yaml.
+
+Usage:
+  bench.py [options] [FILE...]          Benchmark; JSON results to stdout
+  bench.py -o new.json --baseline old.json
+                                        Benchmark and flag regressions
+  bench.py --compare old.json new.json  Compare two result files
+
+FILE defaults to every program in yamlscript/, clojure/ and the
+interop/*-interop/ directories, relative to demo/. Exits 1 if a
+comparison finds a regression.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+EXAMPLE_DIR = Path(__file__).parent.parent  # demo/bin/bench.py -> demo/
+PROJECT_DIR = EXAMPLE_DIR.parent            # demo/ -> gloat/
+GLOAT = PROJECT_DIR / 'bin' / 'gloat'
+
+SCHEMA = 1
+SOURCES = ['yamlscript/*.ys', 'clojure/*.clj', 'interop/*-interop/*.clj']
+LIB_SUFFIX = '.dylib' if sys.platform == 'darwin' else '.so'
+
+# gloat -t format -> output file suffix. 'all' builds every glj stage in
+# one run and reports each stage's time.
+TARGETS = {
+    'clj': '.clj',
+    'glj': '.glj',
+    'go': '.go',
+    'bin': '',
+    'lib': LIB_SUFFIX,
+    'wasm': '.wasm',
+    'all': '/',
+}
+CACHES = ['cold', 'warm']
+
+# Compared metrics -> smallest change worth reporting
+THRESHOLDS = {'wall_ms': 50, 'max_rss_kb': 4096, 'bytes': 1024}
+
+
+def progress(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def measure(cmd, env=None, timeout=None):
+    """Run cmd with no stdin; return its exit code, stdout, wall time,
+    CPU time and peak RSS (of the largest process in its tree)."""
+    timed_out = threading.Event()
+
+    def kill(proc):
+        timed_out.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    with tempfile.TemporaryFile() as out:
+        start = time.monotonic()
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=out,
+                                stderr=subprocess.DEVNULL, env=env,
+                                start_new_session=True)
+        timer = threading.Timer(timeout, kill, [proc]) if timeout else None
+        if timer:
+            timer.start()
+        # wait4 rather than proc.wait() to get the resource usage
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.monotonic() - start
+        if timer:
+            timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        stdout = out.read()
+    return {
+        'exit': proc.returncode,
+        'timeout': timed_out.is_set(),
+        'stdout': stdout,
+        'wall_ms': round(wall * 1000),
+        'cpu_ms': round((usage.ru_utime + usage.ru_stime) * 1000),
+        # ru_maxrss is in bytes on macOS, KiB elsewhere
+        'max_rss_kb': usage.ru_maxrss // (1024 if sys.platform == 'darwin' else 1),
+    }
+
+
+def output_size(path):
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+    return path.stat().st_size if path.exists() else 0
+
+
+def find_sources(files):
+    if files:
+        return [Path(f).resolve() for f in files]
+    return sorted(p for pattern in SOURCES for p in EXAMPLE_DIR.glob(pattern))
+
+
+def load_config():
+    """Argument sets from config.yaml, read with 'ys -J'"""
+    try:
+        result = subprocess.run(['ys', '-J', str(EXAMPLE_DIR / 'config.yaml')],
+                                capture_output=True, check=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        progress('Warning: could not read config.yaml with ys; '
+                 'running programs without arguments')
+        return {}
+    return json.loads(result.stdout)
+
+
+def argv_for(value):
+    """Program arguments for one config.yaml value, as index.html builds
+    them: a JSON array string is several arguments, anything else one."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value]
+    values = value if isinstance(value, list) else [value]
+    return [json.dumps(v) if isinstance(v, bool) else str(v) for v in values]
+
+
+def arg_sets(config, name):
+    """Every argument set config.yaml lists for program name"""
+    entry = config.get(name)
+    if not entry:
+        return [[]]
+    options = entry[0]
+    labeled = isinstance(options[0], list) and isinstance(options[0][0], str)
+    sets = []
+    for option in options:
+        if labeled:
+            value = option[1]
+        else:
+            value = option[0] if isinstance(option, list) else option
+        sets.append(argv_for(value))
+    return sets
+
+
+def compile_target(source, target, out_dir, env, timeout):
+    """Compile source to target; return its result record fields"""
+    output = out_dir / (source.stem + TARGETS[target])
+    cmd = [str(GLOAT), str(source), '-o', str(output), '-t', target, '-q']
+    result = measure(cmd, env, timeout)
+    record = {
+        'ok': result['exit'] == 0 and not result['timeout'],
+        'wall_ms': result['wall_ms'],
+        'cpu_ms': result['cpu_ms'],
+        'max_rss_kb': result['max_rss_kb'],
+    }
+    if result['timeout']:
+        record['timeout'] = True
+    if record['ok']:
+        record['bytes'] = output_size(output)
+    if target == 'all':
+        record['stages'] = {}
+        for line in result['stdout'].decode('utf-8', 'replace').splitlines():
+            if line.startswith('{'):
+                stage = json.loads(line)
+                record['stages'][stage['stage']] = stage['ms']
+    return record, output
+
+
+def median_record(records):
+    """The last of repeated measurements, with median and min times"""
+    record = dict(records[-1])
+    if len(records) > 1 and record['ok']:
+        walls = [r['wall_ms'] for r in records]
+        record['wall_ms'] = round(statistics.median(walls))
+        record['min_ms'] = min(walls)
+        record['cpu_ms'] = round(statistics.median(r['cpu_ms'] for r in records))
+        if 'stages' in record:
+            record['stages'] = {
+                stage: round(statistics.median(
+                    r['stages'].get(stage, 0) for r in records))
+                for stage in record['stages']}
+    return record
+
+
+def run_binary(cmd, repeat, timeout):
+    """Run cmd repeat times; return median/min wall time and peak RSS"""
+    runs = [measure(cmd, timeout=timeout) for _ in range(repeat)]
+    walls = [r['wall_ms'] for r in runs]
+    return {
+        'ok': all(r['exit'] == 0 and not r['timeout'] for r in runs),
+        'exit': runs[-1]['exit'],
+        'wall_ms': round(statistics.median(walls)),
+        'min_ms': min(walls),
+        'max_rss_kb': max(r['max_rss_kb'] for r in runs),
+        'stdout_bytes': len(runs[-1]['stdout']),
+    }
+
+
+def bench_source(source, targets, caches, config, opts):
+    """Yield result records for one source file"""
+    name = str(source.relative_to(EXAMPLE_DIR)
+               if source.is_relative_to(EXAMPLE_DIR) else source)
+    wasmtime = shutil.which('wasmtime')
+    with tempfile.TemporaryDirectory(prefix='gloat-bench-') as tmp:
+        tmp = Path(tmp)
+        for target in targets:
+            # One fresh build cache per target: the cold build fills it
+            # and the warm builds reuse it
+            build_cache = tmp / f'cache-{target}'
+            env = dict(os.environ,
+                       GLOAT_BUILD_CACHE=str(build_cache),
+                       GLOAT_NO_DAEMON='1')
+            output = None
+            for cache in caches:
+                out_dir = tmp / f'{target}-{cache}'
+                if cache == 'warm' and not build_cache.exists():
+                    # Warm without cold: prime the cache first
+                    out_dir.mkdir()
+                    compile_target(source, target, out_dir, env, opts.timeout)
+                progress(f'{name}: {target} ({cache})')
+                records = []
+                for _ in range(1 if cache == 'cold' else opts.repeat):
+                    shutil.rmtree(out_dir, ignore_errors=True)
+                    out_dir.mkdir()
+                    record, output = compile_target(
+                        source, target, out_dir, env, opts.timeout)
+                    records.append(record)
+                    if not record['ok']:
+                        break
+                yield {'kind': 'compile', 'source': name, 'target': target,
+                       'cache': cache, **median_record(records)}
+                if not record['ok']:
+                    break
+
+            if opts.no_run or not output or not record['ok']:
+                continue
+            if target == 'bin':
+                runner = [str(output)]
+            elif target == 'wasm' and wasmtime:
+                runner = [wasmtime, str(output)]
+            else:
+                continue
+            for args in arg_sets(config, source.stem):
+                progress(f'{name}: run {target} {" ".join(args)}')
+                yield {'kind': 'run', 'source': name, 'target': target,
+                       'args': args,
+                       **run_binary(runner + args, opts.repeat, opts.timeout)}
+
+
+def gloat_version():
+    try:
+        return subprocess.run([str(GLOAT), '--version'], capture_output=True,
+                              text=True, timeout=120).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def record_key(record):
+    return (record['kind'], record['source'], record['target'],
+            record.get('cache'), tuple(record.get('args', ())))
+
+
+def compare(baseline, current, threshold):
+    """Regressions in current against baseline: metrics more than
+    threshold (a fraction) and THRESHOLDS[metric] worse, plus records
+    that passed before and fail now."""
+    old = {record_key(r): r for r in baseline['results']}
+    regressions = []
+    for record in current['results']:
+        before = old.get(record_key(record))
+        if not before:
+            continue
+        where = {k: record[k] for k in ('kind', 'source', 'target', 'cache',
+                                        'args') if k in record}
+        if before['ok'] and not record['ok']:
+            regressions.append(dict(where, metric='ok', old=True, new=False))
+            continue
+        metrics = [(m, before.get(m), record.get(m)) for m in THRESHOLDS]
+        metrics += [(f'stages.{stage}', ms, record.get('stages', {}).get(stage))
+                    for stage, ms in before.get('stages', {}).items()]
+        for metric, was, now in metrics:
+            if was is None or now is None:
+                continue
+            floor = THRESHOLDS.get(metric, THRESHOLDS['wall_ms'])
+            if now - was > max(was * threshold, floor):
+                regressions.append(dict(where, metric=metric, old=was, new=now,
+                                        change=f'{(now - was) / max(was, 1):+.0%}'))
+    return regressions
+
+
+def report(regressions):
+    for r in regressions:
+        args = ' '.join(r.get('args', []))
+        progress(f"REGRESSION {r['source']} {r['target']}"
+                 f"{' ' + r['cache'] if 'cache' in r else ''}"
+                 f"{' ' + args if args else ''}: {r['metric']} "
+                 f"{r['old']} -> {r['new']}{' (' + r['change'] + ')' if 'change' in r else ''}")
+    progress(f'{len(regressions)} regression(s)')
+
+
+def read_results(path):
+    results = json.loads(Path(path).read_text())
+    if results.get('schema') != SCHEMA:
+        sys.exit(f'{path}: not a bench.py schema {SCHEMA} result file')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', metavar='FILE')
+    parser.add_argument('-t', '--targets', default=','.join(TARGETS),
+                        help='comma separated gloat targets (default: %(default)s)')
+    parser.add_argument('--cache', default=','.join(CACHES),
+                        help='cold, warm or both (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='warm compiles and runs per measurement; '
+                             'medians are reported (default: %(default)s)')
+    parser.add_argument('--timeout', type=int, default=600,
+                        help='seconds allowed per compile or run')
+    parser.add_argument('--no-run', action='store_true',
+                        help="don't run the compiled programs")
+    parser.add_argument('-o', '--output', help='write results here')
+    parser.add_argument('--baseline', help='flag regressions against this')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two result files and exit')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative slowdown that counts as a regression '
+                             '(default: %(default)s)')
+    opts = parser.parse_args()
+
+    if opts.compare:
+        regressions = compare(read_results(opts.compare[0]),
+                              read_results(opts.compare[1]), opts.threshold)
+        report(regressions)
+        sys.exit(1 if regressions else 0)
+
+    targets = opts.targets.split(',')
+    caches = opts.cache.split(',')
+    for value, valid in [(targets, TARGETS), (caches, CACHES)]:
+        unknown = [v for v in value if v not in valid]
+        if unknown:
+            parser.error(f"unknown value(s) {', '.join(unknown)}; "
+                         f"use {', '.join(valid)}")
+    baseline = read_results(opts.baseline) if opts.baseline else None
+
+    config = load_config()
+    results = {
+        'schema': SCHEMA,
+        'gloat_version': gloat_version(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': {
+            'system': platform.system(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'options': {'targets': targets, 'caches': caches,
+                    'repeat': opts.repeat},
+        'results': [],
+    }
+    for source in find_sources(opts.files):
+        results['results'].extend(
+            bench_source(source, targets, caches, config, opts))
+
+    if baseline:
+        results['regressions'] = compare(baseline, results, opts.threshold)
+        report(results['regressions'])
+
+    text = json.dumps(results, indent=2) + '\n'
+    if opts.output:
+        Path(opts.output).write_text(text)
+    else:
+        sys.stdout.write(text)
+    sys.exit(1 if results.get('regressions') else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env bash
+
+set -e
+
+# Usage: compile.sh <source_file> <output_file> <format>
+# format can be: clj, glj, go, js (for wasm), wasm (WASI), bin,
+# all (output_file is a directory)
+
+SOURCE_FILE="$1"
+OUTPUT_FILE="$2"
+FORMAT="$3"
+
+if [[ -z "$SOURCE_FILE" || -z "$FORMAT" ]]; then
+  echo "Usage: compile.sh <source_file> <output_file> <format>" >&2
+  exit 1
+fi
+
+# Change to project root
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/../.." && pwd)"
+cd "$PROJECT_DIR"
+
+# bin/gloat sets up its own PATH (from its env manifest once resolved), so
+# run it directly rather than under 'make shell'
+if [[ "$FORMAT" =~ ^(js|wasm|bin|all)$ ]]; then
+  # WASM, binaries and all-stage compilation need an output path
+  exec bin/gloat "$SOURCE_FILE" -o "$OUTPUT_FILE" -t "$FORMAT"
+else
+  # Other formats go to stdout
+  exec bin/gloat "$SOURCE_FILE" -t "$FORMAT"
+fi
@@ -0,0 +1,1974 @@
+#!/usr/bin/env python3
+
+import codecs
+import contextlib
+import email.utils
+import errno
+import http.server
+import json
+import math
+import subprocess
+import tempfile
+import os
+import gzip
+import hashlib
+import re
+import resource
+import selectors
+import sys
+import shutil
+import signal
+import socket
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs, unquote
+
+try:
+    import brotli  # Optional: 'pip install brotli' adds br artifacts
+except ImportError:
+    brotli = None
+
+try:
+    import wasmtime  # Optional: 'pip install wasmtime' runs wasm in-process
+except ImportError:
+    wasmtime = None
+
+try:
+    import yaml  # Optional: 'pip install pyyaml' reads config.yaml in-process
+except ImportError:
+    yaml = None
+
+PORT = 8080
+EXAMPLE_DIR = Path(__file__).parent.parent  # example/bin/server.py -> example/
+PROJECT_DIR = EXAMPLE_DIR.parent            # example/ -> gloat/
+
+CACHE_DIR = Path(os.environ.get(
+    'GLOAT_DEMO_CACHE_DIR', PROJECT_DIR / '.cache' / 'demo-compile'))
+CACHE_MAX_BYTES = int(os.environ.get('GLOAT_DEMO_CACHE_MB', '512')) * 1024 * 1024
+PIPELINE_TIMEOUT = 120
+DAEMON_SOCKET = Path(os.environ.get(
+    'GLOAT_DAEMON_SOCKET', PROJECT_DIR / '.cache' / 'local' / 'gloat.sock'))
+HEARTBEAT_SECONDS = 5
+
+# Recompiles of a playground file are built from the same source path, so
+# their generated code differs only where the sources do and gloat reuses
+# what it compiled for the unchanged forms and namespaces
+WORK_DIR = Path(os.environ.get(
+    'GLOAT_DEMO_WORK_DIR', PROJECT_DIR / '.cache' / 'demo-work'))
+
+# In-memory copies of static files, sources and /api/config
+ASSET_MAX_BYTES = int(os.environ.get('GLOAT_DEMO_ASSET_MB', '64')) * 1024 * 1024
+ASSET_FILE_BYTES = 8 * 1024 * 1024  # larger files are sent from disk
+KEEPALIVE_SECONDS = 30  # idle time before a keep-alive connection is closed
+
+# Content types worth sending compressed
+COMPRESSIBLE = re.compile(
+    r'^(text/|application/(javascript|json|wasm|xml)|image/svg\+xml)')
+
+# Server-side runs (/api/run): built programs and their limits
+RUN_DIR = Path(os.environ.get(
+    'GLOAT_DEMO_RUN_DIR', PROJECT_DIR / '.cache' / 'demo-run'))
+RUN_PROGRAMS = int(os.environ.get('GLOAT_DEMO_RUN_PROGRAMS', '64'))
+RUN_MODULES = int(os.environ.get('GLOAT_DEMO_RUN_MODULES', '16'))
+RUN_SECONDS = float(os.environ.get('GLOAT_DEMO_RUN_SECONDS', '10'))
+RUN_CPU_SECONDS = int(os.environ.get('GLOAT_DEMO_RUN_CPU', '5'))
+RUN_MEMORY_BYTES = int(os.environ.get('GLOAT_DEMO_RUN_MB', '512')) * 1024 * 1024
+RUN_OUTPUT_BYTES = int(os.environ.get('GLOAT_DEMO_RUN_OUTPUT_KB', '1024')) * 1024
+EPOCH_TICK = 0.05  # seconds per wasmtime epoch, the in-process time limit step
+
+# /api/run targets: name -> suffix of the 'gloat -o' output
+RUN_TARGETS = {'wasm': '.wasm', 'bin': ''}
+
+# Stage outputs stored in a cache entry, in pipeline order
+STAGES = ['clj', 'glj', 'go', 'wasm']
+
+# Precompressed artifact variants: Content-Encoding -> file suffix
+ARTIFACT_ENCODINGS = {'br': '.br', 'gzip': '.gz'} if brotli else {'gzip': '.gz'}
+ARTIFACT_ID = re.compile(r'^[0-9a-f]{64}$')
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = tuple(2 ** n for n in range(16, 31, 2))  # 64KiB .. 1GiB
+
+# Metric families recorded while serving: name -> (type, help, buckets)
+METRICS = {
+    'gloat_stage_seconds': (
+        'histogram', 'Compile stage time; encode is artifact precompression',
+        SECONDS_BUCKETS),
+    'gloat_stage_failures_total': (
+        'counter', 'Compiles that failed in a stage', None),
+    'gloat_stage_timeouts_total': (
+        'counter', 'Compiles that timed out in a stage', None),
+    'gloat_compile_seconds': (
+        'histogram', 'Whole compile time, by result', SECONDS_BUCKETS),
+    'gloat_queue_wait_seconds': (
+        'histogram', 'Time a compile job waited for a worker', SECONDS_BUCKETS),
+    'gloat_subprocess_cpu_seconds': (
+        'histogram', 'User plus system CPU time of a compile.sh run',
+        SECONDS_BUCKETS),
+    'gloat_subprocess_max_rss_bytes': (
+        'histogram', 'Peak resident set size of a compile.sh run',
+        BYTES_BUCKETS),
+    'gloat_artifact_bytes': (
+        'histogram', 'Stored wasm artifact size, by encoding', BYTES_BUCKETS),
+    'gloat_run_build_seconds': (
+        'histogram', 'Time to build a program for /api/run, by target',
+        SECONDS_BUCKETS),
+    'gloat_run_seconds': (
+        'histogram', 'Program run time on /api/run, by target and result',
+        SECONDS_BUCKETS),
+}
+
+
+def log(event, **fields):
+    """Write one JSON log record to stderr"""
+    record = {'ts': round(time.time(), 3), 'event': event}
+    record.update(fields)
+    sys.stderr.write(json.dumps(record, default=str) + '\n')
+    sys.stderr.flush()
+
+
+class Metrics:
+    """Counters and histograms for /api/metrics.
+
+    Series are keyed by metric name plus label values; the families are
+    declared in METRICS. render() writes the Prometheus text format.
+    """
+
+    def __init__(self, families):
+        self.families = families
+        self.lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+
+    def inc(self, name, value=1, **labels):
+        series = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[series] = self.counters.get(series, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = self.families[name][2]
+        series = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.get(series)
+            if hist is None:
+                hist = self.histograms[series] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist[0][i] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    def render(self, gauges=()):
+        """Prometheus text exposition of every series, followed by gauges:
+        (name, type, help, value) tuples read from the live state"""
+        def labelset(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        lines = []
+        with self.lock:
+            for name, (kind, help_text, buckets) in self.families.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    for (series, labels), value in sorted(self.counters.items()):
+                        if series == name:
+                            lines.append(f'{name}{labelset(labels)} {value}')
+                    continue
+                for (series, labels), (counts, total, count) in sorted(
+                        self.histograms.items()):
+                    if series != name:
+                        continue
+                    for bound, n in zip(buckets, counts):
+                        lines.append(f'{name}_bucket'
+                                     f'{labelset(labels, [("le", bound)])} {n}')
+                    lines.append(f'{name}_bucket'
+                                 f'{labelset(labels, [("le", "+Inf")])} {count}')
+                    lines.append(f'{name}_sum{labelset(labels)} {total}')
+                    lines.append(f'{name}_count{labelset(labels)} {count}')
+        for name, kind, help_text, value in gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics(METRICS)
+
+
+def toolchain_versions():
+    """Read pinned tool versions from common/common.mk.
+
+    The first assignment of each variable wins, like 'gloat --version'.
+    """
+    versions = {}
+    common_mk = PROJECT_DIR / 'common' / 'common.mk'
+    if common_mk.exists():
+        for line in common_mk.read_text().splitlines():
+            m = re.match(r'^([A-Z][A-Z-]*-VERSION)\s*:=\s*(\S+)', line)
+            if m and m.group(1) not in versions:
+                versions[m.group(1)] = m.group(2)
+    return versions
+
+
+class CompileError(Exception):
+    """A compile stage failed; step names the stage (clj, glj, go, wasm)"""
+
+    def __init__(self, step, message):
+        super().__init__(message)
+        self.step = step
+
+
+class CompileCancelled(Exception):
+    """Every client following a compile disconnected"""
+
+
+def kill_process_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def check_deadline(cmd, cancel, deadline, timeout):
+    """Raise if the build was cancelled or ran out of time"""
+    if cancel is not None and cancel.is_set():
+        raise CompileCancelled()
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return remaining
+
+
+def run_compile_script(cmd, on_stdout, on_stderr, cancel, timeout):
+    """Run cmd, passing decoded output chunks to on_stdout/on_stderr as
+    they arrive. Returns the exit code."""
+    returncode, usage = run_process(cmd, on_stdout, on_stderr, cancel, timeout)
+    metrics.observe('gloat_subprocess_cpu_seconds',
+                    usage.ru_utime + usage.ru_stime)
+    metrics.observe('gloat_subprocess_max_rss_bytes',
+                    usage.ru_maxrss * 1024)  # ru_maxrss is in KiB
+    return returncode
+
+
+def run_process(cmd, on_stdout, on_stderr, cancel, timeout, preexec_fn=None):
+    """Run cmd like run_compile_script; returns (exit code, resource usage).
+
+    preexec_fn runs in the child before cmd, e.g. to set its limits.
+    """
+    # Own process group: the make/bash/bb/go tree is killed together
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            start_new_session=True, preexec_fn=preexec_fn)
+    streams = {
+        proc.stdout: (on_stdout, codecs.getincrementaldecoder('utf-8')(errors='replace')),
+        proc.stderr: (on_stderr, codecs.getincrementaldecoder('utf-8')(errors='replace')),
+    }
+    deadline = time.monotonic() + timeout
+    selector = selectors.DefaultSelector()
+    for pipe in streams:
+        os.set_blocking(pipe.fileno(), False)
+        selector.register(pipe, selectors.EVENT_READ)
+    try:
+        while selector.get_map():
+            remaining = check_deadline(cmd, cancel, deadline, timeout)
+            for key, _ in selector.select(min(remaining, 0.25)):
+                chunk = os.read(key.fd, 65536)
+                handler, decoder = streams[key.fileobj]
+                text = decoder.decode(chunk, final=not chunk)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                if text:
+                    handler(text)
+        # wait4 rather than proc.wait() to get the process's resource usage
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return proc.returncode, usage
+    finally:
+        selector.close()
+        if proc.poll() is None:
+            kill_process_group(proc)
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def run_daemon(argv, on_stdout, on_stderr, cancel, timeout):
+    """Run a compile on the 'gloat --daemon' at DAEMON_SOCKET.
+
+    Same contract as run_compile_script, but returns None when there is
+    no daemon or it declines the request. Cancelling closes the
+    connection.
+    """
+    if not DAEMON_SOCKET.is_socket():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(DAEMON_SOCKET))
+    except OSError:
+        conn.close()
+        return None
+
+    deadline = time.monotonic() + timeout
+    buffer = b''
+    with conn:
+        conn.sendall(json.dumps({'argv': argv, 'cwd': str(PROJECT_DIR)})
+                     .encode('utf-8') + b'\n')
+        while True:
+            conn.settimeout(min(check_deadline(argv, cancel, deadline, timeout), 0.25))
+            try:
+                chunk = conn.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                raise CompileError(STAGES[0], 'gloat daemon closed the connection')
+            *lines, buffer = (buffer + chunk).split(b'\n')
+            for line in lines:
+                frame = json.loads(line)
+                if 'out' in frame:
+                    on_stdout(frame['out'])
+                elif 'err' in frame:
+                    on_stderr(frame['err'])
+                elif frame.get('fallback'):
+                    return None
+                else:
+                    return frame['exit']
+
+
+def run_pipeline(source_file, out_dir, on_stage=None, on_output=None,
+                 cancel=None, timeout=PIPELINE_TIMEOUT):
+    """Compile source_file through every stage in one 'gloat -t all' run.
+
+    The compile goes to a running 'gloat --daemon' when there is one,
+    and through bin/compile.sh otherwise. gloat prints a JSON record as
+    each stage finishes; on_stage(record, next_step) is called for each
+    one so callers can report progress. Any other output is passed to
+    on_output(stream, text) as it arrives. Setting the cancel event
+    kills the build. Returns (outputs, timings, wasm_file).
+    """
+    records = []
+    stderr = []
+    partial = ['']  # stdout text after the last newline
+
+    def stdout_line(line):
+        if line.startswith('{'):
+            record = json.loads(line)
+            records.append(record)
+            metrics.observe('gloat_stage_seconds', record['ms'] / 1000,
+                            stage=record['stage'])
+            if on_stage:
+                index = STAGES.index(record['stage'])
+                next_step = STAGES[index + 1] if index + 1 < len(STAGES) else None
+                on_stage(record, next_step)
+        elif on_output:
+            on_output('stdout', line)
+
+    def stdout_text(text):
+        *lines, partial[0] = (partial[0] + text).split('\n')
+        for line in lines:
+            stdout_line(line + '\n')
+
+    def stderr_text(text):
+        stderr.append(text)
+        if on_output:
+            on_output('stderr', text)
+
+    def current_stage():
+        done = [r['stage'] for r in records]
+        return next((s for s in STAGES if s not in done), STAGES[-1])
+
+    argv = [str(source_file), '-o', str(out_dir), '-t', 'all']
+    try:
+        returncode = run_daemon(argv, stdout_text, stderr_text, cancel, timeout)
+        if returncode is None:
+            compile_script = EXAMPLE_DIR / 'bin' / 'compile.sh'
+            cmd = [str(compile_script), str(source_file), str(out_dir), 'all']
+            returncode = run_compile_script(
+                cmd, stdout_text, stderr_text, cancel, timeout)
+    except subprocess.TimeoutExpired:
+        metrics.inc('gloat_stage_timeouts_total', stage=current_stage())
+        raise
+    if partial[0]:
+        stdout_line(partial[0])
+
+    if returncode != 0 or 'wasm' not in [r['stage'] for r in records]:
+        failed = current_stage()
+        metrics.inc('gloat_stage_failures_total', stage=failed)
+        raise CompileError(failed, ''.join(stderr) or f'gloat exited {returncode}')
+
+    outputs = {}
+    timings = {}
+    for record in records:
+        timings[record['stage']] = record['ms']
+        if record['stage'] != 'wasm':
+            outputs[record['stage']] = (out_dir / record['file']).read_text()
+    return outputs, timings, out_dir / (source_file.stem + '.wasm')
+
+class CompileCache:
+    """Content-addressed on-disk cache of compile results.
+
+    Entries live in CACHE_DIR/<key>/ and hold a manifest.json with every
+    stage's output plus the wasm artifact, stored as is and precompressed
+    for /api/artifact/<key>. The key hashes the source, its
+    extension and the gloat/toolchain versions, so upgrading any of them
+    invalidates old entries. Least recently used entries are evicted once
+    the total size passes max_bytes.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.versions = toolchain_versions()
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load()
+
+    def load(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        found = []
+        for entry in self.root.iterdir():
+            if not (entry / 'manifest.json').exists():
+                # Leftover from an interrupted store
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            found.append((entry.stat().st_mtime, entry.name, size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+
+    def key(self, source, ext):
+        h = hashlib.sha256()
+        for part in [source, ext] + [
+                f'{k}={v}' for k, v in sorted(self.versions.items())]:
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def get(self, key):
+        """Return (manifest, wasm_path) for key, or None on a miss."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            entry = self.root / key
+            try:
+                manifest = json.loads((entry / 'manifest.json').read_text())
+                os.utime(entry)
+            except (OSError, ValueError):
+                del self.entries[key]
+                shutil.rmtree(entry, ignore_errors=True)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return manifest, entry / 'temp.wasm'
+
+    def contains(self, key):
+        """True if key is cached; unlike get() it counts no hit or miss"""
+        with self.lock:
+            return key in self.entries
+
+    def put(self, key, outputs, timings, wasm_file):
+        """Store stage outputs and the wasm artifact under key."""
+        tmp = Path(tempfile.mkdtemp(prefix='.tmp-', dir=self.root))
+        try:
+            start = time.monotonic()
+            shutil.copyfile(wasm_file, tmp / 'temp.wasm')
+            wasm_bytes = wasm_file.read_bytes()
+            variants = {'identity': wasm_bytes,
+                        'gzip': gzip.compress(wasm_bytes, 6)}
+            (tmp / 'temp.wasm.gz').write_bytes(variants['gzip'])
+            if brotli:
+                variants['br'] = brotli.compress(wasm_bytes, quality=5)
+                (tmp / 'temp.wasm.br').write_bytes(variants['br'])
+            metrics.observe('gloat_stage_seconds', time.monotonic() - start,
+                            stage='encode')
+            for encoding, data in variants.items():
+                metrics.observe('gloat_artifact_bytes', len(data),
+                                encoding=encoding)
+            (tmp / 'manifest.json').write_text(json.dumps({
+                'key': key,
+                'versions': self.versions,
+                'outputs': outputs,
+                'ms': timings,
+                'created': time.time(),
+            }))
+            size = sum(f.stat().st_size for f in tmp.iterdir())
+            with self.lock:
+                entry = self.root / key
+                if key in self.entries:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    return True
+                os.rename(tmp, entry)
+                self.entries[key] = size
+                self.evict()
+            return True
+        except OSError as e:
+            log('cache_store_failed', key=key, error=str(e))
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+
+    def open_artifact(self, key, encodings):
+        """Open key's wasm artifact, preferring a precompressed variant.
+
+        encodings is the client's accepted Content-Encodings. Returns
+        (file, encoding) with encoding None for the raw wasm, or None if
+        key is not cached. The open file stays readable if the entry is
+        evicted while it is being sent.
+        """
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            entry = self.root / key
+            for encoding, suffix in ARTIFACT_ENCODINGS.items():
+                if encoding in encodings:
+                    try:
+                        return open(entry / f'temp.wasm{suffix}', 'rb'), encoding
+                    except FileNotFoundError:
+                        pass  # Entry stored before this encoding was enabled
+            try:
+                return open(entry / 'temp.wasm', 'rb'), None
+            except FileNotFoundError:
+                return None
+
+    def evict(self):
+        # Caller holds self.lock
+        while self.entries and self.total_bytes() > self.max_bytes:
+            key, _ = self.entries.popitem(last=False)
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            self.evictions += 1
+
+    def total_bytes(self):
+        return sum(self.entries.values())
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes,
+            }
+
+
+def replay_cached(manifest, wasm_file, emit):
+    """Replay a cached compile as the SSE events a fresh one sends"""
+    outputs = manifest['outputs']
+    for step in STAGES:
+        emit('progress', {'step': step, 'status': 'started'})
+        event = {'step': step, 'status': 'done', 'ms': 0, 'cached': True}
+        if step in ('glj', 'go'):
+            event['code'] = outputs[step]
+        emit('progress', event)
+
+    emit('done', dict(outputs, success=True, cached=True,
+                      artifact=manifest['key'],
+                      size=wasm_file.stat().st_size))
+
+
+def compile_stream(key, source, ext, emit, cancel=None, file=None):
+    """Compile source, reporting progress as SSE events through emit.
+
+    Build output is forwarded as 'output' events while the build runs.
+    file is the client's name for the source (see source_dir).
+    """
+    with source_dir(file) as src_path, tempfile.TemporaryDirectory() as temp_dir:
+        source_file = src_path / f"temp{ext}"
+        out_dir = Path(temp_dir) / 'out'
+
+        source_file.write_text(source)
+        reuse = {}
+
+        def on_stage(record, next_step):
+            event = {'step': record['stage'], 'status': 'done', 'ms': record['ms']}
+            if record['stage'] in ('glj', 'go'):
+                event['code'] = (out_dir / record['file']).read_text()
+            if 'reused' in record:
+                # Forms (glj) or namespaces (go) gloat compiled and reused
+                event['built'] = record['built']
+                event['reused'] = record['reused']
+                reuse[record['stage']] = [record['built'], record['reused']]
+            emit('progress', event)
+            if next_step:
+                emit('progress', {'step': next_step, 'status': 'started'})
+
+        def on_output(stream, text):
+            emit('output', {'stream': stream, 'text': text})
+
+        start = time.monotonic()
+        fields = {}
+        try:
+            emit('progress', {'step': STAGES[0], 'status': 'started'})
+            outputs, timings, wasm_file = run_pipeline(
+                source_file, out_dir, on_stage, on_output, cancel)
+
+            # The wasm is fetched from /api/artifact/<key>, so it must be
+            # in the cache before the client hears about it
+            if not compile_cache.put(key, outputs, timings, wasm_file):
+                raise OSError('Could not store the compiled wasm artifact')
+
+            size = wasm_file.stat().st_size
+            fields = {'result': 'ok', 'stage_ms': timings, 'bytes': size,
+                      'reuse': reuse}
+            emit('done', dict(outputs, success=True, artifact=key, size=size))
+
+        except CompileError as e:
+            fields = {'result': 'failed', 'step': e.step}
+            emit('error', {'step': e.step, 'error': str(e)})
+        except subprocess.TimeoutExpired as e:
+            fields = {'result': 'timeout'}
+            emit('error', {'error': f'Compilation timeout after {e.timeout}s'})
+        except CompileCancelled:
+            fields = {'result': 'cancelled'}
+            emit('error', {'error': 'Compilation cancelled'})
+        except Exception as e:
+            fields = {'result': 'error', 'error': str(e)}
+            emit('error', {'error': str(e)})
+        finally:
+            seconds = time.monotonic() - start
+            result = fields.get('result', 'error')
+            metrics.observe('gloat_compile_seconds', seconds, result=result)
+            log('compile', key=key, ext=ext, ms=round(seconds * 1000),
+                **dict(fields, result=result))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class CompileJob:
+    """One in-flight compile; any number of requests can follow its events.
+
+    Events are kept so a request that joins late (a duplicate compile of
+    the same source) replays everything from the start. The cancelled
+    event is set once no request is following the job any more, unless
+    it is a background job that nobody asked for.
+    """
+
+    def __init__(self, key, run, background=False):
+        self.key = key
+        self.run = run
+        self.background = background
+        self.created = time.monotonic()
+        self.history = []
+        self.finished = False
+        self.followers = 0
+        self.cancelled = threading.Event()
+        self.cond = threading.Condition()
+
+    def emit(self, event, data):
+        with self.cond:
+            self.history.append((event, data))
+            self.cond.notify_all()
+
+    def finish(self):
+        with self.cond:
+            self.finished = True
+            self.cond.notify_all()
+
+    def events(self, heartbeat=None):
+        """Yield (event, data) pairs until the job finishes.
+
+        With a heartbeat, (None, None) is yielded after that many seconds
+        without an event so the caller can check its client is still there.
+        """
+        seen = 0
+        while True:
+            with self.cond:
+                if seen == len(self.history) and not self.finished:
+                    self.cond.wait(heartbeat)
+                batch = self.history[seen:]
+                seen = len(self.history)
+                if not batch and self.finished:
+                    return
+            yield from batch or [(None, None)]
+
+
+class CompileScheduler:
+    """Fixed pool of compile workers behind a bounded FIFO queue.
+
+    Compiles of the same cache key share one job. submit() raises
+    QueueFull once max_queue jobs are waiting for a worker; waiting jobs
+    get a 'queued' event whenever their position changes. A job whose
+    last follower disconnects is dropped from the queue, or has its build
+    killed if it is already running.
+
+    Background jobs (prewarming) wait behind every request's job, don't
+    count against max_queue and are never cancelled. A request for the
+    same key turns one into a normal job.
+    """
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.cond = threading.Condition()
+        self.pending = []
+        self.inflight = {}
+        self.running = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.cancelled = 0
+        for i in range(workers):
+            threading.Thread(target=self.work, name=f'compile-{i}', daemon=True).start()
+
+    def submit(self, key, run, background=False):
+        """Return the job compiling key, queueing run(emit, cancel) if there
+        is none"""
+        with self.cond:
+            job = self.inflight.get(key)
+            if job:
+                if not background:
+                    self.deduplicated += 1
+                    if job.background:
+                        self.promote(job)
+                return job
+            if background:
+                job = CompileJob(key, run, background=True)
+                self.pending.append(job)
+            else:
+                if self.foreground_pending() >= self.max_queue:
+                    self.rejected += 1
+                    raise QueueFull()
+                job = CompileJob(key, run)
+                self.pending.insert(self.foreground_pending(), job)
+            self.inflight[key] = job
+            job.emit('queued', {'position': self.pending.index(job) + 1})
+            self.cond.notify()
+            return job
+
+    def is_inflight(self, key):
+        """True if a job for key is queued or running"""
+        with self.cond:
+            return key in self.inflight
+
+    def foreground_pending(self):
+        # Caller holds self.cond
+        return sum(1 for job in self.pending if not job.background)
+
+    def promote(self, job):
+        # Caller holds self.cond
+        job.background = False
+        if job in self.pending:
+            self.pending.remove(job)
+            self.pending.insert(self.foreground_pending(), job)
+            job.emit('queued', {'position': self.pending.index(job) + 1})
+
+    def work(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                job = self.pending.pop(0)
+                self.running += 1
+                for position, waiting in enumerate(self.pending, 1):
+                    waiting.emit('queued', {'position': position})
+            metrics.observe('gloat_queue_wait_seconds',
+                            time.monotonic() - job.created,
+                            background=str(job.background).lower())
+            try:
+                job.run(job.emit, job.cancelled)
+            except Exception as e:
+                job.emit('error', {'error': str(e)})
+            finally:
+                with self.cond:
+                    self.running -= 1
+                    if self.inflight.get(job.key) is job:
+                        del self.inflight[job.key]
+                job.finish()
+
+    def follow(self, job, heartbeat=HEARTBEAT_SECONDS):
+        """Yield job's events for one client; see CompileJob.events.
+
+        Stop iterating (or close the generator) when the client goes away.
+        """
+        with self.cond:
+            job.followers += 1
+        try:
+            yield from job.events(heartbeat)
+        finally:
+            with self.cond:
+                job.followers -= 1
+                if job.followers == 0 and not (job.finished or job.background):
+                    self.cancel(job)
+
+    def cancel(self, job):
+        # Caller holds self.cond
+        if job.cancelled.is_set():
+            return
+        job.cancelled.set()
+        self.cancelled += 1
+        # New requests for the same key start a fresh job
+        if self.inflight.get(job.key) is job:
+            del self.inflight[job.key]
+        if job in self.pending:
+            self.pending.remove(job)
+            job.finish()
+            for position, waiting in enumerate(self.pending, 1):
+                waiting.emit('queued', {'position': position})
+
+    def stats(self):
+        with self.cond:
+            return {
+                'workers': self.workers,
+                'running': self.running,
+                'queued': self.foreground_pending(),
+                'background': len(self.pending) - self.foreground_pending(),
+                'max_queue': self.max_queue,
+                'deduplicated': self.deduplicated,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+            }
+
+
+class ExampleIndex:
+    """The bundled example programs, compiled ahead of the first visitor.
+
+    Keeps path -> {mtime, size, key, status} for every example source and
+    queues a background compile for each one not in the cache yet. A
+    poll thread rescans every interval seconds; only files whose mtime or
+    size changed are re-read and re-hashed, so only edited examples are
+    recompiled. An example that fails to compile is retried once it is
+    edited again; one whose compile was cancelled (a visitor took it over
+    and left) is requeued on the next scan.
+    """
+
+    SOURCES = [('yamlscript', '*.ys'), ('clojure', '*.clj')]
+
+    def __init__(self, root, interval, prewarm=True):
+        self.root = Path(root)
+        self.interval = interval
+        self.prewarm = prewarm
+        self.lock = threading.Lock()
+        self.entries = {}  # 'yamlscript/hello.ys' -> entry dict
+
+    def files(self):
+        with self.lock:
+            return sorted(self.entries)
+
+    def scan(self):
+        """Sync the index with the example directories and queue compiles
+        for entries that have no artifact"""
+        seen = {}
+        for subdir, pattern in self.SOURCES:
+            for path in (self.root / subdir).glob(pattern):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                seen[f"{subdir}/{path.name}"] = (path, st.st_mtime_ns, st.st_size)
+
+        with self.lock:
+            for name in set(self.entries) - set(seen):
+                del self.entries[name]
+            changed = []
+            for name, (path, mtime, size) in seen.items():
+                entry = self.entries.get(name)
+                if entry and (entry['mtime'], entry['size']) == (mtime, size):
+                    if (entry['status'] != 'pending'
+                            or scheduler.is_inflight(entry['key'])):
+                        continue
+                try:
+                    source = path.read_text()
+                except (OSError, UnicodeDecodeError):
+                    continue
+                entry = {
+                    'mtime': mtime,
+                    'size': size,
+                    'key': compile_cache.key(source, path.suffix),
+                    'status': 'pending',
+                }
+                self.entries[name] = entry
+                changed.append((name, entry, source, path.suffix))
+
+        for name, entry, source, ext in changed:
+            self.warm(name, entry, source, ext)
+
+    def warm(self, name, entry, source, ext):
+        key = entry['key']
+        if compile_cache.contains(key):
+            entry['status'] = 'cached'
+            return
+        if not self.prewarm:
+            return
+
+        def run(emit, cancel):
+            def record(event, data):
+                if event == 'done':
+                    entry['status'] = 'cached'
+                elif event == 'error' and not cancel.is_set():
+                    entry['status'] = 'failed'
+                    log('prewarm_failed', file=name, error=data.get('error'))
+                emit(event, data)
+            compile_stream(key, source, ext, record, cancel)
+
+        scheduler.submit(key, run, background=True)
+
+    def watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.scan()
+            except Exception as e:
+                log('scan_failed', error=str(e))
+
+    def start(self):
+        self.scan()
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def stats(self):
+        with self.lock:
+            statuses = [entry['status'] for entry in self.entries.values()]
+        return {
+            status: statuses.count(status)
+            for status in ('pending', 'cached', 'failed')
+        }
+
+
+class RunLimit(Exception):
+    """A program run went over one of its limits, named by limit"""
+
+    def __init__(self, limit):
+        super().__init__(f'{limit} limit exceeded')
+        self.limit = limit
+
+
+_work_lock = threading.Lock()
+_work_busy = set()
+
+
+@contextlib.contextmanager
+def source_dir(file):
+    """Directory to write a compile's source file to.
+
+    Every compile of the client file name gets the same directory under
+    WORK_DIR, unless another compile is using it; other compiles get a
+    temporary directory. Build outputs belong elsewhere: the directory is
+    emptied when the next compile takes it.
+    """
+    name = hashlib.sha256(file.encode('utf-8')).hexdigest()[:16] if file else None
+    with _work_lock:
+        shared = name is not None and name not in _work_busy
+        if shared:
+            _work_busy.add(name)
+    if not shared:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield Path(temp_dir)
+        return
+    try:
+        path = WORK_DIR / name
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        yield path
+    finally:
+        with _work_lock:
+            _work_busy.discard(name)
+
+
+def build_program(key, target, source, ext, emit, cancel=None, file=None):
+    """Build source for /api/run, reporting progress as SSE events.
+
+    Compiles with 'gloat -t wasm' (WASI) or '-t bin' on the daemon or
+    through bin/compile.sh, like run_pipeline, and hands the result to
+    runner.store(). file is the client's name for the source (see
+    source_dir).
+    """
+    start = time.monotonic()
+    fields = {}
+    with source_dir(file) as src_path, tempfile.TemporaryDirectory() as temp_dir:
+        source_file = src_path / f'temp{ext}'
+        out_file = Path(temp_dir) / f'program{RUN_TARGETS[target]}'
+        source_file.write_text(source)
+
+        stderr = []
+
+        def on_stdout(text):
+            emit('output', {'stream': 'stdout', 'text': text})
+
+        def on_stderr(text):
+            stderr.append(text)
+            emit('output', {'stream': 'stderr', 'text': text})
+
+        try:
+            emit('progress', {'step': 'build', 'status': 'started'})
+            argv = [str(source_file), '-o', str(out_file), '-t', target]
+            returncode = run_daemon(
+                argv, on_stdout, on_stderr, cancel, PIPELINE_TIMEOUT)
+            if returncode is None:
+                cmd = [str(EXAMPLE_DIR / 'bin' / 'compile.sh'),
+                       str(source_file), str(out_file), target]
+                returncode = run_compile_script(
+                    cmd, on_stdout, on_stderr, cancel, PIPELINE_TIMEOUT)
+            if returncode != 0 or not out_file.exists():
+                raise CompileError(
+                    target, ''.join(stderr) or f'gloat exited {returncode}')
+            runner.store(key, target, out_file)
+
+            ms = round((time.monotonic() - start) * 1000)
+            fields = {'result': 'ok'}
+            emit('progress', {'step': 'build', 'status': 'done', 'ms': ms})
+
+        except CompileError as e:
+            fields = {'result': 'failed'}
+            emit('error', {'step': 'build', 'error': str(e)})
+        except subprocess.TimeoutExpired as e:
+            fields = {'result': 'timeout'}
+            emit('error', {'error': f'Compilation timeout after {e.timeout}s'})
+        except CompileCancelled:
+            fields = {'result': 'cancelled'}
+            emit('error', {'error': 'Compilation cancelled'})
+        except Exception as e:
+            fields = {'result': 'error', 'error': str(e)}
+            emit('error', {'error': str(e)})
+        finally:
+            seconds = time.monotonic() - start
+            metrics.observe('gloat_run_build_seconds', seconds, target=target)
+            log('build', key=key, target=target, ms=round(seconds * 1000),
+                **dict({'result': 'error'}, **fields))
+
+
+class ProgramRunner:
+    """Runs built programs on the server for /api/run.
+
+    Programs are built once per compile cache key and target (see
+    build_program) and kept in root as <key>.bin (native) or <key>.wasm
+    (WASI), the max_programs most recently run ones. A wasm program is
+    also compiled ahead of time to <key>.cwasm. With the wasmtime Python
+    package the modules of the max_modules most recently run wasm
+    programs stay loaded, so a run only instantiates one in a fresh
+    store; without it each run starts 'wasmtime run' on the .cwasm.
+
+    At most workers programs run at once; a run waits up to RUN_SECONDS
+    for its turn. Every run is limited to RUN_SECONDS of wall time, RUN_MEMORY_BYTES of
+    memory and RUN_OUTPUT_BYTES of output. Processes are also limited to
+    RUN_CPU_SECONDS of CPU time; an in-process wasm run is single
+    threaded, so its wall time limit bounds its CPU time.
+    """
+
+    def __init__(self, root, workers, max_programs, max_modules):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(workers)
+        self.max_programs = max_programs
+        self.max_modules = max_modules
+        self.lock = threading.Lock()
+        self.modules = OrderedDict()  # key -> wasmtime.Module, oldest first
+        self.running = 0
+        self.runs = 0
+        self.builds = 0
+        self.module_hits = 0
+        self.module_loads = 0
+        self.engine = None
+        if wasmtime:
+            config = wasmtime.Config()
+            config.epoch_interruption = True
+            self.engine = wasmtime.Engine(config)
+            self.linker = wasmtime.Linker(self.engine)
+            self.linker.define_wasi()
+            threading.Thread(target=self.tick, name='wasm-epoch',
+                             daemon=True).start()
+
+    def tick(self):
+        """Advance the engine's epoch; runs trap once past their deadline"""
+        while True:
+            time.sleep(EPOCH_TICK)
+            self.engine.increment_epoch()
+
+    def path(self, key, target):
+        return self.root / f'{key}.{target}'
+
+    def cwasm(self, key):
+        return self.root / f'{key}.cwasm'
+
+    def ready(self, key, target):
+        if target == 'wasm':
+            return self.cwasm(key).exists()
+        return self.path(key, target).exists()
+
+    def precompile(self, wasm_file, cwasm_file):
+        if self.engine:
+            module = wasmtime.Module.from_file(self.engine, str(wasm_file))
+            cwasm_file.write_bytes(module.serialize())
+        else:
+            subprocess.run(['wasmtime', 'compile', str(wasm_file),
+                            '-o', str(cwasm_file)],
+                           check=True, capture_output=True,
+                           timeout=PIPELINE_TIMEOUT)
+
+    def store(self, key, target, built):
+        """Move a built program into root, compiling a wasm one ahead of
+        time. The files appear whole or not at all."""
+        path = self.path(key, target)
+        tmp = Path(tempfile.mkdtemp(prefix='.tmp-', dir=self.root))
+        try:
+            shutil.copy2(built, tmp / path.name)
+            if target == 'wasm':
+                self.precompile(tmp / path.name, tmp / self.cwasm(key).name)
+                os.replace(tmp / path.name, path)
+                os.replace(tmp / self.cwasm(key).name, self.cwasm(key))
+            else:
+                os.replace(tmp / path.name, path)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        with self.lock:
+            self.builds += 1
+            self.modules.pop(key, None)
+        self.prune()
+
+    def prune(self):
+        """Remove all but the max_programs most recently run programs"""
+        programs = {}
+        for f in self.root.iterdir():
+            if f.name.startswith('.'):
+                continue
+            try:
+                mtime = f.stat().st_mtime
+            except OSError:
+                continue
+            key = f.name.split('.')[0]
+            programs[key] = max(programs.get(key, 0), mtime)
+        stale = sorted(programs, key=programs.get)[:-self.max_programs]
+        for key in stale:
+            for target in list(RUN_TARGETS) + ['cwasm']:
+                (self.root / f'{key}.{target}').unlink(missing_ok=True)
+            with self.lock:
+                self.modules.pop(key, None)
+
+    def module(self, key):
+        """key's loaded wasm module, and whether it was loaded already"""
+        with self.lock:
+            module = self.modules.get(key)
+            if module:
+                self.modules.move_to_end(key)
+                self.module_hits += 1
+                return module, True
+        try:
+            module = wasmtime.Module.deserialize_file(
+                self.engine, str(self.cwasm(key)))
+        except wasmtime.WasmtimeError:
+            # Compiled by another wasmtime version or engine configuration
+            self.precompile(self.path(key, 'wasm'), self.cwasm(key))
+            module = wasmtime.Module.deserialize_file(
+                self.engine, str(self.cwasm(key)))
+        with self.lock:
+            self.module_loads += 1
+            self.modules[key] = module
+            while len(self.modules) > self.max_modules:
+                self.modules.popitem(last=False)
+        return module, False
+
+    def run(self, key, target, args, on_output, cancel=None):
+        """Run key's program with args, passing (stream, text) output
+        chunks to on_output as they arrive.
+
+        Returns {'code', 'limit', 'ms': {'wait', 'load', 'run'}, 'cpu_ms',
+        'loaded'}; limit names the limit that stopped the run, if any,
+        and loaded is true if the wasm module was already in memory.
+        Raises QueueFull if no worker is free in time, and CompileCancelled
+        if cancel is set during the run.
+        """
+        start = time.monotonic()
+        if not self.slots.acquire(timeout=RUN_SECONDS):
+            raise QueueFull()
+        try:
+            result = self.run_slot(key, target, args, on_output, cancel)
+        finally:
+            self.slots.release()
+        result['ms']['wait'] = round(
+            (time.monotonic() - start) * 1000 - sum(result['ms'].values()), 1)
+        return result
+
+    def run_slot(self, key, target, args, on_output, cancel):
+        for path in (self.path(key, target), self.cwasm(key)):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+        written = [0]
+
+        def output(stream, text):
+            room = RUN_OUTPUT_BYTES - written[0]
+            written[0] += len(text)
+            if len(text) > room:
+                # Send what fits, so the output runs right up to the limit
+                if room > 0:
+                    on_output(stream, text[:room])
+                raise RunLimit('output')
+            on_output(stream, text)
+
+        with self.lock:
+            self.running += 1
+            self.runs += 1
+        try:
+            if target == 'wasm' and self.engine:
+                result = self.run_module(key, args, output, cancel)
+            else:
+                result = self.run_command(key, target, args, output, cancel)
+        finally:
+            with self.lock:
+                self.running -= 1
+        metrics.observe('gloat_run_seconds', result['ms']['run'] / 1000,
+                        target=target, result=result['limit'] or 'exit')
+        return result
+
+    def run_module(self, key, args, output, cancel):
+        start = time.monotonic()
+        module, loaded = self.module(key)
+        store = wasmtime.Store(self.engine)
+        store.set_limits(memory_size=RUN_MEMORY_BYTES)
+        store.set_epoch_deadline(math.ceil(RUN_SECONDS / EPOCH_TICK))
+        failed = []
+
+        def writer(stream):
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+            def write(data):
+                # Called by the wasm's fd_write, so it must not raise:
+                # the write fails instead and the run stops once it returns
+                if failed:
+                    return -errno.EPIPE
+                try:
+                    if cancel is not None and cancel.is_set():
+                        raise CompileCancelled()
+                    output(stream, decoder.decode(data))
+                except Exception as e:
+                    failed.append(e)
+                    return -errno.EPIPE
+                return len(data)
+            return write
+
+        wasi = wasmtime.WasiConfig()
+        wasi.argv = ['program'] + list(args)
+        wasi.stdout_custom = writer('stdout')
+        wasi.stderr_custom = writer('stderr')
+        store.set_wasi(wasi)
+        load_ms = (time.monotonic() - start) * 1000
+
+        start = time.monotonic()
+        cpu_start = time.thread_time()
+        code, limit = 0, None
+        try:
+            instance = self.linker.instantiate(store, module)
+            instance.exports(store)['_start'](store)
+        except wasmtime.ExitTrap as e:
+            code = e.code
+        except wasmtime.Trap as e:
+            if e.trap_code == wasmtime.TrapCode.INTERRUPT:
+                limit = 'time'
+            else:
+                code = 1
+                # A program past its output limit usually traps on the
+                # failed write; report the limit, not the trap
+                if not failed:
+                    try:
+                        output('stderr', f'{e.message}\n')
+                    except Exception as error:
+                        failed.append(error)
+        finally:
+            store.close()
+        if failed:
+            if not isinstance(failed[0], RunLimit):
+                raise failed[0]
+            limit = failed[0].limit
+        return {
+            'code': None if limit else code,
+            'limit': limit,
+            'ms': {'load': round(load_ms, 1),
+                   'run': round((time.monotonic() - start) * 1000, 1)},
+            'cpu_ms': round((time.thread_time() - cpu_start) * 1000, 1),
+            'loaded': loaded,
+        }
+
+    def run_command(self, key, target, args, output, cancel):
+        if target == 'wasm':
+            cmd = ['wasmtime', 'run', '--allow-precompiled',
+                   '-W', f'max-memory-size={RUN_MEMORY_BYTES}',
+                   str(self.cwasm(key))]
+        else:
+            cmd = [str(self.path(key, target))]
+
+        def limits():
+            resource.setrlimit(resource.RLIMIT_CPU,
+                               (RUN_CPU_SECONDS, RUN_CPU_SECONDS + 1))
+            # wasmtime reserves address space far beyond what the
+            # module uses; its memory is limited by max-memory-size
+            if target != 'wasm':
+                resource.setrlimit(resource.RLIMIT_AS,
+                                   (RUN_MEMORY_BYTES, RUN_MEMORY_BYTES))
+
+        start = time.monotonic()
+        code, limit, usage = None, None, None
+        try:
+            code, usage = run_process(
+                cmd + list(args),
+                lambda text: output('stdout', text),
+                lambda text: output('stderr', text),
+                cancel, RUN_SECONDS, limits)
+        except subprocess.TimeoutExpired:
+            limit = 'time'
+        except RunLimit as e:
+            limit = e.limit
+        # Only RLIMIT_CPU sends SIGXCPU, and the kernel sends it when the
+        # rusage is still a little under the limit; a SIGKILL is the hard
+        # limit only if the process used its CPU time
+        if code == -signal.SIGXCPU or (
+                code == -signal.SIGKILL and usage and
+                usage.ru_utime + usage.ru_stime >= RUN_CPU_SECONDS):
+            code, limit = None, 'cpu'
+        return {
+            'code': code,
+            'limit': limit,
+            'ms': {'load': 0,
+                   'run': round((time.monotonic() - start) * 1000, 1)},
+            'cpu_ms': usage and round(
+                (usage.ru_utime + usage.ru_stime) * 1000, 1),
+            'loaded': False,
+        }
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'running': self.running,
+                'runs': self.runs,
+                'builds': self.builds,
+                'modules': len(self.modules),
+                'module_hits': self.module_hits,
+                'module_loads': self.module_loads,
+            }
+
+
+class Asset:
+    """A response body ready to send, with its validators and encodings"""
+
+    def __init__(self, path, content_type, build, stat):
+        self.path = path
+        self.content_type = content_type
+        self.build = build
+        self.body = (build or Path.read_bytes)(path)
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+        self.checked = time.monotonic()
+        self.tag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        self.mtime = int(stat.st_mtime)
+        self.encoded = {}  # Content-Encoding -> body
+        if COMPRESSIBLE.match(content_type) and len(self.body) > 1024:
+            # Compressed once per change, so at the highest levels
+            self.encoded['gzip'] = gzip.compress(self.body, 9)
+            if brotli:
+                self.encoded['br'] = brotli.compress(self.body, quality=11)
+
+    def size(self):
+        return len(self.body) + sum(map(len, self.encoded.values()))
+
+    def etag(self, encoding=None):
+        """Strong ETag of the body sent with encoding"""
+        return f'"{self.tag}-{encoding}"' if encoding else f'"{self.tag}"'
+
+
+class AssetCache:
+    """In-memory cache of the responses built from files.
+
+    Static files, example sources and the /api/config JSON are read (and
+    for /api/config, built) once, compressed with gzip and brotli, and
+    then sent from memory. An entry is checked against its file's mtime
+    and size at most every poll seconds, so steady-state requests cost
+    no disk I/O; a changed file is read again, a deleted one dropped.
+    Files over ASSET_FILE_BYTES are not cached, and the least recently
+    used entries are evicted once the total passes max_bytes.
+    """
+
+    def __init__(self, poll, max_bytes):
+        self.poll = poll
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> Asset, oldest first
+        self.bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, key, resolve):
+        """Return the Asset for key, or None if there is no such file.
+
+        On a miss resolve() is called for (path, content_type, build),
+        or None if key names no file; build(path) returns the body to
+        send and defaults to the file's bytes.
+        """
+        with self.lock:
+            asset = self.entries.get(key)
+            if asset:
+                self.entries.move_to_end(key)
+                if time.monotonic() - asset.checked < self.poll:
+                    self.hits += 1
+                    return asset
+        if asset:
+            path, build = asset.path, asset.build
+            content_type = asset.content_type
+        else:
+            resolved = resolve()
+            if not resolved:
+                return None
+            path, content_type, build = resolved
+        try:
+            stat = path.stat()
+        except OSError:
+            self.drop(key)
+            return None
+        if asset and asset.stamp == (stat.st_mtime_ns, stat.st_size):
+            asset.checked = time.monotonic()
+            with self.lock:
+                self.hits += 1
+            return asset
+        if stat.st_size > ASSET_FILE_BYTES:
+            self.drop(key)
+            return None
+        fresh = Asset(path, content_type, build, stat)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.bytes -= old.size()
+            self.entries[key] = fresh
+            self.bytes += fresh.size()
+            self.loads += 1
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.size()
+                self.evictions += 1
+        return fresh
+
+    def drop(self, key):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.bytes -= old.size()
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.bytes,
+                    'hits': self.hits, 'loads': self.loads,
+                    'evictions': self.evictions}
+
+
+def config_json(path):
+    """config.yaml as the JSON that /api/config sends.
+
+    Read with PyYAML when it is installed, and with 'ys -J' otherwise.
+    """
+    if yaml:
+        with open(path, 'rb') as f:
+            try:
+                config = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f'{path}: {e}') from e
+    else:
+        result = subprocess.run(['ys', '-J', str(path)], capture_output=True,
+                                check=True, timeout=30)
+        config = json.loads(result.stdout)
+    return json.dumps(config or {}).encode('utf-8')
+
+
+compile_cache = None
+scheduler = None
+examples = None
+runner = None
+assets = None
+
+class GloatHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep-alive: every response has a Content-Length, except SSE streams,
+    # which close their connection
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_SECONDS
+
+    def do_GET(self):
+        parsed_path = urlparse(self.path)
+        path = parsed_path.path
+
+        # API: List files
+        if path == '/api/files':
+            self.send_json_response(self.list_files(), conditional=True)
+
+        # API: Get config
+        elif path == '/api/config':
+            self.serve_config()
+
+        # API: Compile cache counters
+        elif path == '/api/cache':
+            self.send_json_response(compile_cache.stats())
+
+        # API: Compile queue state
+        elif path == '/api/queue':
+            self.send_json_response(
+                dict(scheduler.stats(), examples=examples.stats()))
+
+        # API: Prometheus metrics
+        elif path == '/api/metrics':
+            self.serve_metrics()
+
+        # API: Compiled wasm, by the artifact id from the 'done' event
+        elif path.startswith('/api/artifact/'):
+            self.serve_artifact(path[14:])  # Remove '/api/artifact/'
+
+        # API: Get source
+        elif path.startswith('/api/source/'):
+            source_path = unquote(path[12:])  # Remove '/api/source/'
+            self.serve_source(source_path)
+
+        # Default: serve static files
+        else:
+            self.serve_static()
+
+    def do_HEAD(self):
+        self.serve_static(head=True)
+
+    def do_POST(self):
+        if self.path == '/api/run':
+            self.run_program()
+        elif self.path == '/api/compile':
+            content_length = int(self.headers['Content-Length'])
+            body = self.rfile.read(content_length)
+            data = json.loads(body)
+            source, ext = data['source'], data['ext']
+            file = str(data.get('file') or '')
+
+            key = compile_cache.key(source, ext)
+            cached = compile_cache.get(key)
+            try:
+                job = None if cached else scheduler.submit(
+                    key, lambda emit, cancel: compile_stream(
+                        key, source, ext, emit, cancel, file))
+            except QueueFull:
+                self.send_json_error(
+                    503, 'Compile queue is full, try again shortly',
+                    {'Retry-After': '10'})
+                return
+
+            # Send SSE headers for streaming progress
+            self.send_sse_headers()
+
+            # Stream compilation progress; cache hits skip the queue
+            try:
+                if cached:
+                    replay_cached(*cached, self.send_sse)
+                    return
+                events = scheduler.follow(job)
+                try:
+                    for event, event_data in events:
+                        if event:
+                            self.send_sse(event, event_data)
+                        else:
+                            self.send_sse_comment('keepalive')
+                finally:
+                    # Cancels the build if no other request follows it
+                    events.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        else:
+            self.send_error(404)
+
+    def run_program(self):
+        """Run a program on the server, streaming its output as SSE.
+
+        The body is {source, ext} or {artifact} (the key of an earlier
+        run's program), plus optional args, target ('wasm' or 'bin') and
+        file (the client's name for the source, see source_dir).
+        A program that isn't built yet is built through the compile queue
+        first, with the same 'queued', 'progress' and 'output' events as
+        a compile. Then come a 'run' event, 'stdout' and 'stderr' events
+        as the program writes, and an 'exit' event with its exit code (or
+        the limit that stopped it) and timings.
+        """
+        try:
+            content_length = int(self.headers['Content-Length'])
+            data = json.loads(self.rfile.read(content_length))
+        except (TypeError, ValueError):
+            self.send_json_error(400, 'Body must be a JSON object')
+            return
+        if not isinstance(data, dict):
+            self.send_json_error(400, 'Body must be a JSON object')
+            return
+        target = data.get('target', 'wasm')
+        if not isinstance(target, str) or target not in RUN_TARGETS:
+            self.send_json_error(400, f"Unknown run target '{target}'")
+            return
+        if not isinstance(data.get('args', []), list):
+            self.send_json_error(400, 'args must be a list')
+            return
+        args = [str(arg) for arg in data.get('args', [])]
+        if 'source' in data:
+            source, ext = data['source'], data.get('ext')
+            if not isinstance(source, str) or not isinstance(ext, str):
+                self.send_json_error(400, 'source and ext must be strings')
+                return
+            key = compile_cache.key(source, ext)
+        else:
+            key = data.get('artifact', '')
+            if not isinstance(key, str) or not ARTIFACT_ID.match(key):
+                self.send_json_error(400, 'Bad artifact id')
+                return
+
+        job = None
+        if not runner.ready(key, target):
+            if 'source' not in data:
+                self.send_json_error(
+                    404, 'Program not built; send its source to build it')
+                return
+            try:
+                job = scheduler.submit(
+                    f'{key}.{target}', lambda emit, cancel: build_program(
+                        key, target, source, ext, emit, cancel,
+                        str(data.get('file') or '')))
+            except QueueFull:
+                self.send_json_error(
+                    503, 'Compile queue is full, try again shortly',
+                    {'Retry-After': '10'})
+                return
+
+        self.send_sse_headers()
+
+        start = time.monotonic()
+        fields = {}
+        try:
+            if job:
+                events = scheduler.follow(job)
+                try:
+                    for event, event_data in events:
+                        if event:
+                            self.send_sse(event, event_data)
+                        else:
+                            self.send_sse_comment('keepalive')
+                finally:
+                    # Cancels the build if no other request follows it
+                    events.close()
+                if not runner.ready(key, target):
+                    fields = {'result': 'failed'}
+                    return  # The build sent its error
+            build_ms = round((time.monotonic() - start) * 1000)
+
+            self.send_sse('run', {'status': 'started', 'artifact': key,
+                                  'target': target, 'built': bool(job)})
+            result = runner.run(
+                key, target, args,
+                lambda stream, text: self.send_sse(stream, {'text': text}))
+            result['ms']['build'] = build_ms
+            fields = {'result': result['limit'] or 'exit',
+                      'code': result['code'], 'stage_ms': result['ms']}
+            self.send_sse('exit', result)
+        except (BrokenPipeError, ConnectionResetError, CompileCancelled):
+            fields = {'result': 'cancelled'}
+        except QueueFull:
+            fields = {'result': 'busy'}
+            self.send_sse('error', {'error': 'All runners are busy, try again shortly'})
+        except Exception as e:
+            fields = {'result': 'error', 'error': str(e)}
+            self.send_sse('error', {'error': str(e)})
+        finally:
+            log('run', key=key, target=target, args=len(args),
+                ms=round((time.monotonic() - start) * 1000), **fields)
+
+    def serve_config(self):
+        """Send config.yaml as JSON, built once per change of the file"""
+        def resolve():
+            path = EXAMPLE_DIR / 'config.yaml'
+            return path.is_file() and (path, 'application/json', config_json)
+
+        try:
+            asset = assets.get('config', resolve)
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            log('error', message='Could not read config.yaml', error=str(e))
+            self.send_json_error(500, 'Could not read config.yaml')
+            return
+        if asset:
+            self.send_asset(asset)
+        else:
+            self.send_json_response({})
+
+    def list_files(self):
+        return examples.files()
+
+    def serve_source(self, source_path):
+        def resolve():
+            root = EXAMPLE_DIR.resolve()
+            path = (root / source_path).resolve()
+            return (path.is_relative_to(root) and path.is_file()
+                    and (path, 'text/plain; charset=utf-8', None))
+
+        asset = assets.get(f'source:{source_path}', resolve)
+        if asset:
+            self.send_asset(asset)
+        else:
+            self.send_error(404, "File not found")
+
+    def serve_static(self, head=False):
+        """Send a file below the example directory from the asset cache,
+        falling back to SimpleHTTPRequestHandler for the rest
+        (directory listings, redirects, files too big to cache)"""
+        path = urlparse(self.path).path
+
+        def resolve():
+            file_path = Path(self.translate_path(self.path))
+            if file_path.is_dir():
+                if not path.endswith('/'):
+                    return None  # The parent class redirects to path + '/'
+                file_path = file_path / 'index.html'
+            return (file_path.is_file()
+                    and (file_path, self.guess_type(str(file_path)), None))
+
+        asset = assets.get(f'static:{path}', resolve)
+        if asset:
+            self.send_asset(asset, head)
+        elif head:
+            super().do_HEAD()
+        else:
+            super().do_GET()
+
+    def etag_matches(self, etag):
+        """True if If-None-Match lists etag, with any encoding suffix"""
+        tag = etag.strip('"').split('-')[0]
+        for candidate in self.headers.get('If-None-Match', '').split(','):
+            candidate = candidate.strip().removeprefix('W/').strip('"')
+            if candidate == '*' or candidate.split('-')[0] == tag:
+                return True
+        return False
+
+    def send_not_modified(self, etag, asset=None):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        if asset:
+            self.send_header('Last-Modified', asset.last_modified)
+            if asset.encoded:
+                self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+    def send_asset(self, asset, head=False):
+        """Send an Asset, or 304 if the client's copy is current.
+
+        The ETag names the encoding sent, so each encoding of a body has
+        its own. If-Modified-Since counts only without If-None-Match.
+        """
+        accepted = {e.split(';')[0].strip()
+                    for e in self.headers.get('Accept-Encoding', '').split(',')}
+        encoding = next((e for e in ('br', 'gzip')
+                         if e in asset.encoded and e in accepted), None)
+        etag = asset.etag(encoding)
+        if 'If-None-Match' in self.headers:
+            fresh = self.etag_matches(etag)
+        else:
+            since = self.headers.get('If-Modified-Since')
+            try:
+                fresh = bool(since) and (
+                    email.utils.parsedate_to_datetime(since).timestamp()
+                    >= asset.mtime)
+            except (TypeError, ValueError):
+                fresh = False
+        if fresh:
+            self.send_not_modified(etag, asset)
+            return
+
+        body = asset.encoded[encoding] if encoding else asset.body
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if asset.encoded:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', asset.last_modified)
+        # Always revalidate: the files change while the server runs
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def serve_artifact(self, artifact_id):
+        """Send a cached wasm artifact as application/wasm.
+
+        Artifact ids are cache keys, so the content never changes: clients
+        may cache it forever and revalidate with If-None-Match. A gzip or
+        br variant is sent when accepted, and the file goes out with
+        sendfile(2) rather than through Python buffers.
+        """
+        if not ARTIFACT_ID.match(artifact_id):
+            self.send_error(404, "Artifact not found")
+            return
+
+        etag = f'"{artifact_id}"'
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        accepted = {e.split(';')[0].strip()
+                    for e in self.headers.get('Accept-Encoding', '').split(',')}
+        opened = compile_cache.open_artifact(artifact_id, accepted)
+        if not opened:
+            self.send_error(404, "Artifact not found")
+            return
+
+        artifact, encoding = opened
+        with artifact:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/wasm')
+            self.send_header('Content-Length', str(os.fstat(artifact.fileno()).st_size))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            try:
+                self.connection.sendfile(artifact)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def serve_metrics(self):
+        gauges = []
+        for prefix, stats, help_text in [
+                ('gloat_cache', compile_cache.stats(), 'Compile cache'),
+                ('gloat_queue', scheduler.stats(), 'Compile scheduler'),
+                ('gloat_examples', examples.stats(), 'Bundled examples'),
+                ('gloat_runner', runner.stats(), 'Program runner'),
+                ('gloat_assets', assets.stats(), 'Asset cache')]:
+            for name, value in stats.items():
+                if name in ('hits', 'misses', 'evictions', 'deduplicated',
+                            'rejected', 'cancelled', 'runs', 'builds',
+                            'module_hits', 'module_loads', 'loads'):
+                    gauges.append((f'{prefix}_{name}_total', 'counter',
+                                   f'{help_text} {name}', value))
+                else:
+                    gauges.append((f'{prefix}_{name}', 'gauge',
+                                   f'{help_text} {name}', value))
+        body = metrics.render(gauges).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_one_request(self):
+        self.started = time.monotonic()
+        self.status = None
+        super().handle_one_request()
+        if self.status is not None:
+            log('request', client=self.client_address[0],
+                method=self.command, path=self.path, status=self.status,
+                ms=round((time.monotonic() - self.started) * 1000))
+
+    def log_request(self, code='-', size='-'):
+        # Logged once the request is done, by handle_one_request
+        self.status = int(code) if isinstance(code, int) else code
+
+    def log_error(self, format, *args):
+        # An idle keep-alive connection timing out is routine
+        if not format.startswith('Request timed out'):
+            super().log_error(format, *args)
+
+    def log_message(self, format, *args):
+        log('http', client=self.client_address[0], message=format % args)
+
+    def send_sse_headers(self):
+        """Start a Server-Sent Events response. The stream has no length,
+        so the connection closes when it ends."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+    def send_sse(self, event, data):
+        """Send a Server-Sent Event"""
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        self.wfile.write(message.encode('utf-8'))
+        self.wfile.flush()
+
+    def send_sse_comment(self, text):
+        """Send an SSE comment line; fails fast if the client is gone"""
+        self.wfile.write(f": {text}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def send_json_error(self, status, message, headers=None):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_response(self, data, conditional=False):
+        """Send data as JSON; conditional adds an ETag and answers a
+        matching If-None-Match with 304"""
+        body = json.dumps(data).encode('utf-8')
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"' if conditional else None
+        if etag and self.etag_matches(etag):
+            self.send_not_modified(etag)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+if __name__ == '__main__':
+    # Change to example directory to serve static files from there
+    os.chdir(EXAMPLE_DIR)
+
+    compile_cache = CompileCache(CACHE_DIR, CACHE_MAX_BYTES)
+
+    workers = int(os.environ.get('GLOAT_DEMO_WORKERS', os.cpu_count() or 1))
+    max_queue = int(os.environ.get('GLOAT_DEMO_QUEUE', workers * 4))
+    scheduler = CompileScheduler(workers, max_queue)
+
+    examples = ExampleIndex(
+        EXAMPLE_DIR,
+        float(os.environ.get('GLOAT_DEMO_POLL', '2')),
+        prewarm=os.environ.get('GLOAT_DEMO_PREWARM', '1') != '0')
+    examples.start()
+
+    assets = AssetCache(float(os.environ.get('GLOAT_DEMO_POLL', '2')),
+                        ASSET_MAX_BYTES)
+
+    runner = ProgramRunner(
+        RUN_DIR,
+        int(os.environ.get('GLOAT_DEMO_RUN_WORKERS', os.cpu_count() or 1)),
+        RUN_PROGRAMS, RUN_MODULES)
+
+    log('startup', example_dir=EXAMPLE_DIR.resolve(),
+        project_dir=PROJECT_DIR.resolve(), cache_dir=CACHE_DIR,
+        cache_entries=len(compile_cache.entries), workers=workers,
+        max_queue=max_queue, examples=examples.stats(),
+        daemon=DAEMON_SOCKET.is_socket(), run_dir=RUN_DIR,
+        wasm_runner='wasmtime-py' if runner.engine else 'wasmtime-cli')
+
+    # Create server with address reuse enabled to avoid "Address already in use" errors
+    class ReusableHTTPServer(http.server.ThreadingHTTPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    with ReusableHTTPServer(("", PORT), GloatHandler) as httpd:
+        print(f"Starting server on http://localhost:{PORT}")
+        print("Press Ctrl+C to stop")
+        httpd.serve_forever()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""FFI call-overhead benchmarks for the so-bindings languages.
+
+Each language's bench program calls the example library in a fixed
+workload: `calls` timed calls (after `warmup` untimed ones) of
+factorial(20), greet("World") and sort_json_array on a JSON array of
+`size` integers. String results are read into a host string and
+released with gloat_free. The program reads BENCH_CALLS, BENCH_SIZE
+and BENCH_WARMUP and prints one line per workload:
+
+  NAME CALLS ELAPSED_NS
+
+Usage:
+  bench.py run [options] -o LANG.json -- CMD...
+                               Run one bench program; write its results
+  bench.py report [--baseline DIR] [DIR]
+                               Compare the languages in DIR (default
+                               bench-results/) and flag regressions
+                               against the results in a baseline DIR
+
+report exits 1 if it finds a regression.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent
+RESULTS_DIR = BENCH_DIR / 'bench-results'
+
+SCHEMA = 1
+WORKLOADS = ['factorial', 'greet', 'sort_json_array']
+
+# Compared metrics -> smallest change worth reporting
+THRESHOLDS = {'ns_per_call': 20, 'peak_rss_kb': 4096}
+
+
+def progress(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def run(opts):
+    """Run a bench program; return its result record"""
+    language = opts.language or Path.cwd().name
+    env = dict(os.environ,
+               BENCH_CALLS=str(opts.calls),
+               BENCH_SIZE=str(opts.size),
+               BENCH_WARMUP=str(opts.calls // 10 if opts.warmup is None
+                                else opts.warmup))
+    progress(f'bench {language}: {opts.calls} calls, size {opts.size}')
+    with tempfile.TemporaryFile() as out:
+        start = time.monotonic()
+        proc = subprocess.Popen(opts.command, stdin=subprocess.DEVNULL,
+                                stdout=out, env=env)
+        # wait4 rather than proc.wait() to get the resource usage
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.monotonic() - start
+        out.seek(0)
+        stdout = out.read().decode('utf-8', 'replace')
+    code = os.waitstatus_to_exitcode(status)
+    if code != 0:
+        sys.exit(f'bench {language}: {" ".join(opts.command)} exited {code}')
+
+    results = []
+    for line in stdout.splitlines():
+        fields = line.split()
+        if len(fields) != 3 or fields[0] not in WORKLOADS:
+            continue
+        name, calls, elapsed = fields[0], int(fields[1]), int(fields[2])
+        results.append({
+            'name': name,
+            'calls': calls,
+            'ns_per_call': round(elapsed / calls, 1),
+            'calls_per_sec': round(calls * 1e9 / elapsed) if elapsed else None,
+        })
+    missing = set(WORKLOADS) - {r['name'] for r in results}
+    if missing:
+        sys.exit(f"bench {language}: no result for {', '.join(sorted(missing))}")
+
+    return {
+        'schema': SCHEMA,
+        'language': language,
+        'gloat_version': os.environ.get('GLOAT_VERSION'),
+        'glojure_version': os.environ.get('GLOJURE_VERSION'),
+        'engine': os.environ.get('GLOAT_ENGINE', 'glj'),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': {
+            'system': platform.system(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'workload': {'calls': opts.calls, 'size': opts.size,
+                     'warmup': int(env['BENCH_WARMUP'])},
+        'wall_ms': round(wall * 1000),
+        # ru_maxrss is in bytes on macOS, KiB elsewhere
+        'peak_rss_kb': usage.ru_maxrss // (1024 if sys.platform == 'darwin' else 1),
+        'results': results,
+    }
+
+
+def read_results(path):
+    """Result records from a result file or a directory of them"""
+    path = Path(path)
+    files = sorted(path.glob('*.json')) if path.is_dir() else [path]
+    records = []
+    for file in files:
+        record = json.loads(file.read_text())
+        if record.get('schema') != SCHEMA:
+            sys.exit(f'{file}: not a bench.py schema {SCHEMA} result file')
+        records.append(record)
+    if not records:
+        sys.exit(f'{path}: no bench results')
+    return records
+
+
+def versions(records):
+    return ', '.join(sorted({
+        f"gloat {r['gloat_version']} glojure {r['glojure_version']} "
+        f"({r['engine']})" for r in records}))
+
+
+def compare(baseline, current, threshold):
+    """Regressions in current against baseline: metrics more than
+    threshold (a fraction) and THRESHOLDS[metric] worse."""
+    old = {r['language']: r for r in baseline}
+    regressions = []
+    for record in current:
+        before = old.get(record['language'])
+        if not before:
+            continue
+        metrics = [('peak_rss_kb', None, before['peak_rss_kb'],
+                    record['peak_rss_kb'])]
+        was = {r['name']: r['ns_per_call'] for r in before['results']}
+        metrics += [('ns_per_call', r['name'], was.get(r['name']),
+                     r['ns_per_call']) for r in record['results']]
+        for metric, name, was, now in metrics:
+            if was is None:
+                continue
+            if now - was > max(was * threshold, THRESHOLDS[metric]):
+                regressions.append({
+                    'language': record['language'], 'workload': name,
+                    'metric': metric, 'old': was, 'new': now,
+                    'change': f'{(now - was) / max(was, 1):+.0%}'})
+    return regressions
+
+
+def report(opts):
+    records = read_results(opts.results)
+    print(f'# {versions(records)}')
+    print('# ' + ', '.join(sorted({
+        f"{r['workload']['calls']} calls, size {r['workload']['size']}"
+        for r in records})))
+    for name in WORKLOADS:
+        rows = sorted(((r['language'], result, r['peak_rss_kb'])
+                       for r in records for result in r['results']
+                       if result['name'] == name),
+                      key=lambda row: row[1]['ns_per_call'])
+        fastest = rows[0][1]['ns_per_call']
+        print(f'\n{name}:')
+        print(f"  {'language':<10} {'ns/call':>12} {'calls/s':>12} "
+              f"{'vs best':>8} {'peak RSS':>10}")
+        for language, result, rss in rows:
+            print(f"  {language:<10} {result['ns_per_call']:>12,.1f} "
+                  f"{result['calls_per_sec'] or 0:>12,} "
+                  f"{result['ns_per_call'] / fastest:>7.1f}x "
+                  f"{rss // 1024:>7} MB")
+
+    if not opts.baseline:
+        return
+    baseline = read_results(opts.baseline)
+    progress(f'\nBaseline: {versions(baseline)}')
+    regressions = compare(baseline, records, opts.threshold)
+    for r in regressions:
+        progress(f"REGRESSION {r['language']}"
+                 f"{' ' + r['workload'] if r['workload'] else ''}: "
+                 f"{r['metric']} {r['old']} -> {r['new']} ({r['change']})")
+    progress(f'{len(regressions)} regression(s)')
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='action', required=True)
+
+    run_parser = commands.add_parser('run', help='run one bench program')
+    run_parser.add_argument('command', nargs='+', metavar='CMD')
+    run_parser.add_argument('-o', '--output', help='write results here')
+    run_parser.add_argument('-l', '--language',
+                            help='language name (default: the directory name)')
+    run_parser.add_argument('--calls', type=int, default=20000,
+                            help='timed calls per workload (default: %(default)s)')
+    run_parser.add_argument('--size', type=int, default=100,
+                            help='sort_json_array input size (default: %(default)s)')
+    run_parser.add_argument('--warmup', type=int,
+                            help='untimed calls first (default: calls / 10)')
+
+    report_parser = commands.add_parser('report', help='compare languages')
+    report_parser.add_argument('results', nargs='?', default=str(RESULTS_DIR),
+                               metavar='DIR')
+    report_parser.add_argument('--baseline', metavar='DIR',
+                               help='flag regressions against these results')
+    report_parser.add_argument('--threshold', type=float, default=0.10,
+                               help='relative slowdown that counts as a '
+                                    'regression (default: %(default)s)')
+    opts = parser.parse_args()
+
+    if opts.action == 'report':
+        report(opts)
+        return
+
+    text = json.dumps(run(opts), indent=2) + '\n'
+    if opts.output:
+        Path(opts.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(opts.output).write_text(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == '__main__':
+    main()
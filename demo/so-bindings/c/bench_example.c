@@ -0,0 +1,50 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include "example.h"
+
+// Workload protocol: see ../bench.py
+static long long env_int(const char *name, long long fallback) {
+    const char *value = getenv(name);
+    return value ? atoll(value) : fallback;
+}
+
+static long long now_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000000000LL + ts.tv_nsec;
+}
+
+#define BENCH(label, body) do {                                    \
+    for (long long i = 0; i < warmup; i++) { body; }               \
+    long long start = now_ns();                                    \
+    for (long long i = 0; i < calls; i++) { body; }                \
+    printf("%s %lld %lld\n", label, calls, now_ns() - start);      \
+} while (0)
+
+int main(void) {
+    long long calls = env_int("BENCH_CALLS", 20000);
+    long long size = env_int("BENCH_SIZE", 100);
+    long long warmup = env_int("BENCH_WARMUP", calls / 10);
+    volatile size_t sink = 0;
+
+    // [size, size-1, ..., 1]
+    char *json = malloc(size * 21 + 3);
+    char *p = json;
+    *p++ = '[';
+    for (long long n = size; n > 0; n--)
+        p += sprintf(p, n > 1 ? "%lld," : "%lld", n);
+    strcpy(p, "]");
+
+    char name[] = "World";
+    char *s;
+
+    BENCH("factorial", sink += factorial(20));
+    BENCH("greet", s = greet(name); sink += strlen(s); gloat_free(s));
+    BENCH("sort_json_array",
+          s = sort_json_array(json); sink += strlen(s); gloat_free(s));
+
+    free(json);
+    return 0;
+}
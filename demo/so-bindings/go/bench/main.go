@@ -0,0 +1,68 @@
+package main
+
+/*
+#cgo CFLAGS: -I../..
+#cgo linux LDFLAGS: -L../.. -l:example.so
+#cgo darwin LDFLAGS: -L../.. -lexample
+#include "example.h"
+#include <stdlib.h>
+*/
+import "C"
+import (
+	"fmt"
+	"os"
+	"strconv"
+	"strings"
+	"time"
+	"unsafe"
+)
+
+// Workload protocol: see ../../bench.py
+func envInt(name string, fallback int) int {
+	if n, err := strconv.Atoi(os.Getenv(name)); err == nil {
+		return n
+	}
+	return fallback
+}
+
+func bench(name string, calls, warmup int, call func()) {
+	for i := 0; i < warmup; i++ {
+		call()
+	}
+	start := time.Now()
+	for i := 0; i < calls; i++ {
+		call()
+	}
+	fmt.Println(name, calls, time.Since(start).Nanoseconds())
+}
+
+func main() {
+	calls := envInt("BENCH_CALLS", 20000)
+	size := envInt("BENCH_SIZE", 100)
+	warmup := envInt("BENCH_WARMUP", calls/10)
+
+	items := make([]string, size)
+	for i := range items {
+		items[i] = strconv.Itoa(size - i)
+	}
+	json := C.CString("[" + strings.Join(items, ",") + "]")
+	defer C.free(unsafe.Pointer(json))
+	world := C.CString("World")
+	defer C.free(unsafe.Pointer(world))
+
+	var sink int
+	bench("factorial", calls, warmup, func() {
+		sink += int(C.factorial(20))
+	})
+	bench("greet", calls, warmup, func() {
+		s := C.greet(world)
+		sink += len(C.GoString(s))
+		C.gloat_free(unsafe.Pointer(s))
+	})
+	bench("sort_json_array", calls, warmup, func() {
+		s := C.sort_json_array(json)
+		sink += len(C.GoString(s))
+		C.gloat_free(unsafe.Pointer(s))
+	})
+	_ = sink
+}
@@ -0,0 +1,34 @@
+// Workload protocol: see ../bench.py
+const koffi = require('koffi');
+
+const libExt = process.platform === 'darwin' ? 'dylib' : 'so';
+const lib = koffi.load(`example.${libExt}`);
+
+// Returned strings are released with gloat_free after decoding
+const gloatFree = lib.func('void gloat_free(void* p)');
+const HeapStr = koffi.disposable('HeapStr', 'str', gloatFree);
+const factorial = lib.func('long long factorial(long long n)');
+const greet = lib.func('HeapStr greet(const char* name)');
+const sortJsonArray = lib.func('HeapStr sort_json_array(const char* json)');
+
+const env = (name, fallback) => {
+  const n = parseInt(process.env[name], 10);
+  return Number.isNaN(n) ? fallback : n;
+};
+const calls = env('BENCH_CALLS', 20000);
+const size = env('BENCH_SIZE', 100);
+const warmup = env('BENCH_WARMUP', Math.floor(calls / 10));
+
+const json = JSON.stringify(Array.from({length: size}, (_, i) => size - i));
+
+let sink = 0;
+const bench = (name, call) => {
+  for (let i = 0; i < warmup; i++) call();
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < calls; i++) call();
+  console.log(`${name} ${calls} ${process.hrtime.bigint() - start}`);
+};
+
+bench('factorial', () => { sink += Number(factorial(20)); });
+bench('greet', () => { sink += greet('World').length; });
+bench('sort_json_array', () => { sink += sortJsonArray(json).length; });
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare the data (MessagePack) and JSON ways of passing arrays.
+
+Usage: bench-data.py [-h] [--floats] [--budget SECONDS] [sizes...]
+
+Sorts random arrays of each size (default 1e3 1e4 1e5 1e6) with the
+batch library's sort_json, which takes and returns a JSON string, and
+sort_data, which takes and returns data, through the generated
+batch_bindings module (`make bench-data` builds it). Both sort
+the same way, so the difference is the cost of the encodings: json.dumps
+and json.loads plus the library's JSON parse and print, against packb and
+unpackb plus the library's MessagePack decode and encode.
+
+Each size runs for about --budget seconds per encoding (at least once)
+and prints the mean time per call and the share of it spent encoding and
+decoding in Python. Exits 1 if the two disagree on a result.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import batch_bindings as batch  # noqa: E402
+
+parser = argparse.ArgumentParser(
+    description=__doc__.split('\n\n')[0],
+    formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('sizes', nargs='*', type=lambda s: int(float(s)),
+                    default=[10**3, 10**4, 10**5, 10**6])
+parser.add_argument('--floats', action='store_true',
+                    help='sort floats instead of integers')
+parser.add_argument('--budget', type=float, default=1.0,
+                    help='seconds per size and encoding (default: %(default)s)')
+opts = parser.parse_args()
+
+
+def via_json(items):
+    return json.loads(batch.sort_json(json.dumps(items)))
+
+
+def via_data(items):
+    return batch.sort_data(items)
+
+
+# The Python side of each: encode the input, decode a same-sized result
+def json_codec(items):
+    return json.loads(json.dumps(items))
+
+
+def data_codec(items):
+    return batch.unpackb(bytes(batch.packb(items)))
+
+
+def timed(call, items):
+    """(mean seconds per call, result) over about opts.budget seconds"""
+    calls, elapsed = 0, 0.0
+    while calls == 0 or elapsed < opts.budget:
+        start = time.perf_counter()
+        result = call(items)
+        elapsed += time.perf_counter() - start
+        calls += 1
+    return elapsed / calls, result
+
+
+batch.load()
+print(f"# {'float' if opts.floats else 'int'} arrays, "
+      f"{batch.backend} backend")
+print(f"{'size':>9} {'json ms':>10} {'py share':>8} "
+      f"{'data ms':>10} {'py share':>8} {'speedup':>8}")
+wrong = False
+for size in opts.sizes:
+    rng = random.Random(size)
+    items = ([rng.uniform(-1e9, 1e9) for _ in range(size)] if opts.floats
+             else [rng.randint(-10**12, 10**12) for _ in range(size)])
+    json_time, json_result = timed(via_json, items)
+    data_time, data_result = timed(via_data, items)
+    if json_result != data_result or data_result != sorted(items):
+        print(f'{size}: sort_json and sort_data results differ')
+        wrong = True
+    print(f"{size:>9,} {json_time * 1e3:>10.2f} "
+          f"{timed(json_codec, items)[0] / json_time:>8.0%} "
+          f"{data_time * 1e3:>10.2f} "
+          f"{timed(data_codec, items)[0] / data_time:>8.0%} "
+          f"{json_time / data_time:>7.1f}x", flush=True)
+sys.exit(1 if wrong else 0)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark calls into the example library via ctypes.
+
+Usage: bench_example.py [path-to-library]
+Reads BENCH_CALLS, BENCH_SIZE and BENCH_WARMUP; see ../bench.py.
+"""
+
+import ctypes
+import json
+import os
+import sys
+import time
+
+if len(sys.argv) > 1:
+    lib_path = os.path.abspath(sys.argv[1])
+elif sys.platform == "darwin":
+    lib_path = "example.dylib"
+elif sys.platform == "win32":
+    lib_path = os.path.abspath("example.dll")
+else:
+    lib_path = "example.so"
+lib = ctypes.CDLL(lib_path)
+
+lib.gloat_free.argtypes = [ctypes.c_void_p]
+lib.gloat_free.restype = None
+lib.factorial.argtypes = [ctypes.c_longlong]
+lib.factorial.restype = ctypes.c_longlong
+for fn in (lib.greet, lib.sort_json_array):
+    fn.argtypes = [ctypes.c_char_p]
+    fn.restype = ctypes.c_void_p
+
+calls = int(os.environ.get("BENCH_CALLS", 20000))
+size = int(os.environ.get("BENCH_SIZE", 100))
+warmup = int(os.environ.get("BENCH_WARMUP", calls // 10))
+
+factorial = lib.factorial
+greet = lib.greet
+sort_json_array = lib.sort_json_array
+free = lib.gloat_free
+string_at = ctypes.string_at
+data = json.dumps(list(range(size, 0, -1))).encode()
+
+
+def call_factorial():
+    factorial(20)
+
+
+def call_greet():
+    p = greet(b"World")
+    string_at(p).decode()
+    free(p)
+
+
+def call_sort_json_array():
+    p = sort_json_array(data)
+    string_at(p).decode()
+    free(p)
+
+
+for name, call in [("factorial", call_factorial),
+                   ("greet", call_greet),
+                   ("sort_json_array", call_sort_json_array)]:
+    for _ in range(warmup):
+        call()
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        call()
+    print(name, calls, time.perf_counter_ns() - start)
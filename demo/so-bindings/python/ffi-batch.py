@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Call the buffer-typed exports of the batch shared library via ctypes.
+
+Usage: ffi-batch.py [path-to-library]
+With no argument, loads batch.{so,dylib,dll} for the platform.
+
+Buffers go in as a pointer and a length, taken without copying from
+array.array, bytearray or NumPy data. Returned buffers are malloc'd
+and released with gloat_free once read.
+"""
+
+import array
+import ctypes
+import os
+import sys
+import time
+
+if len(sys.argv) > 1:
+    lib_path = os.path.abspath(sys.argv[1])
+elif sys.platform == "darwin":
+    lib_path = "batch.dylib"
+elif sys.platform == "win32":
+    lib_path = os.path.abspath("batch.dll")
+else:
+    lib_path = "batch.so"
+lib = ctypes.CDLL(lib_path)
+lib.gloat_free.argtypes = [ctypes.c_void_p]
+lib.gloat_free.restype = None
+
+c_longlong_p = ctypes.POINTER(ctypes.c_longlong)
+c_double_p = ctypes.POINTER(ctypes.c_double)
+
+# factorials([int]) -> [int]
+lib.factorials.argtypes = [c_longlong_p, ctypes.c_longlong, c_longlong_p]
+lib.factorials.restype = c_longlong_p
+
+# mean([float]) -> float
+lib.mean.argtypes = [c_double_p, ctypes.c_longlong]
+lib.mean.restype = ctypes.c_double
+
+# reverse_bytes(bytes) -> bytes
+lib.reverse_bytes.argtypes = [ctypes.c_char_p, ctypes.c_longlong,
+                              c_longlong_p]
+lib.reverse_bytes.restype = ctypes.c_void_p
+
+
+def buffer_arg(buf, ctype):
+    """Zero-copy pointer and length for a writable buffer"""
+    view = memoryview(buf).cast("B")
+    count = view.nbytes // ctypes.sizeof(ctype)
+    return (ctype * count).from_buffer(view), count
+
+
+def take_buffer(ptr, length, ctype):
+    """Copy a returned buffer into Python and free it"""
+    try:
+        return list(ctypes.cast(ptr, ctypes.POINTER(ctype))[:length])
+    finally:
+        lib.gloat_free(ptr)
+
+
+numbers = array.array("q", range(1, 11))
+out_len = ctypes.c_longlong()
+ptr, count = buffer_arg(numbers, ctypes.c_longlong)
+result = lib.factorials(ptr, count, ctypes.byref(out_len))
+for n, f in zip(numbers, take_buffer(result, out_len.value, ctypes.c_longlong)):
+    print(f"{n}! = {f}")
+
+samples = array.array("d", (i % 100 for i in range(1_000_000)))
+start = time.perf_counter()
+ptr, count = buffer_arg(samples, ctypes.c_double)
+mean = lib.mean(ptr, count)
+ms = (time.perf_counter() - start) * 1000
+print(f"mean of {count} floats: {mean} (one call, {ms:.1f}ms)")
+
+data = b"hello from yamlscript"
+result = lib.reverse_bytes(data, len(data), ctypes.byref(out_len))
+print(bytes(take_buffer(result, out_len.value, ctypes.c_ubyte)).decode())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Test the greet shared library through its generated bindings module.
+
+Usage: ffi-bindings.py
+Imports example_bindings.py, written next to the library by
+`gloat -Xpython`.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+
+import example_bindings as example
+
+for n in range(1, 11):
+    print(f"{n}! = {example.factorial(n)}")
+
+print(example.greet("World"))
+
+buf = bytearray(64)
+length = example.greet_into("buffer", buf)
+print(buf[:length].decode())
+
+print(example.repeat_string("ha", 3))
+
+example.shout_it("hello from yamlscript")
+
+print(f"maybe: {'true' if example.maybe() else 'false'}")
+
+data = json.dumps([3, 1, 4, 1, 5, 9, 2, 6])
+print(f"sorted: {example.sort_json_array(data)}")
+
+print(f"backend: {example.backend}")
@@ -19,17 +19,35 @@ else:
     lib_path = "example.so"
 lib = ctypes.CDLL(lib_path)
 
+# Returned strings are malloc'd by the library: declare them c_void_p
+# (c_char_p would copy and drop the pointer), read them with string_at
+# and release them with gloat_free
+lib.gloat_free.argtypes = [ctypes.c_void_p]
+lib.gloat_free.restype = None
+
+
+def take_string(ptr):
+    try:
+        return ctypes.string_at(ptr).decode()
+    finally:
+        lib.gloat_free(ptr)
+
+
 # factorial(int) -> int
 lib.factorial.argtypes = [ctypes.c_longlong]
 lib.factorial.restype = ctypes.c_longlong
 
 # greet(str) -> str
 lib.greet.argtypes = [ctypes.c_char_p]
-lib.greet.restype = ctypes.c_char_p
+lib.greet.restype = ctypes.c_void_p
+
+# greet_into(str, buf, cap) -> length; writes into our buffer, no free
+lib.greet_into.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]
+lib.greet_into.restype = ctypes.c_size_t
 
 # repeat_string(str, int) -> str
 lib.repeat_string.argtypes = [ctypes.c_char_p, ctypes.c_longlong]
-lib.repeat_string.restype = ctypes.c_char_p
+lib.repeat_string.restype = ctypes.c_void_p
 
 # shout_it(str) -> null
 lib.shout_it.argtypes = [ctypes.c_char_p]
@@ -41,16 +59,18 @@ lib.maybe.restype = ctypes.c_int
 
 # sort_json_array(str) -> str
 lib.sort_json_array.argtypes = [ctypes.c_char_p]
-lib.sort_json_array.restype = ctypes.c_char_p
+lib.sort_json_array.restype = ctypes.c_void_p
 
 for n in range(1, 11):
     print(f"{n}! = {lib.factorial(n)}")
 
-result = lib.greet(b"World")
-print(result.decode())
+print(take_string(lib.greet(b"World")))
+
+buf = ctypes.create_string_buffer(64)
+lib.greet_into(b"buffer", buf, len(buf))
+print(buf.value.decode())
 
-result = lib.repeat_string(b"ha", 3)
-print(result.decode())
+print(take_string(lib.repeat_string(b"ha", 3)))
 
 lib.shout_it(b"hello from yamlscript")
 
@@ -59,5 +79,5 @@ print(f"maybe: {'true' if result else 'false'}")
 
 import json
 data = json.dumps([3, 1, 4, 1, 5, 9, 2, 6])
-result = lib.sort_json_array(data.encode())
-print(f"sorted: {result.decode()}")
+result = take_string(lib.sort_json_array(data.encode()))
+print(f"sorted: {result}")
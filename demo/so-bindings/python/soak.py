@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Check that calling string-returning exports doesn't grow memory.
+
+Usage: soak.py [calls] [path-to-library]
+Calls greet() (freeing each result with gloat_free) and greet_into()
+`calls` times each (default 10,000,000), printing the resident set size
+every 10% of the run. Exits 1 if RSS grew by more than 10% (and 16MB)
+between the first sample and the last.
+"""
+
+import ctypes
+import os
+import sys
+import time
+
+calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+if len(sys.argv) > 2:
+    lib_path = os.path.abspath(sys.argv[2])
+elif sys.platform == "darwin":
+    lib_path = "example.dylib"
+else:
+    lib_path = "example.so"
+lib = ctypes.CDLL(lib_path)
+
+lib.gloat_free.argtypes = [ctypes.c_void_p]
+lib.gloat_free.restype = None
+lib.greet.argtypes = [ctypes.c_char_p]
+lib.greet.restype = ctypes.c_void_p
+lib.greet_into.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]
+lib.greet_into.restype = ctypes.c_size_t
+
+
+def rss_kb():
+    """Current (not peak) resident set size"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        # No /proc (macOS): fall back to the peak, in bytes there
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+def soak(name, call):
+    step = max(calls // 10, 1)
+    samples = []
+    start = time.perf_counter()
+    for i in range(1, calls + 1):
+        call()
+        if i % step == 0:
+            samples.append(rss_kb())
+            print(f"{name}: {i:>11,} calls  rss {samples[-1]:>8,} KB",
+                  flush=True)
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {calls / elapsed:,.0f} calls/s")
+    growth = samples[-1] - samples[0]
+    return growth <= max(samples[0] * 0.10, 16 * 1024), growth
+
+
+def greet():
+    lib.gloat_free(lib.greet(b"World"))
+
+
+buf = ctypes.create_string_buffer(64)
+
+
+def greet_into():
+    lib.greet_into(b"World", buf, len(buf))
+
+
+failed = False
+for name, call in [("greet+gloat_free", greet), ("greet_into", greet_into)]:
+    flat, growth = soak(name, call)
+    print(f"{name}: rss grew {growth:,} KB: {'ok' if flat else 'LEAK?'}")
+    failed = failed or not flat
+sys.exit(1 if failed else 0)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Call the example library from many threads at once.
+
+Usage: threads.py [-h] [--min-efficiency F] [calls] [path-to-library]
+
+First hammers factorial, greet, sort_json_array and maybe from a
+ThreadPoolExecutor with one worker per CPU (at least 4), checking every
+result. Then times `calls` sort_json_array calls (default 20,000) on a
+1000-element array with 1, 2, 4, ... threads up to the CPU count and
+prints the throughput and its scaling. ctypes releases the GIL for the
+length of each foreign call, so the calls only scale if the library lets
+them run in parallel.
+
+Exits 1 if any call returned a wrong result or raised, or if the scaling
+efficiency (speedup / threads) at the highest thread count is below
+--min-efficiency.
+"""
+
+import argparse
+import ctypes
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser(
+    description=__doc__.split('\n\n')[0],
+    formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('calls', nargs='?', type=int, default=20_000)
+parser.add_argument('library', nargs='?')
+parser.add_argument('--min-efficiency', type=float, default=0.0,
+                    help='fail below this speedup per thread (e.g. 0.6)')
+opts = parser.parse_args()
+
+if opts.library:
+    lib_path = os.path.abspath(opts.library)
+elif sys.platform == "darwin":
+    lib_path = "example.dylib"
+else:
+    lib_path = "example.so"
+lib = ctypes.CDLL(lib_path)
+
+lib.gloat_free.argtypes = [ctypes.c_void_p]
+lib.gloat_free.restype = None
+lib.factorial.argtypes = [ctypes.c_longlong]
+lib.factorial.restype = ctypes.c_longlong
+lib.maybe.argtypes = []
+lib.maybe.restype = ctypes.c_int
+for fn in (lib.greet, lib.sort_json_array):
+    fn.argtypes = [ctypes.c_char_p]
+    fn.restype = ctypes.c_void_p
+
+
+def take_string(ptr):
+    try:
+        return ctypes.string_at(ptr).decode()
+    finally:
+        lib.gloat_free(ptr)
+
+
+def check_batch(seed):
+    """Make a mix of calls with seeded inputs; return the failures"""
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(100):
+        n = rng.randint(1, 20)
+        if lib.factorial(n) != math.factorial(n):
+            failures.append(f"factorial({n})")
+        name = f"thread-{seed}-{rng.random()}"
+        if take_string(lib.greet(name.encode())) != f"Hello, {name}!":
+            failures.append(f"greet({name!r})")
+        items = [rng.randint(-1000, 1000) for _ in range(rng.randint(0, 50))]
+        got = take_string(lib.sort_json_array(json.dumps(items).encode()))
+        if json.loads(got) != sorted(items):
+            failures.append(f"sort_json_array({items})")
+        if lib.maybe() not in (0, 1):
+            failures.append("maybe()")
+    return failures
+
+
+def check(workers):
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(check_batch, range(workers * 20)))
+    return [f for batch in results for f in batch]
+
+
+data = json.dumps([random.randint(0, 10**6) for _ in range(1000)]).encode()
+
+
+def sort_calls(count):
+    for _ in range(count):
+        lib.gloat_free(lib.sort_json_array(data))
+
+
+def throughput(threads):
+    per_thread = max(opts.calls // threads, 1)
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(sort_calls, [per_thread] * threads))
+        elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+
+cpus = os.cpu_count() or 1
+workers = max(cpus, 4)
+failures = check(workers)
+print(f"concurrent calls from {workers} threads: "
+      f"{'ok' if not failures else f'{len(failures)} wrong results'}")
+for failure in failures[:10]:
+    print(f"  wrong result: {failure}")
+
+sort_calls(max(opts.calls // 10, 1))  # warm up
+counts = sorted({1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus}
+                | {cpus})
+base = None
+print(f"{'threads':>7} {'calls/s':>12} {'speedup':>8} {'efficiency':>10}")
+for threads in counts:
+    rate = throughput(threads)
+    base = base or rate
+    speedup = rate / base
+    efficiency = speedup / threads
+    print(f"{threads:>7} {rate:>12,.0f} {speedup:>7.2f}x {efficiency:>10.0%}",
+          flush=True)
+
+scaled = efficiency >= opts.min_efficiency
+if not scaled:
+    print(f"scaling efficiency {efficiency:.0%} at {threads} threads is "
+          f"below {opts.min_efficiency:.0%}")
+sys.exit(1 if failures or not scaled else 0)
@@ -0,0 +1,42 @@
+# Workload protocol: see ../bench.py
+require 'fiddle'
+require 'fiddle/import'
+require 'json'
+
+module Example
+  extend Fiddle::Importer
+  lib_ext = RUBY_PLATFORM =~ /darwin/ ? 'dylib' : 'so'
+  dlload "example.#{lib_ext}"
+
+  extern 'void gloat_free(void*)'
+  extern 'long long factorial(long long)'
+  extern 'void* greet(const char*)'
+  extern 'void* sort_json_array(const char*)'
+end
+
+calls = Integer(ENV.fetch('BENCH_CALLS', 20000))
+size = Integer(ENV.fetch('BENCH_SIZE', 100))
+warmup = Integer(ENV.fetch('BENCH_WARMUP', calls / 10))
+json = JSON.generate(size.downto(1).to_a)
+
+def bench(name, calls, warmup)
+  warmup.times { yield }
+  start = Process.clock_gettime(Process::CLOCK_MONOTONIC, :nanosecond)
+  calls.times { yield }
+  elapsed = Process.clock_gettime(Process::CLOCK_MONOTONIC, :nanosecond) - start
+  puts "#{name} #{calls} #{elapsed}"
+end
+
+# Returned strings are copied out, then released with gloat_free
+def take_string(ptr)
+  ptr.to_s
+ensure
+  Example.gloat_free(ptr)
+end
+
+sink = 0
+bench('factorial', calls, warmup) { sink += Example.factorial(20) }
+bench('greet', calls, warmup) { sink += take_string(Example.greet('World')).size }
+bench('sort_json_array', calls, warmup) do
+  sink += take_string(Example.sort_json_array(json)).size
+end
@@ -0,0 +1,63 @@
+// Workload protocol: see ../../bench.py
+use libloading::{Library, Symbol};
+use std::ffi::{c_void, CStr, CString};
+use std::os::raw::{c_char, c_longlong};
+use std::time::Instant;
+
+fn env_usize(name: &str, fallback: usize) -> usize {
+    std::env::var(name).ok().and_then(|v| v.parse().ok()).unwrap_or(fallback)
+}
+
+fn bench(name: &str, calls: usize, warmup: usize, mut call: impl FnMut()) {
+    for _ in 0..warmup {
+        call();
+    }
+    let start = Instant::now();
+    for _ in 0..calls {
+        call();
+    }
+    println!("{} {} {}", name, calls, start.elapsed().as_nanos());
+}
+
+fn main() -> Result<(), Box<dyn std::error::Error>> {
+    let lib_name = if cfg!(target_os = "macos") { "example.dylib" } else { "example.so" };
+    let lib = unsafe { Library::new(lib_name)? };
+
+    let calls = env_usize("BENCH_CALLS", 20000);
+    let size = env_usize("BENCH_SIZE", 100);
+    let warmup = env_usize("BENCH_WARMUP", calls / 10);
+
+    let gloat_free: Symbol<unsafe extern "C" fn(*mut c_void)> =
+        unsafe { lib.get(b"gloat_free")? };
+    let factorial: Symbol<unsafe extern "C" fn(c_longlong) -> c_longlong> =
+        unsafe { lib.get(b"factorial")? };
+    let greet: Symbol<unsafe extern "C" fn(*const c_char) -> *mut c_char> =
+        unsafe { lib.get(b"greet")? };
+    let sort_json_array: Symbol<unsafe extern "C" fn(*const c_char) -> *mut c_char> =
+        unsafe { lib.get(b"sort_json_array")? };
+
+    // Returned strings are copied out, then released with gloat_free
+    let take_string = |ptr: *mut c_char| -> String {
+        let s = unsafe { CStr::from_ptr(ptr) }.to_string_lossy().into_owned();
+        unsafe { gloat_free(ptr as *mut c_void) };
+        s
+    };
+
+    let items: Vec<usize> = (1..=size).rev().collect();
+    let json = CString::new(serde_json::to_string(&items)?)?;
+    let world = CString::new("World")?;
+
+    let mut sink = 0usize;
+    bench("factorial", calls, warmup, || {
+        sink = sink.wrapping_add(unsafe { factorial(20) } as usize)
+    });
+    bench("greet", calls, warmup, || {
+        sink += take_string(unsafe { greet(world.as_ptr()) }).len()
+    });
+    bench("sort_json_array", calls, warmup, || {
+        sink += take_string(unsafe { sort_json_array(json.as_ptr()) }).len()
+    });
+    std::hint::black_box(sink);
+
+    Ok(())
+}
@@ -0,0 +1,158 @@
+;; daemon.clj - Resident compile server on a Unix domain socket
+;;
+;; Loaded by gloat.clj for 'gloat --daemon'; run directly by bin/gloat
+;; ('bb src/daemon.clj') as the client.
+;;
+;; Protocol: one JSON request line per connection, answered by JSON
+;; frames, one per line:
+;;   {"out": text}       text the compile wrote to stdout
+;;   {"err": text}       text the compile wrote to stderr
+;;   {"exit": code}      last frame; the compile's exit code
+;;   {"fallback": true}  last frame; run gloat normally instead
+
+(ns daemon
+  (:require
+   [babashka.fs :as fs]
+   [cheshire.core :as json]
+   [clojure.java.io :as io])
+  (:import
+   [java.net StandardProtocolFamily UnixDomainSocketAddress]
+   [java.nio.channels Channels ServerSocketChannel SocketChannel]))
+
+;; Client exit code meaning "no daemon answered; run gloat normally"
+(def FALLBACK-EXIT 75)
+
+;; Environment variables that change a compile; the client sends its
+;; values so the daemon can decline when they differ from its own
+(def REQUEST-ENV
+  ["CC" "GLJ_CLASSPATH" "GLOAT_BUILD_CACHE" "GLOAT_ENGINE" "GLOAT_GLJDEPS"
+   "GLOAT_INCREMENTAL" "GLOAT_MODULE" "GLOAT_NAMESPACE" "GLOAT_X_PRUNE"])
+
+(defn- connect [socket]
+  (SocketChannel/open (UnixDomainSocketAddress/of socket)))
+
+(defn running?
+  "True if a daemon accepts connections on socket."
+  [socket]
+  (try
+    (.close (connect socket))
+    true
+    (catch java.io.IOException _ false)))
+
+(defn- frame-writer
+  "Writer whose text is sent as {key text} frames from a pump thread.
+  Returns [writer done]; deref done after closing writer to wait for
+  the last frame."
+  [send! key]
+  (let [in (java.io.PipedInputStream. 65536)
+        writer (io/writer (java.io.PipedOutputStream. in))
+        done (future
+               (with-open [reader (io/reader in)]
+                 (let [buf (char-array 8192)]
+                   (loop []
+                     (let [n (.read reader buf)]
+                       (when (pos? n)
+                         (send! {key (String. buf 0 n)})
+                         (recur)))))))]
+    [writer done]))
+
+(defn- handle-connection [channel handle]
+  (with-open [in (io/reader (Channels/newInputStream channel))
+              out (io/writer (Channels/newOutputStream channel))]
+    (let [send! (fn [frame]
+                  (locking out
+                    (.write out (str (json/generate-string frame) "\n"))
+                    (.flush out)))
+          request (json/parse-string (.readLine in) true)
+          [out-writer out-done] (frame-writer send! :out)
+          [err-writer err-done] (frame-writer send! :err)
+          result (try
+                   (binding [*out* out-writer
+                             *err* err-writer]
+                     (handle request))
+                   (catch Throwable e
+                     (binding [*out* err-writer]
+                       (println (or (ex-message e) (str e))))
+                     1))]
+      (.close out-writer)
+      (.close err-writer)
+      @out-done
+      @err-done
+      (send! (if (= :fallback result)
+               {:fallback true}
+               {:exit result})))))
+
+(defn serve
+  "Listen on the Unix socket at path :socket and run (handle request)
+  for each connection on its own thread. The handler's *out* and *err*
+  are streamed back to the client; it returns an exit code or
+  :fallback.
+
+   Config keys:
+     :socket - socket file path (replaced if stale)
+     :handle - request handler
+     :quiet  - don't print the listening message"
+  [{:keys [socket handle quiet]}]
+  (fs/delete-if-exists socket)
+  (let [server (ServerSocketChannel/open StandardProtocolFamily/UNIX)]
+    (.bind server (UnixDomainSocketAddress/of socket))
+    (.addShutdownHook (Runtime/getRuntime)
+                      (Thread. #(fs/delete-if-exists socket)))
+    (when-not quiet
+      (binding [*out* *err*]
+        (println (str "gloat daemon listening on " socket))))
+    (loop []
+      (let [channel (.accept server)]
+        (future
+          (try
+            (handle-connection channel handle)
+            (catch Exception e
+              (binding [*out* *err*]
+                (println "gloat daemon: request failed:" (ex-message e))))
+            (finally
+              (.close channel))))
+        (recur)))))
+
+(defn client
+  "Send request to the daemon on socket, copying its output to stdout
+  and stderr. Returns the compile's exit code, or FALLBACK-EXIT if no
+  daemon is listening or it declines the request."
+  [socket request]
+  (let [ch (try
+             (connect socket)
+             (catch java.io.IOException _ nil))]
+    (if-not ch
+      FALLBACK-EXIT
+      (with-open [ch ch
+                  in (io/reader (Channels/newInputStream ch))
+                  out (io/writer (Channels/newOutputStream ch))]
+        (.write out (str (json/generate-string request) "\n"))
+        (.flush out)
+        (loop [output? false]
+          (if-let [line (.readLine in)]
+            (let [frame (json/parse-string line true)]
+              (cond
+                (contains? frame :out)
+                (do (print (:out frame)) (flush) (recur true))
+
+                (contains? frame :err)
+                (do (binding [*out* *err*] (print (:err frame)) (flush))
+                    (recur true))
+
+                (:fallback frame) FALLBACK-EXIT
+                :else (:exit frame)))
+            ;; The daemon died: retry locally unless it already wrote
+            (if output?
+              (do (binding [*out* *err*]
+                    (println "gloat daemon closed the connection"))
+                  1)
+              FALLBACK-EXIT)))))))
+
+(when (= *file* (System/getProperty "babashka.file"))
+  (System/exit
+   (client (System/getenv "GLOAT_DAEMON_SOCKET")
+           {:opts (System/getenv "GLOAT_OPTS")
+            :cwd (str (fs/cwd))
+            :version (System/getenv "GLOAT_VERSION")
+            :env (into {} (map (juxt identity #(System/getenv %)))
+                       REQUEST-ENV)})))
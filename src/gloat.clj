@@ -8,8 +8,11 @@
    [babashka.fs :as fs]
    [babashka.process :as process]
    [clojure.string :as str]
+   [cheshire.core :as json]
    [clojure.edn :as edn]
-   [clojure.java.io :as io]))
+   [clojure.java.io :as io]
+   [rewrite-clj.node :as node]
+   [rewrite-clj.parser :as parser]))
 
 
 ;;------------------------------------------------------------------------------
@@ -27,18 +30,26 @@
 (load-file (str GLOAT-ROOT "/src/open.clj"))
 (load-file (str GLOAT-ROOT "/src/serve.clj"))
 (load-file (str GLOAT-ROOT "/src/report.clj"))
+(load-file (str GLOAT-ROOT "/src/python.clj"))
+(load-file (str GLOAT-ROOT "/src/daemon.clj"))
 
 (def TEMPLATE (str GLOAT-ROOT "/template"))
 (def SRC (str GLOAT-ROOT "/ys/src"))
 (def GLOAT-TMP (str GLOAT-ROOT "/.cache/local/tmp"))
 (fs/create-dirs GLOAT-TMP)
 
-(def VALID-EXTENSIONS #{"gzip" "brotli" "prune" "deps" "html" "serve" "open" "goimports" "report"})
+;; Compiled packages and tidied modules; GLOAT_BUILD_CACHE moves them
+;; (demo/bin/bench.py uses an empty one to time cold builds)
+(def BUILD-CACHE
+  (or (not-empty (System/getenv "GLOAT_BUILD_CACHE"))
+      (str GLOAT-ROOT "/.cache/local")))
+
+(def VALID-EXTENSIONS #{"gzip" "brotli" "prune" "deps" "html" "serve" "open" "goimports" "report" "python"})
 
 (def go-env
   {"GOPATH"     (str GLOAT-ROOT "/.cache/local/go")
    "GOMODCACHE" (str GLOAT-ROOT "/.cache/local/go/pkg/mod")
-   "GOCACHE"    (str GLOAT-ROOT "/.cache/local/cache/go-build")})
+   "GOCACHE"    (str BUILD-CACHE "/cache/go-build")})
 
 (defn prepend-glj-classpath [env path]
   (let [existing (or (get env "GLJ_CLASSPATH")
@@ -66,6 +77,19 @@
 (def ^:dynamic *compile-start* nil)
 (def ^:dynamic *timer-start* nil)
 
+;; Source basename -> {:clj path :glj path} for stages already run, so
+;; convert-directory can reuse them instead of converting again.
+(def ^:dynamic *staged-files* {})
+
+;; When bound to an atom, stages count the units (top-level forms,
+;; namespaces) they compiled and reused under their stage name, for the
+;; -t all stage records.
+(def ^:dynamic *reuse* nil)
+
+;; True while the compile daemon runs a request: die throws instead of
+;; exiting so the daemon survives a failed compile.
+(def ^:dynamic *daemon* false)
+
 ;;------------------------------------------------------------------------------
 ;; Getopt Spec
 ;;------------------------------------------------------------------------------
@@ -80,7 +104,9 @@
   ([msg]
    (binding [*out* *err*]
      (println msg))
-   (System/exit 1))
+   (if *daemon*
+     (throw (ex-info msg {:gloat/exit 1}))
+     (System/exit 1)))
   ([msg & more]
    (die (apply str msg more))))
 
@@ -99,6 +125,32 @@
         (println (str "  " label "... done (" elapsed "ms)")))))
   (alter-var-root #'*timer-start* (constantly nil)))
 
+(defn link-tree
+  "Hard link every file under src-dir into dest-dir, copying instead
+  where a link is not possible (another filesystem). The sources are
+  only ever read, so builds can share them."
+  [src-dir dest-dir]
+  (doseq [file (fs/glob src-dir "**")]
+    (when (fs/regular-file? file)
+      (let [target (str dest-dir "/" (fs/relativize src-dir file))]
+        (fs/create-dirs (fs/parent target))
+        (fs/delete-if-exists target)
+        (try
+          (fs/create-link target file)
+          (catch java.io.IOException _
+            (fs/copy file target {:replace-existing true})))))))
+
+(defn clean-stale-tmp
+  "Remove GLOAT-TMP entries untouched for a day: leftovers of builds
+  that were killed before they could clean up."
+  []
+  (let [cutoff (- (System/currentTimeMillis) (* 24 60 60 1000))]
+    (doseq [entry (fs/list-dir GLOAT-TMP)]
+      (when (< (fs/file-time->millis (fs/last-modified-time entry)) cutoff)
+        (try
+          (fs/delete-tree entry)
+          (catch java.io.IOException _ nil))))))
+
 (def make-vars nil)
 
 (defn setup []
@@ -251,16 +303,21 @@
 ;; Option Parsing
 ;;------------------------------------------------------------------------------
 
+(defn run-getopt
+  "Parse args with util/getopt. Returns the process result; :out holds
+  the options as EDN when :exit is 0."
+  [args err]
+  @(apply process/process
+          {:in getopt-spec
+           :out :string
+           :err err}
+          (str GLOAT-ROOT "/util/getopt")
+          args))
+
 (defn parse-opts [args]
   (if-let [opts-env (System/getenv "GLOAT_OPTS")]
     (edn/read-string opts-env)
-    (let [proc (apply process/process
-                      {:in getopt-spec
-                       :out :string
-                       :err :inherit}
-                      (str GLOAT-ROOT "/util/getopt")
-                      args)
-          result @proc]
+    (let [result (run-getopt args :inherit)]
       (when-not (zero? (:exit result))
         (System/exit (:exit result)))
       (edn/read-string (:out result)))))
@@ -470,10 +527,12 @@
                              (map (fn [[k v]]
                                     (let [key (keyword k)
                                           ;; Convert string types to keywords
+                                          ;; (a nested vector is a buffer type)
                                           val (if (vector? v)
-                                                (mapv #(if (nil? %)
-                                                         :null
-                                                         (keyword %))
+                                                (mapv #(cond
+                                                         (nil? %) :null
+                                                         (vector? %) (mapv keyword %)
+                                                         :else (keyword %))
                                                       v)
                                                 (if (nil? v)
                                                   :null
@@ -508,6 +567,121 @@
             :clj-to-go-special true}
    :null   {:no-return true}})
 
+(def buffer-type-mappings
+  "Map EXPORT buffer types to cgo info. A buffer argument is passed as a
+  pointer and a length (argN, argN_len) and reaches the function as a Go
+  slice over the caller's memory, valid only during the call. A buffer
+  result is copied into malloc'd memory the caller frees; its length is
+  written through a trailing out_len parameter. data is a bytes buffer
+  holding MessagePack, decoded with :to-clj into Glojure values and
+  encoded from them with :from-clj (see template/lib-data.go)."
+  {[:int]   {:c-type "C.longlong" :elem "int64" :from-clj "gloatInts"}
+   [:float] {:c-type "C.double" :elem "float64" :from-clj "gloatFloats"}
+   :bytes   {:c-type "C.char" :elem "byte" :from-clj "gloatBytes"}
+   :data    {:c-type "C.char" :elem "byte" :from-clj "gloatPack"
+             :to-clj "gloatUnpack"}})
+
+(defn export-types [type-spec]
+  "All the types named in an EXPORT type-spec."
+  (if (vector? type-spec) type-spec [type-spec]))
+
+(defn export-uses-buffers? [export-map]
+  (boolean (some #(contains? buffer-type-mappings %)
+                 (mapcat export-types (vals export-map)))))
+
+(defn export-uses-data? [export-map]
+  (boolean (some #{:data} (mapcat export-types (vals export-map)))))
+
+(def export-buffer-helpers
+  "Go helpers for buffer results, added when an EXPORT uses them."
+  (str/join
+   "\n"
+   ["func gloatNumbers[T int64 | float64](result any, convert func(any) T) []T {"
+    "\tswitch r := result.(type) {"
+    "\tcase nil:"
+    "\t\treturn nil"
+    "\tcase []T:"
+    "\t\treturn r"
+    "\t}"
+    "\tvar items []T"
+    "\tfor s := lang.Seq(result); s != nil; s = s.Next() {"
+    "\t\titems = append(items, convert(s.First()))"
+    "\t}"
+    "\treturn items"
+    "}"
+    ""
+    "func gloatInts(result any) []int64 {"
+    "\treturn gloatNumbers(result, func(v any) int64 {"
+    "\t\tswitch n := v.(type) {"
+    "\t\tcase int64:"
+    "\t\t\treturn n"
+    "\t\tcase int:"
+    "\t\t\treturn int64(n)"
+    "\t\tcase byte:"
+    "\t\t\treturn int64(n)"
+    "\t\tcase float64:"
+    "\t\t\treturn int64(n)"
+    "\t\t}"
+    "\t\tpanic(\"EXPORT [int] result holds a non-number\")"
+    "\t})"
+    "}"
+    ""
+    "func gloatFloats(result any) []float64 {"
+    "\treturn gloatNumbers(result, func(v any) float64 {"
+    "\t\tswitch n := v.(type) {"
+    "\t\tcase float64:"
+    "\t\t\treturn n"
+    "\t\tcase int64:"
+    "\t\t\treturn float64(n)"
+    "\t\tcase int:"
+    "\t\t\treturn float64(n)"
+    "\t\t}"
+    "\t\tpanic(\"EXPORT [float] result holds a non-number\")"
+    "\t})"
+    "}"
+    ""
+    "func gloatBytes(result any) []byte {"
+    "\tswitch r := result.(type) {"
+    "\tcase []byte:"
+    "\t\treturn r"
+    "\tcase string:"
+    "\t\treturn []byte(r)"
+    "\t}"
+    "\tints := gloatInts(result)"
+    "\titems := make([]byte, len(ints))"
+    "\tfor i, n := range ints {"
+    "\t\titems[i] = byte(n)"
+    "\t}"
+    "\treturn items"
+    "}"
+    ""
+    "// gloatBuffer copies items into malloc'd memory owned by the caller"
+    "func gloatBuffer[T any](items []T, outLen *C.longlong) unsafe.Pointer {"
+    "\tif outLen != nil {"
+    "\t\t*outLen = C.longlong(len(items))"
+    "\t}"
+    "\tif len(items) == 0 {"
+    "\t\treturn nil"
+    "\t}"
+    "\tp := C.malloc(C.size_t(len(items)) * C.size_t(unsafe.Sizeof(items[0])))"
+    "\tcopy(unsafe.Slice((*T)(p), len(items)), items)"
+    "\treturn p"
+    "}"
+    ""]))
+
+(defn generate-export-into-function
+  "Generate the C-FN-NAME_into variant of an export returning str. It
+  writes the string into the caller's buf (see gloatCopyString in the
+  lib templates) instead of returning memory to free."
+  [c-fn-name params call go-string]
+  (str "//export " c-fn-name "_into\n"
+       "func " c-fn-name "_into("
+       (when (seq params) (str params ", "))
+       "buf *C.char, cap C.size_t) C.size_t {\n"
+       call
+       "\treturn gloatCopyString(" go-string ", buf, cap)\n"
+       "}\n"))
+
 (defn generate-export-function [fn-name type-spec namespace]
   "Generate a single //export Go function wrapper.
   type-spec is a vector like [arg-types... return-type]."
@@ -516,23 +690,40 @@
         arg-types (if (> (count type-vec) 1)
                     (butlast type-vec)
                     [])
-        return-info (when return-type (get type-mappings return-type))
+        return-buffer (get buffer-type-mappings return-type)
+        return-info (when return-type
+                      (if return-buffer
+                        {:go-type (str "*" (:c-type return-buffer))}
+                        (get type-mappings return-type)))
         c-fn-name (kebab-to-snake fn-name)
 
-        ;; Generate parameter list
+        ;; Generate parameter list; buffers take a pointer and a length
         params (str/join ", "
-                         (map-indexed
-                          (fn [idx arg-type]
-                            (let [type-info (get type-mappings arg-type)]
-                              (str "arg" idx " " (:go-type type-info))))
-                          arg-types))
+                         (concat
+                          (map-indexed
+                           (fn [idx arg-type]
+                             (if-let [buffer (get buffer-type-mappings arg-type)]
+                               (str "arg" idx " *" (:c-type buffer)
+                                    ", arg" idx "_len C.longlong")
+                               (let [type-info (get type-mappings arg-type)]
+                                 (str "arg" idx " " (:go-type type-info)))))
+                           arg-types)
+                          (when return-buffer
+                            ["out_len *C.longlong"])))
 
         ;; Generate argument conversions
         arg-conversions (map-indexed
                          (fn [idx arg-type]
-                           (let [type-info (get type-mappings arg-type)
-                                 conversion (:go-to-clj type-info)]
-                             (str/replace conversion "arg" (str "arg" idx))))
+                           (if-let [buffer (get buffer-type-mappings arg-type)]
+                             (let [slice (str "unsafe.Slice((*" (:elem buffer)
+                                              ")(unsafe.Pointer(arg" idx
+                                              ")), int(arg" idx "_len))")]
+                               (if-let [to-clj (:to-clj buffer)]
+                                 (str to-clj "(" slice ")")
+                                 slice))
+                             (let [type-info (get type-mappings arg-type)
+                                   conversion (:go-to-clj type-info)]
+                               (str/replace conversion "arg" (str "arg" idx)))))
                          arg-types)
 
         ;; Generate function signature
@@ -552,31 +743,66 @@
 
         body (if no-return
                ;; Void return
-               (str "\tfn := glj.Var(\"" namespace "\", \"" fn-name "\")\n"
+               (str "\tfn := gloatFn_" c-fn-name "\n"
                     invoke-line "\n")
                ;; Has return value
-               (str "\tfn := glj.Var(\"" namespace "\", \"" fn-name "\")\n"
+               (str "\tfn := gloatFn_" c-fn-name "\n"
                     "\tresult := " invoke-line "\n"
-                    (if (:clj-to-go-special return-info)
+                    (cond
+                      return-buffer
+                      (str "\treturn (*" (:c-type return-buffer) ")(gloatBuffer("
+                           (:from-clj return-buffer) "(result), out_len))\n")
                       ;; Special handling for bool
+                      (:clj-to-go-special return-info)
                       "\tif result.(bool) {\n\t\treturn 1\n\t}\n\treturn 0\n"
                       ;; Standard type conversion
+                      :else
                       (str "\treturn " (:clj-to-go return-info) "\n"))))]
 
     (str "//export " c-fn-name "\n"
          signature " {\n"
          body
+         "}\n"
+         (when (= :str return-type)
+           (str "\n"
+                (generate-export-into-function
+                 c-fn-name params
+                 (str "\tfn := gloatFn_" c-fn-name "\n"
+                      "\tresult := " invoke-line "\n")
+                 "result.(string)"))))))
+
+(defn generate-export-vars [export-map namespace]
+  "Generate the gloatFn_NAME vars the export wrappers call and
+  gloatBindExports, which init calls to look them up once the namespace
+  is loaded. Each holds the exported Var itself, so a call still reads
+  the Var's root, but host threads calling exports concurrently no
+  longer each look the Var up in the namespace tables."
+  (let [names (map (comp kebab-to-snake name key) export-map)]
+    (str "var (\n"
+         (str/join (map #(str "\tgloatFn_" % " lang.IFn\n") names))
+         ")\n\n"
+         "func gloatBindExports() {\n"
+         (str/join (map (fn [[fn-name _]]
+                          (str "\tgloatFn_" (kebab-to-snake (name fn-name))
+                               " = glj.Var(\"" namespace "\", \""
+                               (name fn-name) "\")\n"))
+                        export-map))
          "}\n")))
 
 (defn generate-export-functions [export-map namespace]
   "Generate all //export function wrappers from EXPORT map."
-  (if (empty? export-map)
-    ""
-    (str/join "\n"
-              (map (fn [[fn-name type-spec]]
-                     (generate-export-function
-                      (name fn-name) type-spec namespace))
-                   export-map))))
+  (str (generate-export-vars export-map namespace)
+       (when (seq export-map)
+         (str "\n"
+              (when (export-uses-buffers? export-map)
+                (str export-buffer-helpers "\n"))
+              (when (export-uses-data? export-map)
+                (str (slurp (str TEMPLATE "/lib-data.go")) "\n"))
+              (str/join "\n"
+                        (map (fn [[fn-name type-spec]]
+                               (generate-export-function
+                                (name fn-name) type-spec namespace))
+                             export-map))))))
 
 (def lg-type-mappings
   "Map EXPORT type keywords to cgo and let-go VM conversions."
@@ -637,10 +863,18 @@
     (str "//export " c-fn-name "\n"
          signature " {\n"
          body
-         "}\n")))
+         "}\n"
+         (when (= :str return-type)
+           (str "\n"
+                (generate-export-into-function
+                 c-fn-name params
+                 (str "\tresult := " invoke "\n")
+                 "string(result.(vm.String))"))))))
 
 (defn generate-lg-export-functions [export-map]
   "Generate all let-go-backed //export wrappers from EXPORT map."
+  (when (export-uses-buffers? export-map)
+    (die "Buffer EXPORT types ([int], [float], bytes, data) need the glj engine"))
   (if (empty? export-map)
     ""
     (str/join "\n"
@@ -672,6 +906,7 @@ Source formats:
   glj       Glojure source file
   go        Go source (default for stdout)
   dir       Go project directory
+  all       Every stage (clj glj go js) in one run, plus manifest.json
 
 Binary formats:
   bin       Native binary (default when -o has no extension)
@@ -714,12 +949,14 @@ Format can usually be inferred from -o extension:
   html        Generate HTML page for js/wasm (-Xhtml or -Xhtml='args')
   open        Open browser after serving (-Xopen or -Xopen='args')
   prune       Prune unused clojure.core functions (smaller binaries)
+  python      Generate Python bindings for a lib (-Xpython, -Xpython=cffi)
   serve       Start a local HTTP server after building (-Xserve)
 
 The compression extensions are applied to WASM output formats (wasm, js).
 The html, serve, and open extensions are only valid with js format (-o foo.js or -t js).
 The prune extension applies to binary builds (bin, lib, wasm, js, dir).
 The goimports extension applies to binary builds (bin, lib, wasm, js, dir).
+The python extension is only valid with lib format (-o foo.so or -t lib).
 
 Multiple extensions can be combined with commas: -Xserve,html=100
 -Xopen implies -Xserve which implies -Xhtml.")
@@ -808,7 +1045,14 @@ Less common:
           (let [format (infer-format (:out *opts*) (:to *opts*))]
             (when (not= format "js")
               (die (str "-X" ext " is only valid with js format"
-                        " (-o foo.js or -t js)")))))))))
+                        " (-o foo.js or -t js)"))))))
+      ;; Validate python is only used with lib format
+      (when-let [python-val (get parsed "python")]
+        (when (and (string? python-val) (not= "cffi" python-val))
+          (die "Unknown python mode: " python-val " (use cffi)"))
+        (when (not= "lib" (infer-format (:out *opts*) (:to *opts*)))
+          (die "-Xpython is only valid with lib format"
+               " (-o foo.so or -t lib)"))))))
 
 ;;------------------------------------------------------------------------------
 ;; Core Conversion Functions
@@ -886,7 +1130,229 @@ Less common:
                                              ["SOURCE-DIR" source-dir]])]
         (spit output result-content)))))
 
-(defn clj-to-glj [input output]
+(defn sha256-hex
+  "Hex SHA-256 of parts, each followed by a newline."
+  [& parts]
+  (let [digest (java.security.MessageDigest/getInstance "SHA-256")]
+    (doseq [part parts]
+      (.update digest (.getBytes (str part "\n") "UTF-8")))
+    (apply str (map #(format "%02x" %) (.digest digest)))))
+
+(defn touch [path]
+  (fs/set-last-modified-time
+   path (fs/millis->file-time (System/currentTimeMillis))))
+
+(defn trim-cache
+  "Remove all but the max-entries most recently used entries of cache
+  dir."
+  [dir max-entries]
+  (let [entries (->> (fs/list-dir dir)
+                     (remove #(str/starts-with? (fs/file-name %) ".")))]
+    (when (> (count entries) max-entries)
+      (doseq [old (->> entries
+                       (keep #(try
+                                [(fs/file-time->millis
+                                  (fs/last-modified-time %)) %]
+                                ;; Trimmed by a concurrent build
+                                (catch java.io.IOException _ nil)))
+                       (sort-by first)
+                       reverse
+                       (drop max-entries)
+                       (map second))]
+        (try
+          (fs/delete-tree old)
+          ;; Trimmed by a concurrent build
+          (catch java.io.IOException _ nil))))))
+
+(defn spit-atomic
+  "Write content to file through a temp file in the same directory, so
+  concurrent builds never read a partial file."
+  [file content]
+  (let [tmp (str (fs/create-temp-file {:dir (fs/parent file)
+                                       :prefix ".tmp-"}))]
+    (try
+      (spit tmp content)
+      (fs/move tmp file {:atomic-move true :replace-existing true})
+      (finally
+        (fs/delete-if-exists tmp)))))
+
+;;------------------------------------------------------------------------------
+;; Incremental Compilation
+;;------------------------------------------------------------------------------
+
+;; An edit usually changes a few top-level forms, so the stages reuse
+;; what they made from the unchanged parts of earlier inputs:
+;; * CLJ→GLJ rewrites only the top-level forms it hasn't rewritten before
+;;   and takes the rest from FORM-CACHE.
+;; * GLJ→GO skips namespaces whose Glojure source is unchanged and takes
+;;   their loader.go from NS-CACHE. glj emits one loader per namespace,
+;;   with calls between its defs linked directly, so the namespace is the
+;;   smallest unit the dependents of a changed form can be recompiled in.
+;;   A namespace's key covers the keys of the user namespaces it
+;;   requires, so their dependents are recompiled too.
+;; * The Go build recompiles only the packages whose files changed;
+;;   GOCACHE (see go-env) has the rest.
+;; Both caches keep their most recently used entries. GLOAT_INCREMENTAL=0
+;; compiles everything.
+(def FORM-CACHE (str BUILD-CACHE "/glj-forms"))
+(def FORM-CACHE-MAX 4096)
+(def NS-CACHE (str BUILD-CACHE "/go-ns"))
+(def NS-CACHE-MAX 256)
+
+(defn incremental? []
+  (not= "0" (System/getenv "GLOAT_INCREMENTAL")))
+
+(defn note-reuse
+  "Count built and reused units for stage in *reuse*."
+  [stage built reused]
+  (when (and *reuse* (incremental?))
+    (swap! *reuse* update stage
+           #(merge-with + % {:built built :reused reused}))))
+
+(defn top-level-nodes
+  "[text form?] for each top-level node of the Clojure source text: its
+  forms and the whitespace and comments between them. Nil if the text
+  doesn't parse."
+  [text]
+  (try
+    (doall
+     (for [n (node/children (parser/parse-string-all text))]
+       [(node/string n) (not (node/whitespace-or-comment? n))]))
+    (catch Exception _ nil)))
+
+(def form-marker ";; gloat-form ")
+
+(defn run-rewrite [bb rewrite-script input]
+  (:out (process/shell {:out :string
+                        :extra-env go-env}
+                       bb rewrite-script input)))
+
+(defn rewrite-forms
+  "Rewritten text of each of forms, from one run of the rewriter over all
+  of them, or nil if its output doesn't split back into the forms."
+  [bb rewrite-script forms]
+  (let [tmp (str (fs/create-temp-file {:dir GLOAT-TMP :suffix ".clj"}))]
+    (try
+      (spit tmp (apply str (map-indexed #(str form-marker %1 "\n" %2 "\n")
+                                        forms)))
+      (let [[preamble & parts] (str/split
+                                (run-rewrite bb rewrite-script tmp)
+                                #"(?m)^;; gloat-form \d+\n" -1)]
+        (when (and (str/blank? preamble) (= (count parts) (count forms)))
+          (map #(str/replace % #"\n$" "") parts)))
+      (finally
+        (fs/delete-if-exists tmp)))))
+
+(defn rewrite-incremental
+  "Glojure for the top-level nodes of a Clojure file, rewriting only the
+  forms missing from FORM-CACHE. Nil if the rewriter's output for them
+  can't be split back into forms."
+  [bb rewrite-script nodes]
+  (let [rewriter (sha256-hex bb (slurp rewrite-script))
+        entry #(str FORM-CACHE "/" (sha256-hex rewriter %) ".glj")
+        forms (distinct (keep (fn [[text form?]] (when form? text)) nodes))
+        cached (into {}
+                     (keep #(try
+                              (let [file (entry %)
+                                    glj (slurp file)]
+                                (touch file)
+                                [% glj])
+                              ;; Missing, or trimmed by a concurrent build
+                              (catch java.io.IOException _ nil)))
+                     forms)
+        missing (remove #(contains? cached %) forms)
+        rewritten (when (seq missing)
+                    (rewrite-forms bb rewrite-script missing))]
+    (when (or (empty? missing) rewritten)
+      (when (seq missing)
+        (fs/create-dirs FORM-CACHE)
+        (doseq [[form glj] (map vector missing rewritten)]
+          (spit-atomic (entry form) glj))
+        (trim-cache FORM-CACHE FORM-CACHE-MAX))
+      (note-reuse "glj" (count missing) (count cached))
+      (let [glj (merge cached (zipmap missing rewritten))]
+        (apply str (map (fn [[text form?]] (if form? (glj text) text))
+                        nodes))))))
+
+(defn ns-path [namespace]
+  (-> namespace
+      (str/replace #"\." "/")
+      (str/replace #"-" "_")))
+
+(defn file-stamp [file]
+  (str file " " (fs/size file) " "
+       (fs/file-time->millis (fs/last-modified-time file))))
+
+(defn ns-cache-keys
+  "NS-CACHE key for each of the user namespaces nses, whose Glojure
+  sources are staged in dir: a hash of the source, glj, the runtime
+  sources it loads and the keys of the other user namespaces the source
+  mentions. Nil when incremental compilation is off."
+  [dir nses]
+  (when (incremental?)
+    (let [glj (:GLJ make-vars)
+          base (apply sha256-hex VERSION glj (file-stamp glj)
+                      (:GLOJURE-VERSION make-vars)
+                      (System/getenv "GLJ_CLASSPATH")
+                      (map file-stamp
+                           (sort (filter fs/regular-file?
+                                         (fs/glob (str GLOAT-ROOT "/ys/glj")
+                                                  "**")))))
+          source (into {} (for [ns nses]
+                            [ns (slurp (str dir "/" (ns-path ns) ".glj"))]))
+          mentions? (fn [text ns]
+                      (re-find (re-pattern
+                                (str "[\\s(\\[']"
+                                     (java.util.regex.Pattern/quote ns)
+                                     "[\\s)\\]]"))
+                               text))
+          ;; A require cycle gets no key, so it is always compiled
+          ns-key (fn ns-key [ns seen]
+                   (when-not (contains? seen ns)
+                     (let [deps (filter #(and (not= % ns)
+                                              (mentions? (source ns) %))
+                                        nses)
+                           dep-keys (map #(ns-key % (conj seen ns)) deps)]
+                       (when (every? some? dep-keys)
+                         (apply sha256-hex base (source ns) dep-keys)))))]
+      (into {} (for [ns nses] [ns (ns-key ns #{})])))))
+
+(defn compile-ns-cached
+  "Run compile! to compile namespace ns in dir, unless NS-CACHE has its
+  loader.go under key (nil: no caching). Returns true on a cache hit."
+  [dir ns key compile!]
+  (let [loader (str dir "/" (ns-path ns) "/loader.go")
+        entry (when key (str NS-CACHE "/" key))
+        hit (and entry
+                 (try
+                   (fs/create-dirs (fs/parent loader))
+                   (fs/copy (str entry "/loader.go") loader
+                            {:replace-existing true})
+                   (touch entry)
+                   true
+                   ;; Missing, or trimmed by a concurrent build
+                   (catch java.io.IOException _ false)))]
+    (when-not hit
+      (compile!)
+      (when (and entry (fs/exists? loader))
+        (fs/create-dirs NS-CACHE)
+        (let [tmp (str (fs/create-temp-dir {:dir NS-CACHE :prefix ".tmp-"}))]
+          (try
+            (fs/copy loader (str tmp "/loader.go"))
+            ;; A concurrent build may have stored the same key first
+            (fs/move tmp entry {:atomic-move true})
+            (catch java.io.IOException _ nil)
+            (finally
+              (when (fs/exists? tmp) (fs/delete-tree tmp)))))
+        (trim-cache NS-CACHE NS-CACHE-MAX)))
+    (note-reuse "go" (if hit 0 1) (if hit 1 0))
+    hit))
+
+(defn clj-to-glj
+  "Rewrite the Clojure file input to Glojure at output, incrementally
+  (see Incremental Compilation) unless that is off or the rewriter's
+  output can't be split back into forms."
+  [input output]
   (let [bb (:BB make-vars)
         glojure-dir (:GLOJURE-DIR make-vars)
         rewrite-script (str glojure-dir "/scripts/rewrite-core/rewrite.clj")
@@ -896,11 +1362,11 @@ Less common:
                 (str parent "." name)
                 name)]
     (timer-start)
-    (let [result (process/shell
-                  {:out :string
-                   :extra-env go-env}
-                  bb rewrite-script input)]
-      (spit output (:out result)))
+    (spit output
+          (or (when (incremental?)
+                (some->> (top-level-nodes (slurp input))
+                         (rewrite-incremental bb rewrite-script)))
+              (run-rewrite bb rewrite-script input)))
     (timer-end (str "CLJ→GLJ (" label ")"))))
 
 (defn glj-to-go [input namespace output-dir]
@@ -921,16 +1387,10 @@ Less common:
     ;; Copy input to namespace structure
     (fs/copy input (str output-dir "/" ns-path ".glj") {:replace-existing true})
 
-    ;; Copy pre-compiled ys runtime and dependencies
-    (let [ys-glj-dir (str GLOAT-ROOT "/ys/glj")]
-      (doseq [file (fs/glob ys-glj-dir "**/*")]
-        (when (fs/regular-file? file)
-          (let [rel-path (str (fs/relativize ys-glj-dir file))
-                target (str output-dir "/" rel-path)]
-            (fs/create-dirs (fs/parent target))
-            (fs/copy file target {:replace-existing true})))))
+    ;; Link pre-compiled ys runtime and dependencies
+    (link-tree (str GLOAT-ROOT "/ys/glj") output-dir)
 
-    ;; Compile user namespace only
+    ;; Compile user namespace only, unless it is unchanged
     (let [compile-cmd (str "(compile (quote " namespace "))")
           opts {:in compile-cmd
                 :dir output-dir
@@ -938,9 +1398,11 @@ Less common:
           opts (if (:quiet *opts*)
                  (assoc opts :out :string :err :string)
                  opts)]
-      (try
-        (process/shell opts glj)
-        (catch Exception _ nil)))
+      (compile-ns-cached output-dir namespace
+                         (get (ns-cache-keys output-dir [namespace]) namespace)
+                         #(try
+                            (process/shell opts glj)
+                            (catch Exception _ nil))))
 
     (timer-end "GLJ→GO")))
 
@@ -967,6 +1429,180 @@ Less common:
         (fs/move (str file ".br") file {:replace-existing true})))))
 
 
+(defn go-build-env
+  "Environment for building a generated Go module as format for the
+  goos/goarch target (nil for the host)."
+  [format goos goarch]
+  (let [go-bin (:GO make-vars)]
+    (merge go-env
+           {"GONOSUMCHECK" "*"}
+           (when (= format "lib") {"CGO_ENABLED" "1"})
+           ;; Cross-compiling a lib needs a C cross
+           ;; toolchain: for windows targets, use
+           ;; mingw-w64 unless the user set CC.
+           (when (and (= format "lib")
+                      (= goos "windows")
+                      (not (System/getenv "CC")))
+             (let [cc "x86_64-w64-mingw32-gcc"]
+               (when-not (fs/which cc)
+                 (die "Windows lib cross-compile"
+                      " needs mingw-w64 (" cc ");"
+                      " install gcc-mingw-w64-x86-64"
+                      " or set CC"))
+               {"CC" cc}))
+           (when goos {"GOOS" goos})
+           (when goarch {"GOARCH" goarch})
+           (when (and (= goos "plan9")
+                      (str/starts-with?
+                        (str/trim
+                          (:out (process/shell
+                                  {:out :string
+                                   :err :string}
+                                  go-bin "version")))
+                        "go version go1.24"))
+             {"GOEXPERIMENT" "nospinbitmutex"}))))
+
+(declare aot-build-tags)
+
+;; Tidied go.mod/go.sum pairs, keyed by what 'go mod tidy' depends on.
+;; Generated modules mostly differ only in user code, so a hit replaces
+;; the tidy run. Entries are written atomically; the oldest are removed
+;; past GO-MOD-CACHE-MAX. Compiled packages are shared separately
+;; through GOCACHE (see go-env).
+(def GO-MOD-CACHE (str BUILD-CACHE "/go-mod-tidy"))
+(def GO-MOD-CACHE-MAX 64)
+
+(defn go-imports
+  "Sorted import paths of the .go files under dir, excluding the
+  module's own packages."
+  [dir go-module]
+  (->> (fs/glob dir "**.go")
+       (mapcat #(let [src (slurp (str %))]
+                  (concat
+                   (mapcat (fn [[_ block]] (map second (re-seq #"\"([^\"]+)\"" block)))
+                           (re-seq #"(?s)\bimport\s*\((.*?)\)" src))
+                   (map second (re-seq #"(?m)^import\s+(?:[\w.]+\s+)?\"([^\"]+)\"" src)))))
+       (remove #(str/starts-with? % go-module))
+       distinct
+       sort))
+
+(defn go-mod-cache-key
+  "Hash of everything 'go mod tidy' reads: go.mod, the go.mod of each
+  local replace target, the Go toolchain and the external imports."
+  [dir]
+  (let [go-mod (slurp (str dir "/go.mod"))
+        go-module (second (re-find #"(?m)^module\s+(\S+)" go-mod))
+        replaced-mods (keep #(let [f (str (second %) "/go.mod")]
+                               (when (fs/exists? f) (slurp f)))
+                            (re-seq #"(?m)^replace\s+\S+\s+=>\s+(/\S+)\s*$"
+                                    go-mod))]
+    (apply sha256-hex (concat [go-mod (:GO make-vars)]
+                              replaced-mods
+                              (go-imports dir go-module)))))
+
+(defn restore-go-mod
+  "Copy a cached tidy result for key into dir. Returns true on a hit."
+  [dir key]
+  (let [entry (str GO-MOD-CACHE "/" key)]
+    (try
+      (doseq [f ["go.mod" "go.sum"]]
+        (fs/copy (str entry "/" f) (str dir "/" f) {:replace-existing true}))
+      (touch entry)
+      true
+      ;; Missing, or trimmed by a concurrent build
+      (catch java.io.IOException _ false))))
+
+(defn save-go-mod
+  "Store dir's tidied go.mod/go.sum under key and trim the cache."
+  [dir key]
+  (when (fs/exists? (str dir "/go.sum"))
+    (fs/create-dirs GO-MOD-CACHE)
+    (let [tmp (str (fs/create-temp-dir {:dir GO-MOD-CACHE :prefix ".tmp-"}))]
+      (try
+        (doseq [f ["go.mod" "go.sum"]]
+          (fs/copy (str dir "/" f) (str tmp "/" f)))
+        ;; A concurrent build may have stored the same key first
+        (fs/move tmp (str GO-MOD-CACHE "/" key) {:atomic-move true})
+        (catch java.io.IOException _ nil)
+        (finally
+          (when (fs/exists? tmp) (fs/delete-tree tmp)))))
+    (trim-cache GO-MOD-CACHE GO-MOD-CACHE-MAX)))
+
+(defn go-mod-stale?
+  "True if go build's stderr says it failed on the go.mod or go.sum it
+  was given, which 'go mod tidy' fixes."
+  [err]
+  (boolean
+   (re-find (re-pattern
+             (str "missing go\\.sum entry|updates to go\\.mod needed"
+                  "|no required module provides package"
+                  "|checksum mismatch"))
+            (str err))))
+
+(defn go-build
+  "Run 'go mod tidy' and 'go build' in the generated module dir to
+  produce binary-name. The tidy step is skipped when an identical module
+  was tidied before (see GO-MOD-CACHE). Returns the build environment
+  used."
+  [dir binary-name format goos goarch]
+  (let [go-bin (:GO make-vars)
+        build-env (go-build-env format goos goarch)
+        build-mode (when (= format "lib") "-buildmode=c-shared")]
+
+    (msg "Building" format "...")
+
+    (let [io-opts (if (:quiet *opts*)
+                    {:out :string :err :string}
+                    {:out :inherit :err :inherit})
+          tidy #(process/shell (merge {:dir dir
+                                       :extra-env build-env}
+                                      io-opts)
+                               go-bin "mod" "tidy")
+          cache-key (go-mod-cache-key dir)
+          cached (restore-go-mod dir cache-key)
+          build-tags (str/join "," (aot-build-tags))
+          build-args (concat [go-bin "build"
+                              "-trimpath"
+                              "-ldflags" "-s -w"
+                              "-o" binary-name]
+                             (when (seq build-tags)
+                               ["-tags" build-tags])
+                             (when build-mode [build-mode])
+                             ["main.go"])
+          build #(apply process/shell (merge {:dir dir
+                                              :extra-env build-env}
+                                             %)
+                        build-args)]
+
+      (when-not cached
+        (tidy))
+
+      (timer-start)
+      (if-not cached
+        (build io-opts)
+        ;; A stale cached go.mod or go.sum fails the build: tidy and build
+        ;; again. Any other failure is a compile error; report it as is.
+        (let [result (build {:out :string :err :string :continue true})]
+          (cond
+            (zero? (:exit result)) nil
+
+            (go-mod-stale? (:err result))
+            (do (tidy)
+                (build io-opts))
+
+            :else
+            (do (when-not (:quiet *opts*)
+                  (print (:out result))
+                  (flush)
+                  (binding [*out* *err*]
+                    (print (:err result))
+                    (flush)))
+                (process/check result)))))
+
+      (save-go-mod dir cache-key))
+    (timer-end "GO→BIN")
+    build-env))
+
 (defn find-glojure-core-loader []
   (let [glojure-dir (:GLOJURE-DIR make-vars)]
     (str glojure-dir "/pkg/stdlib/clojure/core/loader.go")))
@@ -992,6 +1628,16 @@ Less common:
      ["glj_no_goimports"])
    (when (prune?) ["glj_no_aot_stdlib"])))
 
+(defn python-bindings
+  "Write Python bindings next to a lib output when -Xpython is given."
+  [output export-map]
+  (when-let [mode (get (parse-extensions (or (:ext *opts*) [])) "python")]
+    (doseq [file (python/generate {:output       output
+                                   :export-map   export-map
+                                   :mode         mode
+                                   :template-dir TEMPLATE})]
+      (msg "Generated:" file))))
+
 (defn report-ext []
   (let [parsed (parse-extensions (or (:ext *opts*) []))
         val (get parsed "report")]
@@ -1728,7 +2374,8 @@ Less common:
                                 (str/replace out #"\.(so|dylib|dll)$" "")
                                 ".h")]
                     (when (fs/exists? header)
-                      (msg "Generated:" header))))
+                      (msg "Generated:" header)))
+                  (python-bindings output @export-map))
 
                 (empty? more)
                 (die (str "go build failed:\n"
@@ -2092,9 +2739,113 @@ Less common:
       (finally
         (fs/delete-tree tmpdir)))))
 
+(defn convert-file-all
+  "Compile input through every glj stage in one process: NAME.clj,
+  NAME.glj, NAME.go, the Go module (go/) and NAME.wasm (js target),
+  all written to output. Each stage reuses the previous stage's output.
+  Prints one JSON line per finished stage to stdout and writes the
+  same records, with timings, to output/manifest.json. The glj and go
+  records count the top-level forms and namespaces compiled (built) and
+  reused from earlier compiles (see Incremental Compilation)."
+  [input output namespace module]
+  (let [out-dir (str/replace output #"/$" "")
+        input-type (get-file-type input)
+        basename (fs/file-name input)
+        name (str/replace basename #"\.[^.]+$" "")
+        basename (if (re-find #"\.(ys|clj|glj)$" basename)
+                   basename
+                   (str basename "." input-type))
+        ns (when (= input-type "ys")
+             (or namespace (derive-namespace input)))
+        clj-file (str out-dir "/" name ".clj")
+        glj-file (str out-dir "/" name ".glj")
+        go-dir (str out-dir "/go")
+        stages (atom [])
+        t0 (System/currentTimeMillis)
+        stage (fn [stage-name f]
+                (let [start (System/currentTimeMillis)
+                      file (f)
+                      record (merge
+                              {:stage stage-name
+                               :file (str (fs/relativize out-dir file))
+                               :bytes (fs/size file)
+                               :ms (- (System/currentTimeMillis) start)}
+                              (get @*reuse* stage-name))]
+                  (swap! stages conj record)
+                  (println (json/generate-string record))
+                  (flush)))]
+
+    (when-not (contains? #{"ys" "clj" "glj"} input-type)
+      (die "Format 'all' can't compile input type: " input-type))
+    (fs/create-dirs out-dir)
+
+    (binding [*opts* (assoc *opts* :quiet true :verbose false)
+              *reuse* (atom {})]
+      (when (not= input-type "glj")
+        (stage "clj"
+               #(do (if (= input-type "ys")
+                      (ys-to-clj input clj-file ns)
+                      (fs/copy input clj-file {:replace-existing true}))
+                    clj-file)))
+
+      (stage "glj"
+             #(do (if (= input-type "glj")
+                    (fs/copy input glj-file {:replace-existing true})
+                    (clj-to-glj clj-file glj-file))
+                  glj-file))
+
+      (stage "go"
+             #(let [src-dir (str (fs/create-temp-dir {:dir GLOAT-TMP}))
+                    ns (or ns (resolve-namespace
+                               (if (fs/exists? clj-file) clj-file glj-file)
+                               namespace))
+                    loader (str go-dir "/pkg/"
+                                (-> ns
+                                    (str/replace #"\." "/")
+                                    (str/replace #"-" "_"))
+                                "/loader.go")
+                    go-file (str out-dir "/" name ".go")]
+                (try
+                  (fs/copy input (str src-dir "/" basename)
+                           {:replace-existing true})
+                  (binding [*source-file* (str (fs/canonicalize input))
+                            *staged-files*
+                            {basename {:clj (when (fs/exists? clj-file)
+                                              clj-file)
+                                       :glj glj-file}}]
+                    (convert-directory src-dir (str go-dir "/") "dir"
+                                       namespace module nil))
+                  (finally
+                    (fs/delete-tree src-dir)))
+                (when-not (fs/exists? loader)
+                  (die "glj compile did not produce loader.go at " loader))
+                (fs/copy loader go-file {:replace-existing true})
+                go-file))
+
+      (stage "wasm"
+             #(let [wasm-name (str name ".wasm")
+                    wasm-file (str out-dir "/" wasm-name)]
+                (go-build go-dir wasm-name "js" "js" "wasm")
+                (fs/move (str go-dir "/" wasm-name) wasm-file
+                         {:replace-existing true})
+                wasm-file)))
+
+    (spit (str out-dir "/manifest.json")
+          (json/generate-string
+           {:gloat-version VERSION
+            :glojure-version (:GLOJURE-VERSION make-vars)
+            :input (str input)
+            :stages @stages
+            :ms (- (System/currentTimeMillis) t0)}
+           {:pretty true}))))
+
 (defn convert-file [input output format namespace module platform]
   (let [input-type (get-file-type input)]
 
+    ;; -t all runs every stage once, each feeding the next
+    (if (= format "all")
+      (convert-file-all input output namespace module)
+
     ;; lg engine binaries bundle bytecode; no Go build directory
     (if (and (= "let-go-vm" (:engine *opts*)) (= format "bin"))
       (do
@@ -2187,7 +2938,7 @@ Less common:
                             loader-file)))))
 
           (finally
-            (fs/delete-tree tmpdir)))))))))
+            (fs/delete-tree tmpdir))))))))))
 
 (defn convert-files [input-files output format namespace module platform]
   "Compile multiple explicit input files to a binary/lib/dir output.
@@ -2293,12 +3044,17 @@ Less common:
 
               (msg "  Converting" basename "...")
 
-              ;; Convert through pipeline
-              (case input-type
-                "ys" (ys-to-clj (str source-file) clj-file ns)
-                "clj" (fs/copy source-file clj-file {:replace-existing true})
-                "glj" (fs/copy source-file glj-file {:replace-existing true})
-                (die "Unknown file type: " basename))
+              ;; Convert through pipeline, reusing stages already run
+              (if-let [staged (get *staged-files* basename)]
+                (do
+                  (when (:clj staged)
+                    (fs/copy (:clj staged) clj-file {:replace-existing true}))
+                  (fs/copy (:glj staged) glj-file {:replace-existing true}))
+                (case input-type
+                  "ys" (ys-to-clj (str source-file) clj-file ns)
+                  "clj" (fs/copy source-file clj-file {:replace-existing true})
+                  "glj" (fs/copy source-file glj-file {:replace-existing true})
+                  (die "Unknown file type: " basename)))
 
               ;; Extract EXPORT, check for main function, and collect
               ;; required namespaces for prune
@@ -2317,7 +3073,8 @@ Less common:
                       (swap! required-nses conj ns-name)))))
 
               ;; Clojure to Glojure
-              (when (fs/exists? clj-file)
+              (when (and (fs/exists? clj-file)
+                         (not (contains? *staged-files* basename)))
                 (clj-to-glj clj-file glj-file))
 
               ;; Resolve namespace
@@ -2345,14 +3102,8 @@ Less common:
                 (when (or (nil? @main-namespace) (= name "main"))
                   (reset! main-namespace ns)))))
 
-          ;; Copy pre-compiled ys runtime and dependencies (GLJ files)
-          (let [ys-glj-dir (str GLOAT-ROOT "/ys/glj")]
-            (doseq [file (fs/glob ys-glj-dir "**/*")]
-              (when (fs/regular-file? file)
-                (let [rel-path (str (fs/relativize ys-glj-dir file))
-                      target (str shared-tmpdir "/" rel-path)]
-                  (fs/create-dirs (fs/parent target))
-                  (fs/copy file target {:replace-existing true})))))
+          ;; Link pre-compiled ys runtime and dependencies (GLJ files)
+          (link-tree (str GLOAT-ROOT "/ys/glj") shared-tmpdir)
 
           ;; Make gljdeps.edn visible to glj compile in its CWD so it can
           ;; resolve third-party Go package call sites. glj invokes
@@ -2392,24 +3143,33 @@ Less common:
                 (when-not (zero? (:exit tidy))
                   (die "go mod tidy failed in glj workspace:\n"
                        (or (not-empty (:err tidy)) (:out tidy))))))
-            ;; Compile all user namespaces
-            (doseq [ns @all-namespaces]
-              (msg "  Compiling" ns "...")
-              (let [compile-cmd (str "(compile (quote " ns "))")
-                    opts {:in compile-cmd
-                          :dir shared-tmpdir
-                          :extra-env compile-env
-                          :out :string
-                          :err :string}]
-                (try
-                  (let [result (process/shell (assoc opts :continue true) glj)]
-                    (when-not (zero? (:exit result))
-                      (die "glj compile failed for " ns ":\n"
-                           (or (not-empty (:err result))
-                               (:out result)))))
-                  (catch Exception e
-                    (die "glj compile failed for " ns ":\n"
-                         (.getMessage e)))))))
+            ;; Compile all user namespaces but the unchanged ones. Extra
+            ;; Go deps make glj generate packages outside the namespace's
+            ;; loader.go, so those builds compile everything.
+            (let [ns-keys (when-not (seq extra-deps)
+                            (ns-cache-keys shared-tmpdir @all-namespaces))]
+              (doseq [ns @all-namespaces]
+                (let [compile-cmd (str "(compile (quote " ns "))")
+                      opts {:in compile-cmd
+                            :dir shared-tmpdir
+                            :extra-env compile-env
+                            :out :string
+                            :err :string}]
+                  (when (compile-ns-cached
+                         shared-tmpdir ns (get ns-keys ns)
+                         #(do
+                            (msg "  Compiling" ns "...")
+                            (try
+                              (let [result (process/shell
+                                            (assoc opts :continue true) glj)]
+                                (when-not (zero? (:exit result))
+                                  (die "glj compile failed for " ns ":\n"
+                                       (or (not-empty (:err result))
+                                           (:out result)))))
+                              (catch Exception e
+                                (die "glj compile failed for " ns ":\n"
+                                     (.getMessage e))))))
+                    (msg "  Reusing" ns "(unchanged)"))))))
 
           ;; Copy generated Go files to output directory under pkg/
           ;; Exclude YS stdlib files (they come from ys/pkg module)
@@ -2576,64 +3336,8 @@ Less common:
             ;; Build binary if needed
             (if is-binary
               (let [go-bin (:GO make-vars)
-                    build-env (merge go-env
-                                     {"GONOSUMCHECK" "*"}
-                                     (when (= format "lib") {"CGO_ENABLED" "1"})
-                                     ;; Cross-compiling a lib needs a C cross
-                                     ;; toolchain: for windows targets, use
-                                     ;; mingw-w64 unless the user set CC.
-                                     (when (and (= format "lib")
-                                                (= goos "windows")
-                                                (not (System/getenv "CC")))
-                                       (let [cc "x86_64-w64-mingw32-gcc"]
-                                         (when-not (fs/which cc)
-                                           (die "Windows lib cross-compile"
-                                                " needs mingw-w64 (" cc ");"
-                                                " install gcc-mingw-w64-x86-64"
-                                                " or set CC"))
-                                         {"CC" cc}))
-                                     (when goos {"GOOS" goos})
-                                     (when goarch {"GOARCH" goarch})
-                                     (when (and (= goos "plan9")
-                                                (str/starts-with?
-                                                  (str/trim
-                                                    (:out (process/shell
-                                                            {:out :string
-                                                             :err :string}
-                                                            go-bin "version")))
-                                                  "go version go1.24"))
-                                       {"GOEXPERIMENT" "nospinbitmutex"}))]
-
-                (msg "Building" format "...")
-
-                (let [io-opts (if (:quiet *opts*)
-                                {:out :string :err :string}
-                                {:out :inherit :err :inherit})]
-
-                  ;; go mod tidy
-                  (process/shell (merge {:dir output-dir
-                                         :extra-env build-env}
-                                        io-opts)
-                                 go-bin "mod" "tidy")
-
-                  ;; Build
-                  (timer-start)
-                  (let [build-tags
-                        (str/join "," (aot-build-tags))
-                        build-args
-                        (concat [go-bin "build"
-                                 "-trimpath"
-                                 "-ldflags" "-s -w"
-                                 "-o" binary-name]
-                                (when (seq build-tags)
-                                  ["-tags" build-tags])
-                                (when build-mode [build-mode])
-                                ["main.go"])]
-                    (apply process/shell (merge {:dir output-dir
-                                                 :extra-env build-env}
-                                                io-opts)
-                           build-args)))
-                (timer-end "GO→BIN")
+                    build-env (go-build output-dir binary-name format
+                                        goos goarch)]
 
                 (let [built-file (str output-dir "/" binary-name)]
                   (if (fs/exists? built-file)
@@ -2682,7 +3386,8 @@ Less common:
                               h-source (str output-dir "/" h-file)]
                           (when (fs/exists? h-source)
                             (fs/copy h-source h-output {:replace-existing true})
-                            (msg "Generated:" h-output))))
+                            (msg "Generated:" h-output))
+                          (python-bindings output @export-map)))
 
                       ;; Generate binary size report if requested
                       (when-let [{:keys [path keep open] report-fmt :format} (report-ext)]
@@ -2877,7 +3582,7 @@ Less common:
               format (infer-format output to)]
           (when-not output
             (die "Multiple input files require -o output"))
-          (when (contains? #{"clj" "glj" "go" "bb"} format)
+          (when (contains? #{"clj" "glj" "go" "bb" "all"} format)
             (die "Multiple input files not supported for format: " format))
           (doseq [f files]
             (when-not (fs/exists? f)
@@ -3001,71 +3706,149 @@ Less common:
       (binding [*out* *err*]
         (println "done" (str "(" total-time "ms)"))))))
 
-(defn -main [& args]
-  (when-not VERSION
-    (die "gloat.clj not called from gloat"))
-
-  (setup)
-
-  (let [parsed-opts (parse-opts (vec args))]
-    (binding [*opts* parsed-opts]
-      (do-version)
-      (do-formats)
-      (do-engines)
-      (do-extensions)
-      (do-platforms)
-      (do-shell)
-      (do-shell-all)
-      (do-reset)
-      (do-upgrade)
-      (do-complete)
-      (validate-extensions)
-
-      (let [opts (set-vars parsed-opts)
-            format (infer-format (:output opts) (:to opts))
-            deps-only (contains? (parse-extensions (or (:ext opts) []))
-                                 "deps")
-            opts (if deps-only
-                   (assoc opts
-                          :user-quiet (:quiet opts)
-                          :quiet true :verbose false)
-                   opts)]
-
-        (binding [*opts* opts]
-          (check-exists (:output opts) (:force opts))
-
-          ;; Fail fast if output already exists (unless --force or deps-only)
-          (when (and (:output opts) (not (:force opts)) (not deps-only))
-            (when (fs/exists? (:output opts))
-              (die "Output already exists: " (:output opts)
-                   " (use --force to overwrite)"))
-            (when (and (str/ends-with? (:output opts) "/")
-                       (fs/exists? (str/replace (:output opts) #"/$" "")))
-              (die "Output already exists: "
-                   (str/replace (:output opts) #"/$" "")
-                   " (use --force to overwrite)")))
+(defn compile-opts
+  "Run gloat for parsed command line options. This is the body of -main,
+  shared with the compile daemon."
+  [parsed-opts]
+  (binding [*opts* parsed-opts]
+    (do-version)
+    (do-formats)
+    (do-engines)
+    (do-extensions)
+    (do-platforms)
+    (do-shell)
+    (do-shell-all)
+    (do-reset)
+    (do-upgrade)
+    (do-complete)
+    (validate-extensions)
+
+    (let [opts (set-vars parsed-opts)
+          format (infer-format (:output opts) (:to opts))
+          deps-only (contains? (parse-extensions (or (:ext opts) []))
+                               "deps")
+          opts (if deps-only
+                 (assoc opts
+                        :user-quiet (:quiet opts)
+                        :quiet true :verbose false)
+                 opts)]
 
-          (print-verbose-header opts format)
+      (binding [*opts* opts]
+        (check-exists (:output opts) (:force opts))
+
+        ;; Fail fast if output already exists (unless --force or deps-only)
+        (when (and (:output opts) (not (:force opts)) (not deps-only))
+          (when (fs/exists? (:output opts))
+            (die "Output already exists: " (:output opts)
+                 " (use --force to overwrite)"))
+          (when (and (str/ends-with? (:output opts) "/")
+                     (fs/exists? (str/replace (:output opts) #"/$" "")))
+            (die "Output already exists: "
+                 (str/replace (:output opts) #"/$" "")
+                 " (use --force to overwrite)")))
+
+        (print-verbose-header opts format)
+
+        ;; Dispatch based on input/output
+        (cond
+          (nil? (:output opts))
+          (if (contains? #{"clj" "bb" "lg" "LG" "glj" "go"} format)
+            (convert-to-stdout
+             (:input opts) format (or (:namespace opts) "main.core"))
+            (die "Format '" format "' requires -o output"))
+
+          (fs/regular-file? (:input opts))
+          (cond
+            (= (:engine opts) "graalvm")
+            (convert-files-graal-bin
+              [(:input opts)]
+              (:output opts)
+              (:namespace opts))
+
+            (= (:engine opts) "jolt")
+            (convert-files-jolt-bin
+              [(:input opts)]
+              (:output opts)
+              (:namespace opts)
+              (fs/cwd))
+
+            (and (= format "lib")
+                 (contains? #{"let-go-vm" "let-go-lower-vm"}
+                            (:engine opts)))
+            (convert-files-lg-lib
+              [(:input opts)]
+              (:output opts)
+              (:namespace opts)
+              (:module opts)
+              (:platform opts)
+              (= (:engine opts) "let-go-lower-vm"))
 
-          ;; Dispatch based on input/output
+            :else
+            (convert-file
+              (:input opts)
+              (:output opts)
+              format
+              (:namespace opts)
+              (:module opts)
+              (:platform opts)))
+
+          (fs/directory? (:input opts))
           (cond
-            (nil? (:output opts))
-            (if (contains? #{"clj" "bb" "lg" "LG" "glj" "go"} format)
-              (convert-to-stdout
-               (:input opts) format (or (:namespace opts) "main.core"))
-              (die "Format '" format "' requires -o output"))
+            (= format "all")
+            (die "Format 'all' requires a single input file")
+
+            (= (:engine opts) "graalvm")
+            (convert-files-graal-bin
+              (expand-dir-args [(:input opts)])
+              (:output opts)
+              (:namespace opts))
+
+            (= (:engine opts) "jolt")
+            (convert-files-jolt-bin
+              (expand-dir-args [(:input opts)])
+              (:output opts)
+              (:namespace opts)
+              (:input opts))
+
+            (and (= format "lib")
+                 (contains? #{"let-go-vm" "let-go-lower-vm"}
+                            (:engine opts)))
+            (convert-files-lg-lib
+              (expand-dir-args [(:input opts)])
+              (:output opts)
+              (:namespace opts)
+              (:module opts)
+              (:platform opts)
+              (= (:engine opts) "let-go-lower-vm"))
 
-            (fs/regular-file? (:input opts))
+            :else
+            (convert-directory
+              (:input opts)
+              (:output opts)
+              format
+              (:namespace opts)
+              (:module opts)
+              (:platform opts)))
+
+          (= (:input opts) "-")
+          (let [content (slurp *in*)
+                clj? (re-find #"^\s*\(" content)
+                suffix (if clj? ".clj" ".ys")
+                content (if (and clj? (not (re-find #"(?m)^\s*\(ns\s" content)))
+                          (str "(ns main.core)\n" content)
+                          content)
+                tmpfile (str (fs/create-temp-file {:dir GLOAT-TMP :suffix suffix}))]
+            (spit tmpfile content)
             (cond
               (= (:engine opts) "graalvm")
               (convert-files-graal-bin
-                [(:input opts)]
+                [tmpfile]
                 (:output opts)
                 (:namespace opts))
 
               (= (:engine opts) "jolt")
               (convert-files-jolt-bin
-                [(:input opts)]
+                [tmpfile]
                 (:output opts)
                 (:namespace opts)
                 (fs/cwd))
@@ -3074,7 +3857,7 @@ Less common:
                    (contains? #{"let-go-vm" "let-go-lower-vm"}
                               (:engine opts)))
               (convert-files-lg-lib
-                [(:input opts)]
+                [tmpfile]
                 (:output opts)
                 (:namespace opts)
                 (:module opts)
@@ -3083,138 +3866,138 @@ Less common:
 
               :else
               (convert-file
-                (:input opts)
+                tmpfile
                 (:output opts)
                 format
                 (:namespace opts)
                 (:module opts)
                 (:platform opts)))
+            (fs/delete tmpfile))
+
+          :else
+          (die "Invalid input: " (:input opts)))
+
+        ;; Execute compiled output if --run
+        (when (:run opts)
+          (when-not (fs/exists? (:output opts))
+            (die "Compilation failed - no output to run"))
+
+          ;; --time excludes tool lookup from the timed region
+          (let [runner
+                (case format
+                  "bb"
+                  (let [bb (:BB make-vars)]
+                    (when-not (fs/executable? bb)
+                      (die (str
+                            "Babashka not found"
+                            "(run 'make shell' to install)")))
+                    #(apply process/shell {:continue true}
+                            bb (:output opts) (:run-args opts)))
 
-            (fs/directory? (:input opts))
-            (cond
-              (= (:engine opts) "graalvm")
-              (convert-files-graal-bin
-                (expand-dir-args [(:input opts)])
-                (:output opts)
-                (:namespace opts))
+                  "lg"
+                  (let [lg (find-lg)]
+                    #(apply process/shell {:continue true}
+                            lg "-source-paths" lg-source-paths
+                            (:output opts) (:run-args opts)))
+
+                  ("bin" "lib" "wasm" "js")
+                  #(apply process/shell {:continue true}
+                          (:output opts) (:run-args opts))
+
+                  (die "Format '" format
+                       "' cannot be executed with --run"))
+                t0 (System/nanoTime)
+                rc (:exit (runner))
+                elapsed (- (System/nanoTime) t0)]
+
+            (when (:time opts)
+              (binding [*out* *err*]
+                (println (clojure.core/format
+                          "> gloat run time: %.3fs"
+                          (/ elapsed 1.0e9)))))
+            (when (:run-tmpdir opts)
+              (fs/delete-tree (:run-tmpdir opts)))
+            (System/exit rc)))
+
+        (print-verbose-footer opts)))))
 
-              (= (:engine opts) "jolt")
-              (convert-files-jolt-bin
-                (expand-dir-args [(:input opts)])
-                (:output opts)
-                (:namespace opts)
-                (:input opts))
+;;------------------------------------------------------------------------------
+;; Compile Daemon
+;;------------------------------------------------------------------------------
 
-              (and (= format "lib")
-                   (contains? #{"let-go-vm" "let-go-lower-vm"}
-                              (:engine opts)))
-              (convert-files-lg-lib
-                (expand-dir-args [(:input opts)])
-                (:output opts)
-                (:namespace opts)
-                (:module opts)
-                (:platform opts)
-                (= (:engine opts) "let-go-lower-vm"))
+(defn daemon-socket []
+  (or (System/getenv "GLOAT_DAEMON_SOCKET")
+      (str GLOAT-ROOT "/.cache/local/gloat.sock")))
+
+(defn daemon-declines?
+  "True for requests the daemon hands back to a normal gloat run: those
+  that exit early, read stdin, run programs or compile several inputs."
+  [opts]
+  (or (some opts [:formats :engines :extensions :platforms :version
+                  :shell :shell-all :reset :upgrade :complete :which
+                  :repl :nrepl :srepl :daemon :deps :classpath
+                  :fmt :color :run])
+      (not= 1 (count (:args opts)))
+      (= "-" (first (:args opts)))
+      (some #{"deps" "serve" "open"} (parse-extensions (or (:ext opts) [])))))
+
+(defn daemon-request
+  "Run one daemon request. The request carries either :opts (EDN from
+  bin/gloat) or :argv (raw arguments), plus the client's :cwd, gloat
+  :version and daemon/REQUEST-ENV values as :env. Returns an exit code,
+  or :fallback when the client should run gloat itself."
+  [{:keys [opts argv cwd version env]}]
+  (let [getopt (when-not opts (run-getopt argv :string))]
+    (if (and getopt (not (zero? (:exit getopt))))
+      (do (binding [*out* *err*] (print (:err getopt)))
+          (:exit getopt))
+      (let [parsed (edn/read-string (or opts (:out getopt)))
+            ;; The daemon's working directory is not the client's
+            absolute #(if (and % cwd (not (fs/absolute? %)))
+                        (cond-> (str (fs/path cwd %))
+                          (str/ends-with? % "/") (str "/"))
+                        %)]
+        (if (or (and version (not= version VERSION))
+                (some (fn [[k v]] (not= v (System/getenv (name k)))) env)
+                (daemon-declines? parsed))
+          :fallback
+          (try
+            (binding [*daemon* true]
+              (compile-opts (-> parsed
+                                (update :args #(mapv absolute %))
+                                (update :out absolute))))
+            0
+            (catch clojure.lang.ExceptionInfo e
+              (or (:gloat/exit (ex-data e)) (throw e)))))))))
+
+(defn start-daemon
+  "Serve compile requests on the daemon socket until killed. This
+  process stays loaded, so a request skips starting Babashka, loading
+  gloat.clj and 'make gloat-vars'."
+  [opts]
+  (let [socket (daemon-socket)]
+    (when (daemon/running? socket)
+      (die "A gloat daemon is already listening on " socket))
+    (fs/create-dirs (fs/parent socket))
+    (daemon/serve {:socket socket
+                   :handle daemon-request
+                   :quiet (:quiet opts)})))
 
-              :else
-              (convert-directory
-                (:input opts)
-                (:output opts)
-                format
-                (:namespace opts)
-                (:module opts)
-                (:platform opts)))
+;;------------------------------------------------------------------------------
+;; Entry Point
+;;------------------------------------------------------------------------------
 
-            (= (:input opts) "-")
-            (let [content (slurp *in*)
-                  clj? (re-find #"^\s*\(" content)
-                  suffix (if clj? ".clj" ".ys")
-                  content (if (and clj? (not (re-find #"(?m)^\s*\(ns\s" content)))
-                            (str "(ns main.core)\n" content)
-                            content)
-                  tmpfile (str (fs/create-temp-file {:dir GLOAT-TMP :suffix suffix}))]
-              (spit tmpfile content)
-              (cond
-                (= (:engine opts) "graalvm")
-                (convert-files-graal-bin
-                  [tmpfile]
-                  (:output opts)
-                  (:namespace opts))
-
-                (= (:engine opts) "jolt")
-                (convert-files-jolt-bin
-                  [tmpfile]
-                  (:output opts)
-                  (:namespace opts)
-                  (fs/cwd))
-
-                (and (= format "lib")
-                     (contains? #{"let-go-vm" "let-go-lower-vm"}
-                                (:engine opts)))
-                (convert-files-lg-lib
-                  [tmpfile]
-                  (:output opts)
-                  (:namespace opts)
-                  (:module opts)
-                  (:platform opts)
-                  (= (:engine opts) "let-go-lower-vm"))
+(defn -main [& args]
+  (when-not VERSION
+    (die "gloat.clj not called from gloat"))
 
-                :else
-                (convert-file
-                  tmpfile
-                  (:output opts)
-                  format
-                  (:namespace opts)
-                  (:module opts)
-                  (:platform opts)))
-              (fs/delete tmpfile))
+  (setup)
+  (clean-stale-tmp)
 
-            :else
-            (die "Invalid input: " (:input opts)))
-
-          ;; Execute compiled output if --run
-          (when (:run opts)
-            (when-not (fs/exists? (:output opts))
-              (die "Compilation failed - no output to run"))
-
-            ;; --time excludes tool lookup from the timed region
-            (let [runner
-                  (case format
-                    "bb"
-                    (let [bb (:BB make-vars)]
-                      (when-not (fs/executable? bb)
-                        (die (str
-                              "Babashka not found"
-                              "(run 'make shell' to install)")))
-                      #(apply process/shell {:continue true}
-                              bb (:output opts) (:run-args opts)))
-
-                    "lg"
-                    (let [lg (find-lg)]
-                      #(apply process/shell {:continue true}
-                              lg "-source-paths" lg-source-paths
-                              (:output opts) (:run-args opts)))
-
-                    ("bin" "lib" "wasm" "js")
-                    #(apply process/shell {:continue true}
-                            (:output opts) (:run-args opts))
-
-                    (die "Format '" format
-                         "' cannot be executed with --run"))
-                  t0 (System/nanoTime)
-                  rc (:exit (runner))
-                  elapsed (- (System/nanoTime) t0)]
-
-              (when (:time opts)
-                (binding [*out* *err*]
-                  (println (clojure.core/format
-                            "> gloat run time: %.3fs"
-                            (/ elapsed 1.0e9)))))
-              (when (:run-tmpdir opts)
-                (fs/delete-tree (:run-tmpdir opts)))
-              (System/exit rc)))
-
-          (print-verbose-footer opts))))))
+  (let [parsed-opts (parse-opts (vec args))]
+    (if (:daemon parsed-opts)
+      (start-daemon parsed-opts)
+      (compile-opts parsed-opts))))
 
 (when (= *file* (System/getProperty "babashka.file"))
   (apply -main *command-line-args*))
@@ -0,0 +1,264 @@
+;; python.clj - Generate Python bindings for shared library builds
+
+(ns python
+  (:require
+   [babashka.fs :as fs]
+   [clojure.string :as str]))
+
+(def scalar-types
+  "EXPORT scalar types as ctypes types and C declarations."
+  {:int   {:ctype "c.c_longlong" :cdecl "long long"}
+   :float {:ctype "c.c_double" :cdecl "double"}
+   :str   {:ctype "c.c_char_p" :cdecl "char*"}
+   :bool  {:ctype "c.c_int" :cdecl "int"}
+   :null  {:ctype "None" :cdecl "void"}})
+
+(def buffer-types
+  "EXPORT buffer types. :code is the array typecode of the Python value
+  and :kinds the buffer formats accepted without a copy. :data values go
+  through the module's MessagePack packb and unpackb."
+  {[:int]   {:ctype "c.c_longlong" :cdecl "long long" :cffi "long long[]"
+             :code "q" :kinds "ql"}
+   [:float] {:ctype "c.c_double" :cdecl "double" :cffi "double[]"
+             :code "d" :kinds "d"}
+   :bytes   {:ctype "c.c_char" :cdecl "char" :cffi "char[]"
+             :code "B" :kinds "Bbc"}
+   :data    {:ctype "c.c_char" :cdecl "char" :cffi "char[]"
+             :code "B" :data true}})
+
+(defn- signature
+  "Split an EXPORT type-spec into [arg-types return-type]."
+  [type-spec]
+  (let [type-vec (if (vector? type-spec) type-spec [type-spec])]
+    [(if (> (count type-vec) 1) (butlast type-vec) [])
+     (last type-vec)]))
+
+(defn- type-name [t]
+  (if (vector? t) (str "[" (name (first t)) "]") (name t)))
+
+(defn- c-name [fn-name]
+  (str/replace (name fn-name) "-" "_"))
+
+(defn- arg-names [arg-types]
+  (map-indexed (fn [i _] (str "arg" i)) arg-types))
+
+(defn- simple?
+  "True when the raw foreign function can be exported as is."
+  [arg-types return-type]
+  (and (every? #{:int :float :bool} arg-types)
+       (#{:int :float :null} return-type)))
+
+(defn- buffer-setup [arg-types]
+  (keep-indexed
+   (fn [i t]
+     (when-let [{:keys [code kinds data]} (buffer-types t)]
+       (if data
+         (str "        b" i " = packb(arg" i ")\n"
+              "        n" i " = len(b" i ")")
+         (str "        b" i ", n" i " = _buffer(arg" i ", '" code "', '"
+              kinds "')"))))
+   arg-types))
+
+(defn- call-args [arg-types pointer]
+  (map-indexed
+   (fn [i t]
+     (cond
+       (buffer-types t) (str (pointer i (buffer-types t)) ", n" i)
+       (= :str t) (str "arg" i ".encode()")
+       :else (str "arg" i)))
+   arg-types))
+
+(defn- wrapper
+  "The body of a Python wrapper around the foreign function f."
+  [f arg-types return-type {:keys [pointer out-len out-ref out-val]}]
+  (let [return-buffer (buffer-types return-type)
+        args (call-args arg-types pointer)
+        call #(str f "(" (str/join ", " %) ")")]
+    (str/join
+     "\n"
+     (concat
+      (buffer-setup arg-types)
+      (cond
+        return-buffer
+        [(str "        out_len = " out-len)
+         (str "        p = " (call (concat args [out-ref])))
+         (let [take (str "take_buffer(p, " out-val ", '"
+                         (:code return-buffer) "')")]
+           (str "        return "
+                (if (:data return-buffer) (str "unpackb(" take ")") take)))]
+        (= :str return-type) [(str "        return take_string(" (call args) ")")]
+        (= :bool return-type) [(str "        return " (call args) " != 0")]
+        (= :null return-type) [(str "        " (call args))]
+        :else [(str "        return " (call args))])))))
+
+(defn- ctypes-binding [fn-name type-spec]
+  (let [[arg-types return-type] (signature type-spec)
+        py (c-name fn-name)
+        f (str "_" py)
+        return-buffer (buffer-types return-type)
+        argtypes (concat
+                  (mapcat #(if-let [b (buffer-types %)]
+                             ["c.c_void_p" "c.c_longlong"]
+                             [(:ctype (scalar-types %))])
+                          arg-types)
+                  (when return-buffer ["c.POINTER(c.c_longlong)"]))
+        params (str/join ", " (arg-names arg-types))
+        tuple #(str "(" (str/join ", " %) (when (= 1 (count %)) ",") ")")]
+    (str
+     "    # " py "(" (str/join ", " (map type-name arg-types)) ") -> "
+     (type-name return-type) "\n"
+     "    " f " = lib." py "\n"
+     "    " f ".argtypes = " (tuple argtypes) "\n"
+     "    " f ".restype = "
+     (cond return-buffer "c.c_void_p"
+           (= :str return-type) "c.c_void_p"
+           :else (:ctype (scalar-types return-type))) "\n"
+     (if (simple? arg-types return-type)
+       (str "    " py " = " f "\n")
+       (str "\n    def " py "(" params "):\n"
+            (wrapper f arg-types return-type
+                     {:pointer (fn [i b] (str "_pointer(b" i ", n" i ", "
+                                              (:ctype b) ")"))
+                      :out-len "c.c_longlong()"
+                      :out-ref "c.byref(out_len)"
+                      :out-val "out_len.value"})
+            "\n"))
+     (when (= :str return-type)
+       (str "\n    " f "_into = lib." py "_into\n"
+            "    " f "_into.argtypes = "
+            (tuple (concat argtypes ["c.c_void_p" "c.c_size_t"])) "\n"
+            "    " f "_into.restype = c.c_size_t\n"
+            "\n    def " py "_into(" params (when (seq params) ", ") "buf):\n"
+            (str/join "\n" (buffer-setup arg-types))
+            (when (some buffer-types arg-types) "\n")
+            "        return " f "_into("
+            (str/join ", "
+                      (concat (call-args arg-types
+                                         (fn [i b] (str "_pointer(b" i ", n" i
+                                                        ", " (:ctype b) ")")))
+                              ["writable(buf)" "len(buf)"]))
+            ")\n")))))
+
+(defn- cffi-binding [fn-name type-spec]
+  (let [[arg-types return-type] (signature type-spec)
+        py (c-name fn-name)
+        params (str/join ", " (arg-names arg-types))
+        pointer (fn [i b] (str "from_buffer('" (:cffi b) "', b" i ")"))]
+    (str
+     (if (simple? arg-types return-type)
+       (str "    " py " = lib." py "\n")
+       (str "\n    def " py "(" params "):\n"
+            (wrapper (str "lib." py) arg-types return-type
+                     {:pointer pointer
+                      :out-len "ffi.new('long long *')"
+                      :out-ref "out_len"
+                      :out-val "out_len[0]"})
+            "\n"))
+     (when (= :str return-type)
+       (str "\n    def " py "_into(" params (when (seq params) ", ") "buf):\n"
+            (str/join "\n" (buffer-setup arg-types))
+            (when (some buffer-types arg-types) "\n")
+            "        return lib." py "_into("
+            (str/join ", "
+                      (concat (call-args arg-types pointer)
+                              ["from_buffer('char[]', buf, require_writable=True)"
+                               "len(buf)"]))
+            ")\n")))))
+
+(defn- cdef [fn-name type-spec]
+  (let [[arg-types return-type] (signature type-spec)
+        py (c-name fn-name)
+        return-buffer (buffer-types return-type)
+        params (concat
+                (map-indexed
+                 (fn [i t]
+                   (if-let [b (buffer-types t)]
+                     (str (:cdecl b) "* arg" i ", long long arg" i "_len")
+                     (str (:cdecl (scalar-types t)) " arg" i)))
+                 arg-types)
+                (when return-buffer ["long long* out_len"]))
+        decl (fn [ret nm ps]
+               (str ret " " nm "(" (if (seq ps) (str/join ", " ps) "void")
+                    ");"))]
+    (str/join
+     "\n"
+     (cons (decl (if return-buffer
+                   (str (:cdecl return-buffer) "*")
+                   (:cdecl (scalar-types return-type)))
+                 py params)
+           (when (= :str return-type)
+             [(decl "size_t" (str py "_into")
+                    (concat params ["char* buf" "size_t cap"]))])))))
+
+(defn- uses-data? [export-map]
+  (boolean (some #{:data} (mapcat (comp flatten signature) (vals export-map)))))
+
+(defn python-names [export-map]
+  (mapcat (fn [[fn-name type-spec]]
+            (let [py (c-name fn-name)]
+              (if (= :str (second (signature type-spec)))
+                [py (str py "_into")]
+                [py])))
+          export-map))
+
+(defn generate
+  "Generate a Python module binding a shared library's EXPORT functions.
+
+   Config keys:
+     :output       - the .so/.dylib/.dll output path
+     :export-map   - the program's EXPORT map
+     :mode         - true for ctypes, \"cffi\" to also write a cffi
+                     API-mode build script
+     :template-dir - path to template directory
+
+   The module is written next to the library as NAME_bindings.py (with
+   dashes turned into underscores) and the build script as NAME_build.py.
+   Returns the generated paths."
+  [{:keys [output export-map mode template-dir]}]
+  (let [dir (str (fs/parent (fs/absolutize output)))
+        lib-file (fs/file-name output)
+        stem (str/replace lib-file #"\.(so|dylib|dll)$" "")
+        base (str/replace stem #"[^A-Za-z0-9_]" "_")
+        ;; NAME.py would be shadowed: Python imports NAME.so as an
+        ;; extension module before looking for NAME.py
+        module (str base "_bindings")
+        cffi? (= "cffi" mode)
+        cffi-module (str "_" base "_cffi")
+        names (python-names export-map)
+        data? (uses-data? export-map)
+        quoted (str/join ", " (map #(str "'" % "'")
+                                   (cond-> (vec names)
+                                     data? (conj "packb" "unpackb"))))
+        py-output (str dir "/" module ".py")
+        build-output (str dir "/" base "_build.py")]
+    (spit py-output
+          (-> (slurp (str template-dir "/lib-bindings.py"))
+              (str/replace "PYTHON-ALL" (str "[" quoted "]"))
+              (str/replace "PYTHON-NAMES"
+                           (str/join ", " (map #(str "'" % "': " %) names)))
+              (str/replace "LIBRARY-FILE" lib-file)
+              (str/replace "CFFI-MODULE"
+                           (if cffi? (str "'" cffi-module "'") "None"))
+              (str/replace "DATA-CODEC\n"
+                           (if data?
+                             (slurp (str template-dir "/lib-bindings-data.py"))
+                             ""))
+              (str/replace "CTYPES-BINDINGS"
+                           (str/join "\n" (map (fn [[k v]] (ctypes-binding k v))
+                                               export-map)))
+              (str/replace "CFFI-BINDINGS"
+                           (str/join "\n" (map (fn [[k v]] (cffi-binding k v))
+                                               export-map)))))
+    (when cffi?
+      (spit build-output
+            (-> (slurp (str template-dir "/lib-bindings-build.py"))
+                (str/replace "CDEF-DECLARATIONS"
+                             (str/join "\n"
+                                       (cons "void gloat_free(void* p);"
+                                             (map (fn [[k v]] (cdef k v))
+                                                  export-map))))
+                (str/replace "CFFI-MODULE" cffi-module)
+                (str/replace "PYTHON-MODULE" module)
+                (str/replace "HEADER-FILE" (str stem ".h"))
+                (str/replace "LIBRARY-FILE" lib-file))))
+    (cond-> [py-output] cffi? (conj build-output))))
@@ -10,10 +10,11 @@ _gloat() {
           --platform -X --ext --ns --module
           --formats --engines --extensions --platforms
           --complete --shell --shell-all
-          --which --repl --nrepl --srepl --deps --classpath --reset --upgrade
+          --which --repl --nrepl --srepl --daemon --deps --classpath
+          --reset --upgrade --profile-startup
           --glj-build"
 
-    formats="clj bb lg glj go dir bin lib wasm js"
+    formats="clj bb lg glj go dir all bin lib wasm js"
     engines="glj graalvm jolt lgvm lglvm lgl"
     platforms="linux/amd64 linux/arm64 linux/386 linux/arm
                 linux/ppc64le linux/s390x linux/riscv64 linux/mips64le
@@ -39,7 +40,7 @@ _gloat() {
             return 0
             ;;
         -X|--ext)
-            COMPREPLY=( $(compgen -W "brotli deps goimports gzip html open prune report serve" -- "${cur}") )
+            COMPREPLY=( $(compgen -W "brotli deps goimports gzip html open prune python report serve" -- "${cur}") )
             return 0
             ;;
         --complete)
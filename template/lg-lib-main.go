@@ -1,11 +1,14 @@
 package main
 
+// #include <stdlib.h>
 import "C"
 
 import (
 	"bytes"
 	_ "embed"
 	"fmt"
+	"sync"
+	"unsafe"
 
 	"github.com/nooga/let-go/pkg/bytecode"
 	"github.com/nooga/let-go/pkg/compiler"
@@ -50,7 +53,15 @@ func init() {
 	}
 }
 
+// invokeMu serializes calls into the VM: exported functions may be called
+// from many host threads at once, but they all share one execution
+// context (and rt.NS may create the namespace it looks up), so let-go
+// libraries are safe to call concurrently but run one call at a time.
+var invokeMu sync.Mutex
+
 func invoke(name string, args ...vm.Value) vm.Value {
+	invokeMu.Lock()
+	defer invokeMu.Unlock()
 	v := rt.NS(programNamespace).LookupLocal(vm.Symbol(name))
 	if v == nil {
 		panic(fmt.Sprintf("exported var %s/%s not found", programNamespace, name))
@@ -62,6 +73,29 @@ func invoke(name string, args ...vm.Value) vm.Value {
 	return result
 }
 
+// gloat_free releases strings and buffers returned by exported functions
+//
+//export gloat_free
+func gloat_free(p unsafe.Pointer) {
+	C.free(p)
+}
+
+// gloatCopyString writes s into the caller's buf for the *_into exports,
+// truncating to cap-1 bytes plus a NUL, and returns len(s) so callers can
+// retry with a buffer of at least len(s)+1 bytes
+func gloatCopyString(s string, buf *C.char, cap C.size_t) C.size_t {
+	if buf != nil && cap > 0 {
+		n := len(s)
+		if C.size_t(n) >= cap {
+			n = int(cap) - 1
+		}
+		dst := unsafe.Slice((*byte)(unsafe.Pointer(buf)), n+1)
+		copy(dst, s[:n])
+		dst[n] = 0
+	}
+	return C.size_t(len(s))
+}
+
 EXPORT-FUNCTIONS
 
 func main() {
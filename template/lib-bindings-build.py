@@ -0,0 +1,31 @@
+# Generated by gloat from the EXPORT map of LIBRARY-FILE. Do not edit.
+"""Build CFFI-MODULE, a cffi API-mode extension for LIBRARY-FILE.
+
+Run this script (it needs cffi and a C compiler) from any directory; the
+extension is written next to LIBRARY-FILE, where PYTHON-MODULE.py picks it
+up in place of ctypes.
+"""
+
+import os
+import sys
+
+from cffi import FFI
+
+here = os.path.dirname(os.path.abspath(__file__))
+origin = '@loader_path' if sys.platform == 'darwin' else '$ORIGIN'
+
+ffibuilder = FFI()
+ffibuilder.cdef("""
+CDEF-DECLARATIONS
+""")
+ffibuilder.set_source(
+    'CFFI-MODULE',
+    '#include "HEADER-FILE"',
+    include_dirs=[here],
+    extra_objects=[os.path.join(here, 'LIBRARY-FILE')],
+    extra_link_args=[] if sys.platform == 'win32'
+    else [f'-Wl,-rpath,{origin}'],
+)
+
+if __name__ == '__main__':
+    ffibuilder.compile(tmpdir=here)
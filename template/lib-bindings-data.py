@@ -0,0 +1,195 @@
+# MessagePack codec for data arguments and results. The library decodes
+# data arguments into Glojure vectors, maps and scalars and encodes its
+# results with integers as int64 and floats as float64, so a list of
+# numbers packs and unpacks in bulk instead of item by item.
+
+import struct as _struct
+import sys
+
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def _array_header(n):
+    if n < 16:
+        return bytes((0x90 | n,))
+    if n < 0x10000:
+        return b'\xdc' + n.to_bytes(2, 'big')
+    return b'\xdd' + n.to_bytes(4, 'big')
+
+
+def _pack_numbers(values, code, tag):
+    """A MessagePack array of int64s or float64s: 9-byte items copied in
+    one strided slice per byte position."""
+    items = array(code, values)
+    if not _BIG_ENDIAN:
+        items.byteswap()
+    raw = items.tobytes()
+    n = len(items)
+    start = len(_array_header(n))
+    out = bytearray(start + 9 * n)
+    out[:start] = _array_header(n)
+    out[start::9] = tag * n
+    for k in range(8):
+        out[start + k + 1::9] = raw[k::8]
+    return out
+
+
+def _unpack_numbers(data, start, n):
+    """The items of an array of n int64s or float64s at start, or None if
+    it holds anything else."""
+    if len(data) - start != 9 * n or n == 0:
+        return None
+    tags = data[start::9]
+    tag = tags[:1]
+    if tag not in (b'\xd3', b'\xcb') or tags != tag * n:
+        return None
+    raw = bytearray(8 * n)
+    for k in range(8):
+        raw[k::8] = data[start + k + 1::9]
+    items = array('q' if tag == b'\xd3' else 'd')
+    items.frombytes(raw)
+    if not _BIG_ENDIAN:
+        items.byteswap()
+    return items.tolist()
+
+
+def _pack(value, out):
+    if value is None:
+        out += b'\xc0'
+    elif value is True:
+        out += b'\xc3'
+    elif value is False:
+        out += b'\xc2'
+    elif isinstance(value, int):
+        if -32 <= value < 128:
+            out += (value & 0xff).to_bytes(1, 'big')
+        else:
+            out += b'\xd3' + value.to_bytes(8, 'big', signed=True)
+    elif isinstance(value, float):
+        out += _struct.pack('>Bd', 0xcb, value)
+    elif isinstance(value, str):
+        data = value.encode()
+        n = len(data)
+        if n < 32:
+            out += bytes((0xa0 | n,))
+        elif n < 0x100:
+            out += bytes((0xd9, n))
+        elif n < 0x10000:
+            out += b'\xda' + n.to_bytes(2, 'big')
+        else:
+            out += b'\xdb' + n.to_bytes(4, 'big')
+        out += data
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        out += b'\xc6' + len(data).to_bytes(4, 'big') + data
+    elif isinstance(value, dict):
+        n = len(value)
+        out += (bytes((0x80 | n,)) if n < 16
+                else b'\xde' + n.to_bytes(2, 'big') if n < 0x10000
+                else b'\xdf' + n.to_bytes(4, 'big'))
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    elif isinstance(value, (list, tuple, array)):
+        out += _array_header(len(value))
+        for item in value:
+            _pack(item, out)
+    else:
+        raise TypeError(f'cannot pack {type(value).__name__} as data')
+
+
+def packb(value):
+    """Encode value (None, bool, int, float, str, bytes, list, tuple,
+    dict, array) as MessagePack for a data argument."""
+    if isinstance(value, array) and value.typecode in 'qd':
+        return _pack_numbers(value, value.typecode,
+                             b'\xd3' if value.typecode == 'q' else b'\xcb')
+    if isinstance(value, (list, tuple)) and len(value) > 16:
+        kinds = set(map(type, value))
+        if kinds == {int}:
+            try:
+                return _pack_numbers(value, 'q', b'\xd3')
+            except OverflowError:
+                pass
+        elif kinds == {float}:
+            return _pack_numbers(value, 'd', b'\xcb')
+    out = bytearray()
+    _pack(value, out)
+    return out
+
+
+def _unpack(data, i):
+    t = data[i]
+    i += 1
+    if t <= 0x7f:
+        return t, i
+    if t >= 0xe0:
+        return t - 0x100, i
+    if 0xa0 <= t <= 0xbf:
+        n = t & 0x1f
+        return data[i:i + n].decode(), i + n
+    if 0x90 <= t <= 0x9f:
+        return _unpack_array(data, i, t & 0x0f)
+    if 0x80 <= t <= 0x8f:
+        return _unpack_map(data, i, t & 0x0f)
+    if t == 0xc0:
+        return None, i
+    if t in (0xc2, 0xc3):
+        return t == 0xc3, i
+    if t in _SIZED:
+        kind, size = _SIZED[t]
+        n = int.from_bytes(data[i:i + size], 'big')
+        i += size
+        if kind == 'bin':
+            return bytes(data[i:i + n]), i + n
+        if kind == 'str':
+            return data[i:i + n].decode(), i + n
+        if kind == 'array':
+            return _unpack_array(data, i, n)
+        return _unpack_map(data, i, n)
+    if t in _NUMBERS:
+        fmt = _NUMBERS[t]
+        return _struct.unpack_from(fmt, data, i)[0], i + _struct.calcsize(fmt)
+    raise ValueError(f'unsupported MessagePack type 0x{t:02x} in data')
+
+
+def _unpack_array(data, i, n):
+    items = []
+    for _ in range(n):
+        item, i = _unpack(data, i)
+        items.append(item)
+    return items, i
+
+
+def _unpack_map(data, i, n):
+    items = {}
+    for _ in range(n):
+        key, i = _unpack(data, i)
+        items[key], i = _unpack(data, i)
+    return items, i
+
+
+_SIZED = {0xc4: ('bin', 1), 0xc5: ('bin', 2), 0xc6: ('bin', 4),
+          0xd9: ('str', 1), 0xda: ('str', 2), 0xdb: ('str', 4),
+          0xdc: ('array', 2), 0xdd: ('array', 4),
+          0xde: ('map', 2), 0xdf: ('map', 4)}
+_NUMBERS = {0xca: '>f', 0xcb: '>d',
+            0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+            0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q'}
+
+
+def unpackb(data):
+    """Decode a data result: MessagePack arrays become lists and maps
+    dicts."""
+    if data[:1] in (b'\xdc', b'\xdd'):
+        size = 3 if data[:1] == b'\xdc' else 5
+        n = int.from_bytes(data[1:size], 'big')
+        numbers = _unpack_numbers(data, size, n)
+        if numbers is not None:
+            return numbers
+    value, i = _unpack(data, 0)
+    if i != len(data):
+        raise ValueError('trailing bytes after data')
+    return value
+
+
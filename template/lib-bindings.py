@@ -0,0 +1,155 @@
+# Generated by gloat from the EXPORT map of LIBRARY-FILE. Do not edit.
+"""Python bindings for LIBRARY-FILE.
+
+The library is loaded, and every signature bound, the first time one of its
+functions is used. After that the functions are plain module globals, so a
+call costs one foreign call plus any argument conversion.
+
+Returned strings are decoded and the library's copy released with
+gloat_free.
+Buffer arguments take any contiguous buffer of the right item type (array,
+numpy array, bytes, ...) without copying; other iterables are copied.
+Buffer results come back as array.array ('q' or 'd') or bytes.
+"""
+
+import ctypes
+import os
+import threading
+from array import array
+
+__all__ = PYTHON-ALL
+
+_LIBRARY = 'LIBRARY-FILE'
+_CFFI_MODULE = CFFI-MODULE
+_lock = threading.Lock()
+backend = None
+
+
+def load(path=None):
+    """Load the library and bind its functions; return the backend name.
+
+    Uses the cffi extension built by the companion _build.py script when it
+    is importable, otherwise ctypes on LIBRARY-FILE next to this module.
+    Pass path to load a copy of the library from elsewhere (ctypes only).
+    """
+    global backend
+    with _lock:
+        if backend is None or path is not None:
+            module = None if path is not None else _import_cffi()
+            if module is not None:
+                functions = _bind_cffi(module.ffi, module.lib)
+                backend = 'cffi'
+            else:
+                if path is None:
+                    path = os.path.join(
+                        os.path.dirname(os.path.abspath(__file__)), _LIBRARY)
+                functions = _bind_ctypes(ctypes.CDLL(os.path.abspath(path)))
+                backend = 'ctypes'
+            globals().update(functions)
+    return backend
+
+
+def __getattr__(name):
+    if name in __all__:
+        load()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _import_cffi():
+    if _CFFI_MODULE is None:
+        return None
+    import importlib
+    name = f'{__package__}.{_CFFI_MODULE}' if __package__ else _CFFI_MODULE
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def _buffer(value, code, kinds):
+    """Return (buffer, length) for a buffer argument: value itself if it is
+    a contiguous buffer of the item type, otherwise an array(code) copy."""
+    if code == 'B' and isinstance(value, str):
+        value = value.encode()
+    try:
+        view = memoryview(value)
+    except TypeError:
+        pass
+    else:
+        if (view.c_contiguous and view.format[-1:] in kinds
+                and view.itemsize == array(code).itemsize):
+            return value, view.nbytes // view.itemsize
+    value = array(code, value)
+    return value, len(value)
+
+
+def _pointer(buf, length, ctype):
+    if isinstance(buf, bytes):
+        return buf
+    try:
+        return (ctype * length).from_buffer(buf)
+    except TypeError:
+        return (ctype * length).from_buffer_copy(buf)
+
+
+DATA-CODEC
+def _bind_ctypes(lib):
+    c = ctypes
+    free = lib.gloat_free
+    free.argtypes = (c.c_void_p,)
+    free.restype = None
+    string_at = c.string_at
+
+    def take_string(p):
+        try:
+            return string_at(p).decode()
+        finally:
+            free(p)
+
+    def take_buffer(p, length, code):
+        if code == 'B':
+            out = string_at(p, length) if p else b''
+        else:
+            out = array(code)
+            if p:
+                out.frombytes(string_at(p, length * out.itemsize))
+        if p:
+            free(p)
+        return out
+
+    def writable(buf):
+        return (c.c_char * len(buf)).from_buffer(buf)
+
+CTYPES-BINDINGS
+    return {
+PYTHON-NAMES
+    }
+
+
+def _bind_cffi(ffi, lib):
+    free = lib.gloat_free
+    string = ffi.string
+    from_buffer = ffi.from_buffer
+
+    def take_string(p):
+        try:
+            return string(p).decode()
+        finally:
+            free(p)
+
+    def take_buffer(p, length, code):
+        if code == 'B':
+            out = ffi.unpack(p, length) if p else b''
+        else:
+            out = array(code)
+            if p:
+                out.frombytes(ffi.buffer(p, length * out.itemsize))
+        if p:
+            free(p)
+        return out
+
+CFFI-BINDINGS
+    return {
+PYTHON-NAMES
+    }
@@ -0,0 +1,192 @@
+// MessagePack encoding for the data EXPORT type, added when an EXPORT uses
+// it. Arguments decode straight into Glojure values: arrays become vectors,
+// maps become maps (string keys stay strings), bin becomes []byte. Results
+// encode integers as int64 and floats as float64 whatever their magnitude,
+// so a homogeneous array has a fixed layout a caller can decode in bulk.
+
+func gloatUnpack(b []byte) any {
+	v, rest := gloatUnpackValue(b)
+	if len(rest) != 0 {
+		panic("gloat: trailing bytes after a data argument")
+	}
+	return v
+}
+
+func gloatUnpackUint(b []byte, size int) (uint64, []byte) {
+	if len(b) < size {
+		panic("gloat: truncated data argument")
+	}
+	var n uint64
+	for _, c := range b[:size] {
+		n = n<<8 | uint64(c)
+	}
+	return n, b[size:]
+}
+
+func gloatUnpackBytes(b []byte, size int) ([]byte, []byte) {
+	n, b := gloatUnpackUint(b, size)
+	if uint64(len(b)) < n {
+		panic("gloat: truncated data argument")
+	}
+	return b[:n], b[n:]
+}
+
+func gloatUnpackArray(b []byte, n uint64) (any, []byte) {
+	if n > uint64(len(b)) {
+		panic("gloat: truncated data argument")
+	}
+	items := make([]any, n)
+	for i := range items {
+		items[i], b = gloatUnpackValue(b)
+	}
+	return lang.NewVector(items...), b
+}
+
+func gloatUnpackMap(b []byte, n uint64) (any, []byte) {
+	if 2*n > uint64(len(b)) {
+		panic("gloat: truncated data argument")
+	}
+	kvs := make([]any, 2*n)
+	for i := range kvs {
+		kvs[i], b = gloatUnpackValue(b)
+	}
+	return lang.NewMap(kvs...), b
+}
+
+func gloatUnpackValue(b []byte) (any, []byte) {
+	if len(b) == 0 {
+		panic("gloat: truncated data argument")
+	}
+	t, b := b[0], b[1:]
+	switch {
+	case t <= 0x7f:
+		return int64(t), b
+	case t >= 0xe0:
+		return int64(int8(t)), b
+	case t >= 0xa0 && t <= 0xbf:
+		n := int(t & 0x1f)
+		if len(b) < n {
+			panic("gloat: truncated data argument")
+		}
+		return string(b[:n]), b[n:]
+	case t >= 0x90 && t <= 0x9f:
+		return gloatUnpackArray(b, uint64(t&0x0f))
+	case t >= 0x80 && t <= 0x8f:
+		return gloatUnpackMap(b, uint64(t&0x0f))
+	}
+	switch t {
+	case 0xc0:
+		return nil, b
+	case 0xc2:
+		return false, b
+	case 0xc3:
+		return true, b
+	case 0xc4, 0xc5, 0xc6:
+		s, rest := gloatUnpackBytes(b, 1<<(t-0xc4))
+		return append([]byte(nil), s...), rest
+	case 0xca:
+		n, rest := gloatUnpackUint(b, 4)
+		bits := uint32(n)
+		return float64(*(*float32)(unsafe.Pointer(&bits))), rest
+	case 0xcb:
+		n, rest := gloatUnpackUint(b, 8)
+		return *(*float64)(unsafe.Pointer(&n)), rest
+	case 0xcc, 0xcd, 0xce, 0xcf:
+		n, rest := gloatUnpackUint(b, 1<<(t-0xcc))
+		if n > 1<<63-1 {
+			panic("gloat: uint64 out of range in a data argument")
+		}
+		return int64(n), rest
+	case 0xd0:
+		n, rest := gloatUnpackUint(b, 1)
+		return int64(int8(n)), rest
+	case 0xd1:
+		n, rest := gloatUnpackUint(b, 2)
+		return int64(int16(n)), rest
+	case 0xd2:
+		n, rest := gloatUnpackUint(b, 4)
+		return int64(int32(n)), rest
+	case 0xd3:
+		n, rest := gloatUnpackUint(b, 8)
+		return int64(n), rest
+	case 0xd9, 0xda, 0xdb:
+		s, rest := gloatUnpackBytes(b, 1<<(t-0xd9))
+		return string(s), rest
+	case 0xdc, 0xdd:
+		n, rest := gloatUnpackUint(b, 2<<(t-0xdc))
+		return gloatUnpackArray(rest, n)
+	case 0xde, 0xdf:
+		n, rest := gloatUnpackUint(b, 2<<(t-0xde))
+		return gloatUnpackMap(rest, n)
+	}
+	panic("gloat: unsupported MessagePack type in a data argument")
+}
+
+func gloatPack(v any) []byte {
+	return gloatPackValue(nil, v)
+}
+
+func gloatPackUint(b []byte, n uint64, size int) []byte {
+	for shift := 8 * (size - 1); shift >= 0; shift -= 8 {
+		b = append(b, byte(n>>shift))
+	}
+	return b
+}
+
+func gloatPackBytes(b []byte, t byte, s string) []byte {
+	b = gloatPackUint(append(b, t), uint64(len(s)), 4)
+	return append(b, s...)
+}
+
+// gloatPackSeq writes a 32-bit count header and patches in the count once
+// the sequence (possibly lazy) has been walked
+func gloatPackSeq(b []byte, t byte, s lang.ISeq, pack func([]byte, any) []byte) []byte {
+	b = append(b, t, 0, 0, 0, 0)
+	at := len(b) - 4
+	var n uint64
+	for ; s != nil; s = s.Next() {
+		b = pack(b, s.First())
+		n++
+	}
+	b[at], b[at+1], b[at+2], b[at+3] = byte(n>>24), byte(n>>16), byte(n>>8), byte(n)
+	return b
+}
+
+func gloatPackEntry(b []byte, e any) []byte {
+	entry := e.(lang.IMapEntry)
+	return gloatPackValue(gloatPackValue(b, entry.Key()), entry.Val())
+}
+
+func gloatPackValue(b []byte, v any) []byte {
+	switch v := v.(type) {
+	case nil:
+		return append(b, 0xc0)
+	case bool:
+		if v {
+			return append(b, 0xc3)
+		}
+		return append(b, 0xc2)
+	case int64:
+		return gloatPackUint(append(b, 0xd3), uint64(v), 8)
+	case int:
+		return gloatPackUint(append(b, 0xd3), uint64(v), 8)
+	case float64:
+		return gloatPackUint(append(b, 0xcb), *(*uint64)(unsafe.Pointer(&v)), 8)
+	case float32:
+		f := float64(v)
+		return gloatPackUint(append(b, 0xcb), *(*uint64)(unsafe.Pointer(&f)), 8)
+	case string:
+		return gloatPackBytes(b, 0xdb, v)
+	case []byte:
+		return gloatPackBytes(b, 0xc6, string(v))
+	case lang.IPersistentMap:
+		return gloatPackSeq(b, 0xdf, lang.Seq(v), gloatPackEntry)
+	case interface{ Seq() lang.ISeq }:
+		return gloatPackSeq(b, 0xdd, v.Seq(), gloatPackValue)
+	case interface{ String() string }:
+		// Keywords and symbols travel as their names, other printable
+		// values (characters, ratios, ...) as their string form
+		return gloatPackBytes(b, 0xdb, strings.TrimPrefix(v.String(), ":"))
+	}
+	panic("gloat: a data result can't contain this value")
+}
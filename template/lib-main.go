@@ -1,10 +1,12 @@
 package main
 
+// #include <stdlib.h>
 import "C"
 
 import (
 	"os"
 	"strings"
+	"unsafe"
 	"github.com/glojurelang/glojure/pkg/glj"
 	"github.com/glojurelang/glojure/pkg/lang"
 	_ "GO-MODULE/pkg/PACKAGE-PATH"
@@ -63,6 +65,35 @@ ALL-NS-REQUIRES
 	)
 	runVar := glj.Var("ys.v0", "RUN")
 	alterVarRoot.Invoke(runVar, constantly.Invoke(runMap))
+
+	// Exported functions can be called from any number of host threads
+	// at once. The Go runtime runs this init before it lets the first
+	// call in, so looking the exported vars up here takes the namespace
+	// lookup out of every call; a call only reads its var's root.
+	gloatBindExports()
+}
+
+// gloat_free releases strings and buffers returned by exported functions
+//
+//export gloat_free
+func gloat_free(p unsafe.Pointer) {
+	C.free(p)
+}
+
+// gloatCopyString writes s into the caller's buf for the *_into exports,
+// truncating to cap-1 bytes plus a NUL, and returns len(s) so callers can
+// retry with a buffer of at least len(s)+1 bytes
+func gloatCopyString(s string, buf *C.char, cap C.size_t) C.size_t {
+	if buf != nil && cap > 0 {
+		n := len(s)
+		if C.size_t(n) >= cap {
+			n = int(cap) - 1
+		}
+		dst := unsafe.Slice((*byte)(unsafe.Pointer(buf)), n+1)
+		copy(dst, s[:n])
+		dst[n] = 0
+	}
+	return C.size_t(len(s))
 }
 
 EXPORT-FUNCTIONS
@@ -273,6 +273,11 @@ is "$rc" 1 "'gloat -qXunknown file.clj' exits 1"
 has "$got" "Unknown extension: unknown" \
   "a clustered -X option accepts its attached value"
 
+try "$GLOAT_BIN -q -Xpython -t clj '$SOURCE'"
+is "$rc" 1 "'gloat -Xpython -t clj' exits 1"
+has "$got" "-Xpython is only valid with lib format" \
+  "the python extension needs a shared library output"
+
 try "$GLOAT_BIN --shell -- printf '%s\n' -FC"
 is "$rc" 0 "'gloat --shell -- ... -FC' exits 0"
 is "$got" "-FC" "short-option clusters after -- are preserved"
@@ -69,6 +69,19 @@ has "$got" "empty command name" "'gloat --which=glj,' reports empty command"
 try "$GLOAT_BIN --glj"
 is "$rc" 129 "'gloat --glj' is no longer accepted"
 
+# Startup: the env manifest and the in-process option parser
+try "$GLOAT_BIN --profile-startup -o x -v x.clj"
+is "$rc" 0 "'gloat --profile-startup' exits 0"
+has "$got" "gloat startup profile (env manifest hit)" \
+  "'gloat --profile-startup' reuses the env manifest"
+has "$got" "parse options (in-process)" \
+  "'gloat --profile-startup' shows plain compile options parsed in-process"
+has "$got" "bb startup (bb -e nil)" "'gloat --profile-startup' times bb"
+
+try "$GLOAT_BIN --profile-startup -C x.clj"
+has "$got" "parse options (util/getopt)" \
+  "'gloat --profile-startup' shows other options parsed by util/getopt"
+
 # Engine selection (-E/--engine/GLOAT_ENGINE)
 try "$GLOAT_BIN --engines"
 is "$rc" 0 "'gloat --engines' exits 0"
@@ -378,6 +391,26 @@ try "$GLOAT_BIN hello.ys -t clj"
 is "$rc" 0 "'gloat hello.ys -t clj' exits 0"
 has "$got" "(ns " "'gloat hello.ys -t clj' outputs Clojure"
 
+# Test that 'gloat --daemon=path' listens and answers a compile.
+# Own process group: bin/gloat runs bb from a subshell
+(cd "$TMP" && exec setsid "$GLOAT_BIN" --daemon=gloat.sock -q) &
+daemon_pid=$!
+export GLOAT_DAEMON_SOCKET=$TMP/gloat.sock
+for _ in {1..300}; do [[ -S $GLOAT_DAEMON_SOCKET ]] && break; sleep 0.1; done
+ok "$([[ -S $GLOAT_DAEMON_SOCKET ]])" \
+  "'gloat --daemon=gloat.sock' listens on ./gloat.sock"
+# The client exits 75 when no daemon answers, so 0 means the daemon compiled
+try "GLOAT_OPTS='{:args [\"boolean.clj\"] :to \"clj\"}' \
+  bb '$PROJECT_ROOT/src/daemon.clj'"
+is "$rc" 0 "'gloat --daemon' answers a compile request"
+has "$got" "(ns boolean" "'gloat --daemon' sends the compile output"
+try "$GLOAT_BIN boolean.clj -t clj"
+is "$rc" 0 "'gloat -t clj' exits 0 with a daemon running"
+has "$got" "(ns boolean" "'gloat -t clj' outputs Clojure with a daemon running"
+kill -- "-$daemon_pid"
+wait "$daemon_pid" 2>/dev/null || true
+unset GLOAT_DAEMON_SOCKET
+
 if [[ ${RUN_SLOW_TESTS:-} ]]; then
   # Test Go stdout mode
   try "$GLOAT_BIN hello.ys -t go"
@@ -406,6 +439,71 @@ if [[ ${RUN_SLOW_TESTS:-} ]]; then
   rm -f "$FIXTURES_DIR/hello.go"
 fi
 
+if [[ ${RUN_SLOW_TESTS:-} ]]; then
+  # Test -t all (every stage in one run)
+  rm -rf "$TMP/all"
+  try "$GLOAT_BIN hello.ys -t all -o $TMP/all/"
+  is "$rc" 0 "'gloat hello.ys -t all' exits 0"
+  has "$got" '"stage":"wasm"' "'gloat hello.ys -t all' reports the wasm stage"
+  for f in hello.clj hello.glj hello.go hello.wasm manifest.json; do
+    ok "$([[ -s $TMP/all/$f ]])" "'gloat hello.ys -t all' creates $f"
+  done
+  rm -rf "$TMP/all"
+fi
+
+if [[ ${RUN_SLOW_TESTS:-} ]]; then
+  # Test incremental recompiles (unchanged forms and namespaces reused)
+  export GLOAT_BUILD_CACHE=$TMP/build-cache
+  rm -rf "$TMP/inc" "$GLOAT_BUILD_CACHE"
+  mkdir -p "$TMP/inc"
+  cp "$FIXTURES_DIR/hello.ys" "$TMP/inc/hello.ys"
+  try "$GLOAT_BIN $TMP/inc/hello.ys -t all -o $TMP/inc/1/"
+  is "$rc" 0 "'gloat -t all' exits 0 with an empty build cache"
+  like "$got" '"stage":"go"[^}]*"built":1,"reused":0' \
+    "'gloat -t all' compiles the namespace the first time"
+  try "$GLOAT_BIN $TMP/inc/hello.ys -t all -o $TMP/inc/2/"
+  like "$got" '"stage":"glj"[^}]*"built":0,' \
+    "'gloat -t all' reuses every unchanged form"
+  like "$got" '"stage":"go"[^}]*"built":0,"reused":1' \
+    "'gloat -t all' reuses the unchanged namespace"
+  ok "$(cmp -s "$TMP/inc/1/hello.go" "$TMP/inc/2/hello.go")" \
+    "a reused namespace has the same Go code"
+  echo 'defn extra(): 42' >> "$TMP/inc/hello.ys"
+  try "$GLOAT_BIN $TMP/inc/hello.ys -t all -o $TMP/inc/3/"
+  like "$got" '"stage":"glj"[^}]*"built":1,' \
+    "'gloat -t all' rewrites only the added form"
+  like "$got" '"stage":"go"[^}]*"built":1,"reused":0' \
+    "'gloat -t all' recompiles the changed namespace"
+  GLOAT_INCREMENTAL=0 try "$GLOAT_BIN $TMP/inc/hello.ys -t all -o $TMP/inc/4/"
+  hasnt "$got" '"reused"' "GLOAT_INCREMENTAL=0 reuses nothing"
+  ok "$(cmp -s "$TMP/inc/3/hello.glj" "$TMP/inc/4/hello.glj")" \
+    "incremental and full rewrites give the same Glojure"
+  unset GLOAT_BUILD_CACHE
+  rm -rf "$TMP/inc"
+fi
+
+if [[ ${RUN_SLOW_TESTS:-} ]]; then
+  # Test compiling through a resident 'gloat --daemon'
+  export GLOAT_DAEMON_SOCKET=$TMP/gloat.sock
+  # Own process group: bin/gloat runs bb from a subshell
+  setsid "$GLOAT_BIN" --daemon -q &
+  daemon_pid=$!
+  for _ in {1..100}; do [[ -S $GLOAT_DAEMON_SOCKET ]] && break; sleep 0.1; done
+  ok "$([[ -S $GLOAT_DAEMON_SOCKET ]])" "'gloat --daemon' creates its socket"
+  rm -rf "$TMP/daemon"
+  try "$GLOAT_BIN hello.ys -t all -o $TMP/daemon/"
+  is "$rc" 0 "'gloat -t all' exits 0 through the daemon"
+  has "$got" '"stage":"wasm"' "daemon streams the stage records"
+  ok "$([[ -s $TMP/daemon/hello.wasm ]])" "daemon writes output relative to the client"
+  try "$GLOAT_BIN hello.ys -t all -o $TMP/daemon/"
+  is "$rc" 1 "daemon compile failure exits 1"
+  has "$got" "Output already exists" "daemon sends error messages to the client"
+  kill -- "-$daemon_pid"
+  wait "$daemon_pid" 2>/dev/null || true
+  unset GLOAT_DAEMON_SOCKET
+  rm -rf "$TMP/daemon"
+fi
+
 # Test fail-fast when output exists (file)
 touch "$FIXTURES_DIR/exists-file"
 try "$GLOAT_BIN hello.ys -o $FIXTURES_DIR/exists-file"
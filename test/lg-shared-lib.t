@@ -18,8 +18,10 @@ esac
 cat > "$TMP/shared.clj" <<'EOF'
 (ns shared.core
   (:require [shared.helper :as helper]))
-(def EXPORT {:twice [:int :int]})
+(def EXPORT {:twice [:int :int]
+             :hi [:str :str]})
 (defn twice [x] (helper/twice x))
+(defn hi [s] (str "hi " s))
 EOF
 
 cat > "$TMP/helper.clj" <<'EOF'
@@ -33,6 +35,14 @@ cat > "$TMP/call.c" <<'EOF'
 
 int main(void) {
   printf("%lld\n", twice(21));
+
+  char *s = hi("you");
+  printf("%s\n", s);
+  gloat_free(s);
+
+  char buf[4];
+  size_t n = hi_into("you", buf, sizeof buf);
+  printf("%zu %s\n", n, buf);
   return 0;
 }
 EOF
@@ -50,7 +60,7 @@ for engine in lgvm lglvm; do
   if [[ -x $TMP/call-$engine ]]; then
     try "$TMP/call-$engine"
     is "$rc" 0 "C caller for -E$engine exits 0"
-    is "$got" 42 "C caller invokes the -E$engine export"
+    is "$got" $'42\nhi you\n6 hi ' "C caller invokes the -E$engine exports"
   fi
 done
 
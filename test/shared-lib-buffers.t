@@ -0,0 +1,90 @@
+#!/usr/bin/env bash
+
+# Test buffer-typed ([int], [float], bytes, data) shared library exports.
+
+source "$(dirname "${BASH_SOURCE[0]}")/init"
+
+if [[ -z ${RUN_SLOW_TESTS:-} ]]; then
+  pass 'Skipping slow shared library buffer builds. Try RUN_SLOW_TESTS=1.'
+  done-testing
+  exit 0
+fi
+
+case $(uname -s) in
+  Darwin) libext=dylib ;;
+  *)      libext=so ;;
+esac
+
+cat > "$TMP/buffers.clj" <<'EOF'
+(ns buffers.core)
+(def EXPORT {:total [[:int] :int]
+             :doubled [[:float] [:float]]
+             :rev [:bytes :bytes]
+             :summary [:data :data]})
+(defn total [xs] (reduce + 0 xs))
+(defn doubled [xs] (mapv #(* 2.0 %) xs))
+(defn rev [bs] (reverse bs))
+(defn summary [m]
+  {:name (get m "name") :sorted (sort (get m "xs")) :mean (/ 6.0 3)})
+EOF
+
+cat > "$TMP/call.c" <<'EOF'
+#include <stdio.h>
+#include "buffers.h"
+
+int main(void) {
+  long long xs[] = {1, 2, 3, 4};
+  double fs[] = {0.5, 1.5};
+  long long n = 0;
+
+  printf("%lld\n", total(xs, 4));
+
+  double *d = doubled(fs, 2, &n);
+  printf("%lld %g %g\n", n, d[0], d[1]);
+  gloat_free(d);
+
+  char *r = rev("abc", 3, &n);
+  printf("%.*s\n", (int)n, r);
+  gloat_free(r);
+  return 0;
+}
+EOF
+
+lib=$TMP/buffers.$libext
+try "gloat -q -f -o $lib $TMP/buffers.clj 2>&1"
+is "$rc" 0 "gloat builds a library with buffer exports"
+has "$(cat "$TMP/buffers.h")" "arg0_len" \
+  "Buffer arguments are lowered to a pointer and a length"
+
+try "cc -o $TMP/call -I$TMP $TMP/call.c $lib"
+is "$rc" 0 "C caller links to the buffer exports"
+
+if [[ -x $TMP/call ]]; then
+  try "$TMP/call"
+  is "$rc" 0 "C caller exits 0"
+  is "$got" $'10\n2 1 3\ncba' "Buffer arguments and results round trip"
+fi
+
+try "gloat -q -f -Xpython -o $lib $TMP/buffers.clj 2>&1"
+is "$rc" 0 "gloat -Xpython builds the library and its bindings"
+ok "$([[ -f $TMP/buffers_bindings.py ]])" \
+  "The bindings module is written next to the library"
+
+if command -v python3 >/dev/null; then
+  try "cd $TMP && python3 -c '
+import buffers_bindings as b
+print(b.total([1, 2, 3, 4]), list(b.doubled([0.5, 1.5])), b.rev(b\"abc\"))'"
+  is "$got" "10 [1.0, 3.0] b'cba'" \
+    "The generated bindings convert buffer arguments and results"
+
+  try "cd $TMP && python3 -c '
+import buffers_bindings as b
+print(sorted(b.summary({\"name\": \"z\", \"xs\": [3, -1, 2]}).items()))'"
+  is "$got" "[('mean', 2.0), ('name', 'z'), ('sorted', [-1, 2, 3])]" \
+    "data arguments and results round trip as MessagePack"
+fi
+
+try "gloat -q -Elgvm -f -o $lib $TMP/buffers.clj 2>&1"
+is "$rc" 1 "The lgvm engine rejects buffer exports"
+
+done-testing
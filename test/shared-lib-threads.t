@@ -0,0 +1,40 @@
+#!/usr/bin/env bash
+
+# Test that shared library exports can be called from many threads at once.
+
+source "$(dirname "${BASH_SOURCE[0]}")/init"
+
+if [[ -z ${RUN_SLOW_TESTS:-} ]]; then
+  pass 'Skipping slow shared library thread tests. Try RUN_SLOW_TESTS=1.'
+  done-testing
+  exit 0
+fi
+
+if ! command -v python3 >/dev/null; then
+  pass 'Skipping shared library thread tests: python3 is not installed.'
+  done-testing
+  exit 0
+fi
+
+case $(uname -s) in
+  Darwin) libext=dylib ;;
+  *)      libext=so ;;
+esac
+
+source=$PROJECT_ROOT/demo/so-bindings/example.ys
+threads=$PROJECT_ROOT/demo/so-bindings/python/threads.py
+
+for engine in glj lgvm; do
+  lib=$TMP/$engine/example.$libext
+  mkdir -p "$TMP/$engine"
+
+  try "gloat -q -E$engine -f -o $lib $source 2>&1"
+  is "$rc" 0 "gloat -E$engine builds the example library"
+
+  try "python3 $threads 2000 $lib"
+  is "$rc" 0 "Concurrent $engine calls exit 0"
+  has "$got" "concurrent calls from" "threads.py ran its checks ($engine)"
+  has "$got" ": ok" "Concurrent $engine calls return the right results"
+done
+
+done-testing
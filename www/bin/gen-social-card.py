@@ -1,19 +1,33 @@
 #!/usr/bin/env python3
 
-"""Generate the social-card.png for the GloatHub website.
+"""Generate the social cards for the GloatHub website.
 
-Reads the subtitle from mkdocs.yaml's site_description so the card
-stays in sync with the site metadata.  Run from the www/ directory
-or pass the www/ path as the first argument.
+With no options, writes docs/img/social-card.png, the site card, with
+mkdocs.yaml's site_description as its subtitle so the card stays in sync
+with the site metadata.  With --pages, also writes a card for every page
+in mkdocs.yaml's nav to docs/img/social/PAGE.png, with the page title as
+its subtitle.
+
+Every card shares one background built from whole-image operations, so a
+card only costs its subtitle and the PNG encode.  A hash of each card's
+inputs is kept in .cache/social-cards.json and cards whose inputs have not
+changed are skipped (--force renders them anyway).  Stale cards render in
+a process pool.
+
+Run from the www/ directory or pass the www/ path as the first argument.
 """
 
-import math
+import argparse
+import hashlib
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
+import PIL
 import yaml
 import yaml.constructor
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFont
 
 
 # mkdocs.yaml uses !!python/name tags that safe_load rejects.
@@ -28,123 +42,221 @@ _MkDocsLoader.add_multi_constructor(
     lambda loader, suffix, node: None,
 )
 
-# ---------------------------------------------------------------------------
-# Paths
-# ---------------------------------------------------------------------------
-www_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(
-    os.path.dirname(os.path.abspath(__file__)))
+WIDTH, HEIGHT = 1200, 630
+TITLE = 'GloatHub'
+BOLD_FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'
+REGULAR_FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+SHADOW = (0, 30, 25)
 
-mkdocs_path = os.path.join(www_dir, 'mkdocs.yaml')
-goat_path = os.path.join(www_dir, 'docs', 'img', 'gloat.jpeg')
-out_path = os.path.join(www_dir, 'docs', 'img', 'social-card.png')
 
 # ---------------------------------------------------------------------------
-# Read subtitle from mkdocs.yaml
+# Card rendering
 # ---------------------------------------------------------------------------
-with open(mkdocs_path) as f:
-    mkdocs = yaml.load(f, Loader=_MkDocsLoader)
+def gradient():
+    """The teal background, darkest at the top"""
+    ramp = Image.linear_gradient('L').resize((WIDTH, HEIGHT))
+    return Image.merge('RGB', [
+        Image.new('L', (WIDTH, HEIGHT), 0),
+        ramp.point(lambda v: 50 + (137 - 50) * v // 255),
+        ramp.point(lambda v: 40 + (123 - 40) * v // 255),
+    ])
 
-subtitle = mkdocs['site_description']
 
-# ---------------------------------------------------------------------------
-# Canvas and teal gradient background
-# ---------------------------------------------------------------------------
-WIDTH, HEIGHT = 1200, 630
-img = Image.new('RGB', (WIDTH, HEIGHT), '#004D40')
-draw = ImageDraw.Draw(img)
-
-for y in range(HEIGHT):
-    r = 0
-    g = int(50 + (137 - 50) * y / HEIGHT)
-    b = int(40 + (123 - 40) * y / HEIGHT)
-    draw.line([(0, y), (WIDTH, y)], fill=(r, g, b))
-
-# Subtle radial glow in center
-cx, cy = WIDTH // 2, 280
-for y in range(HEIGHT):
-    for x in range(0, WIDTH, 2):
-        dist = math.sqrt((x - cx) ** 2 + (y - cy) ** 2)
-        if dist < 350:
-            factor = (1.0 - dist / 350) * 0.12
-            px = img.getpixel((x, y))
-            nr = min(255, int(px[0] + 80 * factor))
-            ng = min(255, int(px[1] + 180 * factor))
-            nb = min(255, int(px[2] + 160 * factor))
-            img.putpixel((x, y), (nr, ng, nb))
-            if x + 1 < WIDTH:
-                img.putpixel((x + 1, y), (nr, ng, nb))
-
-draw = ImageDraw.Draw(img)
+def glow(center=(WIDTH // 2, 280), radius=350, strength=0.12):
+    """A subtle radial glow, fading out at radius, to add to the background"""
+    # radial_gradient is a 256x256 distance map: 0 at the center, rising
+    # to `edge` at the middle of each side
+    distance = Image.radial_gradient('L')
+    edge = distance.getpixel((0, 128))
+    distance = distance.resize((2 * radius, 2 * radius))
+    light = Image.merge('RGB', [
+        distance.point(
+            lambda v, k=k: int(k * strength * max(0.0, 1 - v / edge)))
+        for k in (80, 180, 160)])
+    layer = Image.new('RGB', (WIDTH, HEIGHT))
+    layer.paste(light, (center[0] - radius, center[1] - radius))
+    return layer
 
-# ---------------------------------------------------------------------------
-# Goat mascot (circular portrait with teal glow ring)
-# ---------------------------------------------------------------------------
-goat = Image.open(goat_path)
-goat_size = 340
-goat = goat.resize((goat_size, goat_size), Image.LANCZOS)
 
-mask = Image.new('L', (goat_size, goat_size), 0)
-mask_draw = ImageDraw.Draw(mask)
-mask_draw.ellipse([0, 0, goat_size - 1, goat_size - 1], fill=255)
+def background(goat_path):
+    """Everything on a card but its subtitle"""
+    img = ImageChops.add(gradient(), glow())
+    draw = ImageDraw.Draw(img)
+
+    # Goat mascot (circular portrait with teal glow ring)
+    goat_size = 340
+    goat = Image.open(goat_path).resize((goat_size, goat_size),
+                                        Image.LANCZOS)
+    mask = Image.new('L', (goat_size, goat_size), 0)
+    ImageDraw.Draw(mask).ellipse([0, 0, goat_size - 1, goat_size - 1],
+                                 fill=255)
+    goat_x = (WIDTH - goat_size) // 2
+    goat_y = 60
+    ring_padding = 10
 
-goat_x = (WIDTH - goat_size) // 2
-goat_y = 60
-ring_padding = 10
+    # Teal/cyan glow rings
+    for i in range(25, 0, -1):
+        c = (0, min(255, 180 + i * 3), min(255, 200 + i * 2))
+        draw.ellipse([
+            goat_x - ring_padding - i, goat_y - ring_padding - i,
+            goat_x + goat_size + ring_padding + i,
+            goat_y + goat_size + ring_padding + i,
+        ], outline=c, width=1)
 
-# Teal/cyan glow rings
-for i in range(25, 0, -1):
-    c = (0, min(255, 180 + i * 3), min(255, 200 + i * 2))
+    # White circle background
     draw.ellipse([
-        goat_x - ring_padding - i, goat_y - ring_padding - i,
-        goat_x + goat_size + ring_padding + i,
-        goat_y + goat_size + ring_padding + i,
-    ], outline=c, width=1)
+        goat_x - ring_padding, goat_y - ring_padding,
+        goat_x + goat_size + ring_padding,
+        goat_y + goat_size + ring_padding,
+    ], fill=(255, 255, 255))
 
-# White circle background
-draw.ellipse([
-    goat_x - ring_padding, goat_y - ring_padding,
-    goat_x + goat_size + ring_padding,
-    goat_y + goat_size + ring_padding,
-], fill=(255, 255, 255))
+    img.paste(goat, (goat_x, goat_y), mask)
 
-img.paste(goat, (goat_x, goat_y), mask)
+    # Title
+    bold_font = ImageFont.truetype(BOLD_FONT, 60)
+    title_bbox = draw.textbbox((0, 0), TITLE, font=bold_font)
+    title_x = (WIDTH - (title_bbox[2] - title_bbox[0])) // 2
+    title_y = 430
+    draw.text((title_x + 2, title_y + 2), TITLE, fill=SHADOW, font=bold_font)
+    draw.text((title_x, title_y), TITLE, fill=(255, 255, 255),
+              font=bold_font)
+
+    # Bottom accent line
+    line_y = 590
+    line_w = 200
+    draw.line([(WIDTH // 2 - line_w, line_y), (WIDTH // 2 + line_w, line_y)],
+              fill=(0, 188, 212), width=3)
+    return img
+
+
+_background = None
+_regular_font = None
+
+
+def _init(goat_path):
+    """Build the shared background once per process"""
+    global _background, _regular_font
+    _background = background(goat_path)
+    _regular_font = ImageFont.truetype(REGULAR_FONT, 26)
+
+
+def render(subtitle, out_path):
+    """Write a card with subtitle under the title to out_path"""
+    img = _background.copy()
+    draw = ImageDraw.Draw(img)
+    sub_bbox = draw.textbbox((0, 0), subtitle, font=_regular_font)
+    sub_x = (WIDTH - (sub_bbox[2] - sub_bbox[0])) // 2
+    sub_y = 510
+    draw.text((sub_x + 1, sub_y + 1), subtitle, fill=SHADOW,
+              font=_regular_font)
+    draw.text((sub_x, sub_y), subtitle, fill=(178, 223, 219),
+              font=_regular_font)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    img.save(out_path, 'PNG')
+    return out_path
 
-# ---------------------------------------------------------------------------
-# Text
-# ---------------------------------------------------------------------------
-bold_font = ImageFont.truetype(
-    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 60)
-regular_font = ImageFont.truetype(
-    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 26)
-
-# Title
-title = 'GloatHub'
-title_bbox = draw.textbbox((0, 0), title, font=bold_font)
-title_w = title_bbox[2] - title_bbox[0]
-title_x = (WIDTH - title_w) // 2
-title_y = 430
-draw.text((title_x + 2, title_y + 2), title, fill=(0, 30, 25),
-          font=bold_font)
-draw.text((title_x, title_y), title, fill=(255, 255, 255), font=bold_font)
-
-# Subtitle (from mkdocs.yaml)
-sub_bbox = draw.textbbox((0, 0), subtitle, font=regular_font)
-sub_w = sub_bbox[2] - sub_bbox[0]
-sub_x = (WIDTH - sub_w) // 2
-sub_y = 510
-draw.text((sub_x + 1, sub_y + 1), subtitle, fill=(0, 30, 25),
-          font=regular_font)
-draw.text((sub_x, sub_y), subtitle, fill=(178, 223, 219),
-          font=regular_font)
-
-# Bottom accent line
-line_y = 590
-line_w = 200
-draw.line([(WIDTH // 2 - line_w, line_y), (WIDTH // 2 + line_w, line_y)],
-          fill=(0, 188, 212), width=3)
 
 # ---------------------------------------------------------------------------
-# Save
+# Cards to make
 # ---------------------------------------------------------------------------
-img.save(out_path, 'PNG')
-print(f'Generated {out_path}')
+def nav_pages(nav, section=None):
+    """(path, title) for each page in an mkdocs nav. An untitled page
+    takes its section's title, or failing that its file name."""
+    for item in nav:
+        if isinstance(item, str):
+            name = os.path.splitext(os.path.basename(item))[0]
+            yield item, section or name.replace('-', ' ').title()
+            continue
+        for title, value in item.items():
+            if isinstance(value, list):
+                yield from nav_pages(value, title)
+            elif '://' not in value:
+                yield value, title
+
+
+def cards(mkdocs, pages):
+    """Output path (relative to www/) -> subtitle"""
+    description = mkdocs['site_description']
+    wanted = {os.path.join('docs', 'img', 'social-card.png'): description}
+    if pages:
+        for path, title in nav_pages(mkdocs.get('nav') or []):
+            out = os.path.join('docs', 'img', 'social',
+                               os.path.splitext(path)[0] + '.png')
+            # The home page's title is the card title already
+            wanted[out] = description if title == TITLE else title
+    return wanted
+
+
+def inputs_hash(goat_path):
+    """Hash of everything but the subtitle that goes into a card"""
+    digest = hashlib.sha256()
+    for path in (os.path.abspath(__file__), goat_path,
+                 BOLD_FONT, REGULAR_FONT):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    digest.update(PIL.__version__.encode())
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('www_dir', nargs='?', default=os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument('--pages', action='store_true',
+                        help='also write a card for every page in the nav')
+    parser.add_argument('--force', action='store_true',
+                        help='render cards even if their inputs are unchanged')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='worker processes (default: %(default)s)')
+    opts = parser.parse_args()
+
+    www_dir = opts.www_dir
+    goat_path = os.path.join(www_dir, 'docs', 'img', 'gloat.jpeg')
+    cache_path = os.path.join(www_dir, '.cache', 'social-cards.json')
+
+    with open(os.path.join(www_dir, 'mkdocs.yaml')) as f:
+        mkdocs = yaml.load(f, Loader=_MkDocsLoader)
+
+    wanted = cards(mkdocs, opts.pages)
+    base = inputs_hash(goat_path)
+    hashes = {out: hashlib.sha256(f'{base}\0{subtitle}'.encode()).hexdigest()
+              for out, subtitle in wanted.items()}
+
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    stale = [out for out in wanted
+             if opts.force or cache.get(out) != hashes[out]
+             or not os.path.exists(os.path.join(www_dir, out))]
+    jobs = [(wanted[out], os.path.join(www_dir, out)) for out in stale]
+
+    if len(jobs) > 1 and opts.jobs > 1:
+        with ProcessPoolExecutor(min(opts.jobs, len(jobs)),
+                                 initializer=_init,
+                                 initargs=(goat_path,)) as pool:
+            done = list(pool.map(render, *zip(*jobs)))
+    elif jobs:
+        _init(goat_path)
+        done = [render(*job) for job in jobs]
+    else:
+        done = []
+
+    for path in done:
+        print(f'Generated {path}')
+    if len(wanted) > len(done):
+        print(f'{len(wanted) - len(done)} social card(s) unchanged')
+
+    cache.update((out, hashes[out]) for out in stale)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())